@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the solvers, functions, operators and acceleration schemes.
+
+The benchmarks follow the conventions of `asv <https://asv.readthedocs.io>`_:
+classes whose ``time_*`` methods are timed for each combination of their
+``params``, after ``setup`` was called with them. They can be run by asv with
+``asv run``, or without it by the :mod:`benchmarks.run` module, which writes
+the timings to a JSON file such that runs can be compared::
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+
+The synthetic problems are generated by the :mod:`benchmarks.problems` module.
+
+"""
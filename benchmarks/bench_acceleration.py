@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the acceleration schemes.
+
+"""
+
+import numpy as np
+
+from pyunlocbox import solvers, acceleration
+
+from benchmarks import problems
+
+
+class Acceleration(object):
+    r"""Time 50 iterations of a solver with each acceleration scheme."""
+
+    params = (['dummy', 'backtracking', 'fista', 'fista_backtracking',
+               'regularized_nonlinear'],
+              [100, 1000],
+              ['float64', 'float32'])
+    param_names = ['accel', 'size', 'dtype']
+
+    def setup(self, name, size, dtype):
+        accel = getattr(acceleration, name)()
+        if name == 'regularized_nonlinear':
+            # Extrapolation of the iterates of a smooth problem.
+            problem = problems.least_squares(size, dtype)
+            self.solver = solvers.gradient_descent(step=problem['step'],
+                                                   accel=accel)
+        else:
+            problem = problems.lasso(size, dtype)
+            self.solver = solvers.forward_backward(step=problem['step'],
+                                                   accel=accel)
+        self.functions = problem['functions']
+        self.x0 = problem['x0']
+
+    def time_solve(self, name, size, dtype):
+        solvers.solve(list(self.functions), np.array(self.x0, copy=True),
+                      self.solver, rtol=None, maxit=50, verbosity='NONE')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the evaluation, gradient and proximal operator of the functions.
+
+"""
+
+import numpy as np
+
+from pyunlocbox import functions
+
+from benchmarks import problems
+
+
+def _function(name, size, dtype):
+    r"""Return a function object and a point where to apply it."""
+    rs = np.random.RandomState(0)
+    if name in ['norm_nuclear', 'norm_tv']:
+        n = int(np.sqrt(size))
+        x = rs.standard_normal((n, n)).astype(dtype)
+    else:
+        x = rs.standard_normal(size).astype(dtype)
+    if name == 'dummy':
+        f = functions.dummy()
+    elif name == 'norm_l1':
+        f = functions.norm_l1(lambda_=0.1)
+    elif name == 'norm_l2':
+        f = problems.least_squares(size, dtype)['functions'][0]
+    elif name == 'norm_nuclear':
+        f = functions.norm_nuclear()
+    elif name == 'norm_tv':
+        f = functions.norm_tv(maxit=20)
+    elif name == 'proj_b2':
+        f = problems.l2_ball(size, dtype)['functions'][1]
+    return f, x
+
+
+class Functions(object):
+    r"""Time each method of the functions."""
+
+    params = (['dummy', 'norm_l1', 'norm_l2', 'norm_nuclear', 'norm_tv',
+               'proj_b2'],
+              [100, 1000],
+              ['float64', 'float32'])
+    param_names = ['function', 'size', 'dtype']
+
+    def setup(self, name, size, dtype):
+        self.f, self.x = _function(name, size, dtype)
+        self.f.verbosity = 'NONE'
+
+    def time_eval(self, name, size, dtype):
+        self.f.eval(self.x)
+
+    def time_prox(self, name, size, dtype):
+        self.f.prox(self.x, 0.5)
+
+    def time_grad(self, name, size, dtype):
+        if 'GRAD' not in self.f.cap(self.x):
+            raise NotImplementedError('No gradient.')  # Skipped by asv.
+        self.f.grad(self.x)
+
+
+class Prepared(object):
+    r"""Time the proximal operator of a prepared L2-norm or not."""
+
+    params = [['unprepared', 'prepared'], [100, 1000]]
+    param_names = ['plan', 'size']
+
+    def setup(self, plan, size):
+        rs = np.random.RandomState(0)
+        # Rows of an orthogonal matrix form a tight frame.
+        A = np.linalg.qr(rs.standard_normal((size, size)))[0][:size // 2]
+        self.f = functions.norm_l2(A=A, y=rs.standard_normal(size // 2),
+                                   w=0.5)
+        self.x = rs.standard_normal(size)
+        if plan == 'prepared':
+            self.f.prepare(self.x)
+
+    def time_prox(self, plan, size):
+        self.f.prox(self.x, 0.5)
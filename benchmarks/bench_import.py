@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the time to import the package in a fresh interpreter.
+
+"""
+
+
+class Import(object):
+    r"""Time a fresh interpreter which imports and uses some modules."""
+
+    params = (['numpy', 'pyunlocbox', 'pyunlocbox.functions',
+               'pyunlocbox.solvers', 'lasso', 'all'],)
+    param_names = ['code']
+
+    # Importing numpy alone is the baseline.
+    codes = {
+        'numpy': 'import numpy',
+        'pyunlocbox': 'import pyunlocbox',
+        'pyunlocbox.functions': 'import pyunlocbox.functions',
+        'pyunlocbox.solvers': 'import pyunlocbox.solvers',
+        'lasso': 'from pyunlocbox import functions, solvers\n'
+                 'functions.norm_l1()\n'
+                 'solvers.forward_backward()',
+        'all': 'import pyunlocbox\n'
+               'pyunlocbox.functions, pyunlocbox.solvers\n'
+               'pyunlocbox.operators, pyunlocbox.acceleration',
+    }
+
+    def timeraw_import(self, code):
+        return self.codes[code]
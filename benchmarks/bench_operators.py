@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the gradient and divergence operators, of the estimation of
+operator norms, and of sparse matrices as operators.
+
+"""
+
+import numpy as np
+
+from pyunlocbox import operators
+
+
+class Operators(object):
+    r"""Time the gradient and divergence of images and volumes."""
+
+    params = ([1, 2, 3],
+              [1000, 100000],
+              ['float64', 'float32'])
+    param_names = ['dim', 'size', 'dtype']
+
+    def setup(self, dim, size, dtype):
+        rs = np.random.RandomState(0)
+        n = int(round(size ** (1. / dim)))
+        self.x = rs.standard_normal((n,) * dim).astype(dtype)
+        self.grads = operators.grad(self.x, dim=dim)
+        if dim == 1:
+            self.grads = [self.grads]
+
+    def time_grad(self, dim, size, dtype):
+        operators.grad(self.x, dim=dim)
+
+    def time_div(self, dim, size, dtype):
+        operators.div(*self.grads)
+
+
+class EstimateNorm(object):
+    r"""Time the estimation of the norm of a matrix, which is not cached, and
+    the Frobenius norm of its Gram matrix (an upper bound)."""
+
+    params = [['estimate', 'gram'], [100, 1000]]
+    param_names = ['method', 'size']
+
+    def setup(self, method, size):
+        rs = np.random.RandomState(0)
+        self.A = rs.standard_normal((size // 2, size))
+
+    def time_norm(self, method, size):
+        if method == 'estimate':
+            operators._norms.clear()
+            operators.estimate_norm(self.A)
+        else:
+            np.linalg.norm(self.A.T.dot(self.A))
+
+
+class Sparse(object):
+    r"""Time the products with a sparse matrix in the CSC format, as a generic
+    matrix or as a sparse operator (converted to CSR once)."""
+
+    params = [['matrix', 'sparse'], ['forward', 'adjoint'], [1, 8],
+              ['float64', 'float32']]
+    param_names = ['operator', 'direction', 'columns', 'dtype']
+
+    def setup(self, operator, direction, columns, dtype):
+        from scipy import sparse
+        rs = np.random.RandomState(0)
+        m, n, nnz = 20000, 50000, 10**6
+        A = sparse.csc_matrix((rs.standard_normal(nnz),
+                               (rs.randint(0, m, nnz), rs.randint(0, n, nnz))),
+                              shape=(m, n))
+        size = n if direction == 'forward' else m
+        self.x = rs.standard_normal((size, columns)).astype(dtype)
+        make = operators._matrix if operator == 'matrix' else \
+            operators._operator
+        self.op = make(A, transpose=direction == 'adjoint')
+        self.op(self.x)  # Conversions.
+
+    def time_product(self, operator, direction, columns, dtype):
+        self.op(self.x)
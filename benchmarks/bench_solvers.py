@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Benchmarks of the solvers, each on a problem it can solve.
+
+"""
+
+import numpy as np
+
+from pyunlocbox import functions, solvers, acceleration
+
+from benchmarks import problems
+
+
+def _setup(name, size, dtype):
+    r"""Return the functions, starting point and solver to benchmark."""
+    if name == 'gradient_descent':
+        problem = problems.least_squares(size, dtype)
+        solver = solvers.gradient_descent(step=problem['step'])
+    elif name == 'forward_backward':
+        problem = problems.lasso(size, dtype)
+        solver = solvers.forward_backward(step=problem['step'],
+                                          accel=acceleration.fista())
+    elif name == 'generalized_forward_backward':
+        problem = problems.lasso(size, dtype)
+        solver = solvers.generalized_forward_backward(step=problem['step'])
+    elif name == 'douglas_rachford':
+        problem = problems.l2_ball(size, dtype)
+        solver = solvers.douglas_rachford(step=problem['step'])
+    elif name in ['mlfbf', 'projection_based']:
+        problem = problems.l2_ball(size, dtype)
+        # The constraint applies to the dual variable L(x).
+        f1 = functions.norm_l1()
+        f2 = functions.proj_b2(y=problem['y'], epsilon=0.01)
+        problem['functions'] = [f1, f2]
+        step = 0.5 / (1 + np.linalg.norm(problem['L'], ord=2))
+        if name == 'mlfbf':
+            problem['functions'].append(functions.dummy())
+            solver = solvers.mlfbf(L=problem['L'], step=step)
+        else:
+            solver = solvers.projection_based(L=problem['L'], step=step)
+    return problem['functions'], problem['x0'], solver
+
+
+class Solvers(object):
+    r"""Time 50 iterations of each solver."""
+
+    params = (['gradient_descent', 'forward_backward',
+               'generalized_forward_backward', 'douglas_rachford', 'mlfbf',
+               'projection_based'],
+              [100, 1000],
+              ['float64', 'float32'])
+    param_names = ['solver', 'size', 'dtype']
+
+    def setup(self, name, size, dtype):
+        self.functions, self.x0, self.solver = _setup(name, size, dtype)
+
+    def time_solve(self, name, size, dtype):
+        solvers.solve(list(self.functions), np.array(self.x0, copy=True),
+                      self.solver, rtol=None, maxit=50, verbosity='NONE')
+
+
+class Repeated(object):
+    r"""
+    Time the solve of a small lasso problem for new measurements, where the
+    set up of the solve is not negligible before 5 iterations.
+    """
+
+    params = [['solve', 'problem']]
+    param_names = ['method']
+
+    def setup(self, method):
+        problem = problems.lasso(20)
+        self.functions, self.x0 = problem['functions'], problem['x0']
+        self.y = self.functions[1].y()
+        self.solver = solvers.forward_backward(step=problem['step'],
+                                               accel=acceleration.fista())
+        self.params = {'rtol': None, 'maxit': 5, 'verbosity': 'NONE'}
+        self.problem = solvers.problem(self.functions, self.x0, self.solver,
+                                       data=self.functions[1], **self.params)
+
+    def time_solve(self, method):
+        if method == 'solve':
+            solvers.solve(self.functions, np.array(self.x0, copy=True),
+                          self.solver, **self.params)
+        else:
+            self.problem.run(self.y)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Generators of synthetic optimization problems.
+
+Each generator takes a problem size, a dtype and a random seed, and returns a
+dictionary with new function objects (`functions`), a starting point (`x0`)
+and a step size (`step`) such that the problems can be solved repeatedly.
+
+* :func:`least_squares`: :math:`\|Ax-y\|_2^2`.
+* :func:`lasso`: :math:`\|Ax-y\|_2^2 + \lambda \|x\|_1`.
+* :func:`tv_denoising`: :math:`\|x-y\|_2^2 + \lambda \|x\|_{TV}` on an image.
+* :func:`matrix_completion`: :math:`\|M \circ (x-y)\|_2^2 + \lambda \|x\|_*`.
+* :func:`l2_ball`: :math:`\|x\|_1` such that :math:`\|Ax-y\|_2 \leq \epsilon`,
+  where :math:`A` subsamples :math:`x`.
+
+"""
+
+import numpy as np
+
+from pyunlocbox import functions
+
+
+def _sparse_signal(rs, n, dtype, density=0.1):
+    x = np.zeros(n, dtype=dtype)
+    support = rs.choice(n, max(1, int(density * n)), replace=False)
+    x[support] = rs.standard_normal(len(support))
+    return x
+
+
+def least_squares(size, dtype=np.float64, seed=0):
+    rs = np.random.RandomState(seed)
+    A = rs.standard_normal((size // 2, size)).astype(dtype)
+    y = A.dot(rs.standard_normal(size).astype(dtype))
+    f = functions.norm_l2(A=A, y=y)
+    return {'functions': [f],
+            'x0': np.zeros(size, dtype=dtype),
+            'step': 0.5 / np.linalg.norm(A, ord=2)**2}
+
+
+def lasso(size, dtype=np.float64, seed=0):
+    rs = np.random.RandomState(seed)
+    A = rs.standard_normal((size // 2, size)).astype(dtype)
+    x = _sparse_signal(rs, size, dtype)
+    y = A.dot(x) + 0.01 * rs.standard_normal(size // 2).astype(dtype)
+    f1 = functions.norm_l1(lambda_=0.1)
+    f2 = functions.norm_l2(A=A, y=y)
+    return {'functions': [f1, f2],
+            'x0': np.zeros(size, dtype=dtype),
+            'step': 0.5 / np.linalg.norm(A, ord=2)**2}
+
+
+def tv_denoising(size, dtype=np.float64, seed=0):
+    r"""The image has `size` pixels."""
+    rs = np.random.RandomState(seed)
+    n = int(np.sqrt(size))
+    image = np.zeros((n, n), dtype=dtype)
+    image[n // 4:3 * n // 4, n // 4:3 * n // 4] = 1
+    y = image + 0.1 * rs.standard_normal((n, n)).astype(dtype)
+    f1 = functions.norm_tv(maxit=20)
+    f2 = functions.norm_l2(y=y)
+    return {'functions': [f1, f2],
+            'x0': np.array(y, copy=True),
+            'step': 0.5}
+
+
+def matrix_completion(size, dtype=np.float64, seed=0):
+    r"""The matrix has `size` entries."""
+    rs = np.random.RandomState(seed)
+    n = int(np.sqrt(size))
+    u = rs.standard_normal((n, 2)).astype(dtype)
+    mask = (rs.uniform(size=(n, n)) < 0.5).astype(dtype)
+    y = mask * u.dot(u.T)
+    f1 = functions.norm_nuclear(lambda_=0.1)
+    f2 = functions.norm_l2(A=lambda x: mask * x, At=lambda x: mask * x, y=y)
+    return {'functions': [f1, f2],
+            'x0': np.zeros((n, n), dtype=dtype),
+            'step': 0.5}
+
+
+def l2_ball(size, dtype=np.float64, seed=0):
+    rs = np.random.RandomState(seed)
+    x = _sparse_signal(rs, size, dtype)
+    A = np.eye(size, dtype=dtype)[rs.choice(size, size // 2, replace=False)]
+    y = A.dot(x)
+    f1 = functions.norm_l1()
+    f2 = functions.proj_b2(A=A, y=y, epsilon=0.01)
+    return {'functions': [f1, f2],
+            'x0': np.zeros(size, dtype=dtype),
+            'step': 1.,
+            'L': A,
+            'y': y}
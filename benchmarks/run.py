@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Run the benchmarks without asv and write the timings to a JSON file.
+
+Usage::
+
+    python -m benchmarks.run [--bench REGEX] [--repeat N] [--output FILE]
+                             [--compare FILE]
+
+Each benchmark is identified by ``module.Class.time_method(param=value, ...)``.
+The ``timeraw_`` benchmarks return code which is timed in a fresh interpreter,
+as asv does.
+The JSON file records the minimum and median time in seconds of each
+benchmark, along with the versions of Python, NumPy, SciPy and pyunlocbox.
+With ``--compare``, the ratio to the timings of a previous run is printed.
+
+"""
+
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+import scipy
+
+import pyunlocbox
+
+MODULES = ['bench_solvers', 'bench_functions', 'bench_operators',
+           'bench_acceleration', 'bench_import']
+
+
+def _benchmarks():
+    r"""Yield the name, class, method name and parameters of benchmarks."""
+    for module in MODULES:
+        module = importlib.import_module('benchmarks.' + module)
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            params = getattr(cls, 'params', [])
+            names = getattr(cls, 'param_names', [])
+            for method in sorted(vars(cls)):
+                if not method.startswith(('time_', 'timeraw_')):
+                    continue
+                for values in itertools.product(*params):
+                    name = '{}.{}.{}({})'.format(
+                        module.__name__.split('.')[-1], cls.__name__, method,
+                        ', '.join('{}={}'.format(n, v)
+                                  for n, v in zip(names, values)))
+                    yield name, cls, method, values
+
+
+def _interpreter(code):
+    r"""Return a function which runs code in a fresh interpreter."""
+    def run(*values):
+        subprocess.check_call([sys.executable, '-c', code])
+    return run
+
+
+def _time(cls, method, values, repeat):
+    r"""Return the timings of a benchmark, or None if it is skipped."""
+    bench = cls()
+    try:
+        if hasattr(bench, 'setup'):
+            bench.setup(*values)
+        function = getattr(bench, method)
+        if method.startswith('timeraw_'):
+            function = _interpreter(function(*values))
+        # Run once to skip unsupported cases and estimate the duration.
+        duration = timeit.timeit(lambda: function(*values), number=1)
+    except NotImplementedError:
+        return None
+    number = max(1, int(0.1 / max(duration, 1e-9)))
+    times = timeit.repeat(lambda: function(*values), number=number,
+                          repeat=repeat)
+    times = [t / number for t in times]
+    return {'min': min(times), 'median': float(np.median(times)),
+            'number': number, 'repeat': repeat}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run the pyunlocbox benchmarks.')
+    parser.add_argument('--bench', '-b', default='',
+                        help='only run benchmarks matching this regex')
+    parser.add_argument('--repeat', '-r', type=int, default=5,
+                        help='number of timings of each benchmark')
+    parser.add_argument('--output', '-o', default='benchmarks.json',
+                        help='JSON file where to write the results')
+    parser.add_argument('--compare', '-c',
+                        help='JSON file of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    previous = dict()
+    if args.compare:
+        with open(args.compare) as fh:
+            previous = json.load(fh)['results']
+
+    results = dict()
+    for name, cls, method, values in _benchmarks():
+        if not re.search(args.bench, name):
+            continue
+        timing = _time(cls, method, values, args.repeat)
+        if timing is None:
+            continue
+        results[name] = timing
+        line = '{:<80} {:10.3e} s'.format(name, timing['min'])
+        if name in previous:
+            line += '  {:6.2f}x'.format(timing['min'] /
+                                        previous[name]['min'])
+        print(line)
+        sys.stdout.flush()
+
+    output = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'processor': platform.processor(),
+              'numpy': np.__version__,
+              'scipy': scipy.__version__,
+              'pyunlocbox': pyunlocbox.__version__,
+              'results': results}
+    with open(args.output, 'w') as fh:
+        json.dump(output, fh, indent=2, sort_keys=True)
+    print('Results written to {}.'.format(os.path.abspath(args.output)))
+
+
+if __name__ == '__main__':
+    main()
@@ -17,20 +17,31 @@ The :mod:`pyunlocbox` package is divided into the following modules:
 * :mod:`pyunlocbox.operators`: useful operators to be passed to the functions
 * :mod:`pyunlocbox.acceleration`: acceleration schemes to be passed to the
   solvers, implement the acceleration class hierarchy
+* :mod:`pyunlocbox.trace`: traces of the iterations of the solvers, for
+  offline convergence analysis
 
 """
 
-# When importing the toolbox, you surely want these modules.
-from pyunlocbox import functions
-from pyunlocbox import solvers
-from pyunlocbox import operators
-from pyunlocbox import acceleration
-
-# Silence the code checker warning about unused symbols.
-assert functions
-assert solvers
-assert operators
-assert acceleration
+import importlib
+import sys
+
+# When importing the toolbox, you surely want these modules. They are loaded
+# on first access where modules support __getattr__ (Python 3.7), such that
+# short-lived processes only pay for the modules they use.
+_modules = ['functions', 'solvers', 'operators', 'acceleration', 'trace']
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _modules:
+            return importlib.import_module('pyunlocbox.' + name)
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+
+    def __dir__():
+        return sorted(list(globals()) + _modules)
+else:
+    for _module in _modules:
+        importlib.import_module('pyunlocbox.' + _module)
 
 __version__ = '0.5.1'
 __release_date__ = '2017-07-04'
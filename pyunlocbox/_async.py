@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Solve optimization problems from an asyncio event loop. This module needs
+Python 3.5 or later, and is exposed through :mod:`pyunlocbox.solvers`. The
+solves running concurrently in the event loop or in an executor can share
+their functions, solver and operators.
+
+"""
+
+import asyncio
+
+from pyunlocbox.solvers import solve_iter
+
+
+def _advance(iterations, n):
+    r"""
+    Run at most n iterations. Return True if the algorithm stopped.
+    """
+    for _ in range(n):
+        state = next(iterations, None)
+        if state is None or state['crit']:
+            return True
+    return False
+
+
+async def _solve(iterations, every, executor):
+    try:
+        while True:
+            if executor is None:
+                done = _advance(iterations, every)
+                # Let the other tasks run.
+                await asyncio.sleep(0)
+            else:
+                chunk = executor.submit(_advance, iterations, every)
+                try:
+                    done = await asyncio.wrap_future(chunk)
+                except asyncio.CancelledError:
+                    # The generator cannot be closed while a thread runs it.
+                    # Wait for the chunk without blocking the event loop,
+                    # even if cancelled again meanwhile.
+                    if not chunk.cancel():
+                        running = asyncio.wrap_future(chunk)
+                        while not running.done():
+                            try:
+                                await asyncio.wait([running])
+                            except asyncio.CancelledError:
+                                pass
+                    raise
+            if done:
+                break
+    finally:
+        # Does nothing if the iterations are over. Otherwise stops them and
+        # cleans up, e.g. with solver.post(), if cancelled.
+        iterations.close()
+
+
+async def solve_async(functions, x0, solver=None, every=10, executor=None,
+                      timeout=None, **kwargs):
+    r"""
+    Solve an optimization problem without blocking the event loop.
+
+    This coroutine runs the iterations of :func:`solve_iter` by chunks of
+    `every` iterations. The chunks run either in the event loop, which gets
+    back control between them, or in an executor.
+
+    Parameters
+    ----------
+    functions, x0, solver
+        See :func:`solve`.
+    every : int, optional
+        The number of iterations between which control is given back to the
+        event loop. Default is 10.
+    executor : concurrent.futures.Executor, optional
+        The executor where the chunks of iterations run, e.g. a thread pool
+        shared by many concurrent solves. If None, they run in the event
+        loop. Default is None.
+    timeout : float, optional
+        Cancel the solve and raise :class:`asyncio.TimeoutError` after
+        `timeout` seconds. Default is None, i.e. no time limit. See `maxtime`
+        in :func:`solve` to get the solution at the end of a time budget
+        instead.
+    kwargs : dict
+        Other arguments to :func:`solve_iter`, e.g. the stopping criteria.
+
+    Returns
+    -------
+    result : dict
+        The dictionary returned by :func:`solve`.
+
+    Notes
+    -----
+    Cancelling the solve, or reaching the timeout, raises
+    :class:`asyncio.CancelledError`, respectively
+    :class:`asyncio.TimeoutError`, once the current chunk of iterations is
+    over. The solver is cleaned up with :meth:`solver.post` beforehand.
+
+    Concurrent solves can share the functions, solver and acceleration
+    objects, as each solve holds its state in copies of them (see
+    :func:`solve`). Their operators and measurements are not copied: the
+    matrices are shared by the solves, including
+    :class:`pyunlocbox.operators.shared` ones, whose memory is also shared
+    with worker processes.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers
+    >>> f = functions.norm_l2(y=[4, 5, 6, 7])
+    >>> loop = asyncio.new_event_loop()
+    >>> ret = loop.run_until_complete(solvers.solve_async(
+    ...     [f], np.zeros(4), atol=1e-2, verbosity='NONE'))
+    >>> ret['crit'], ret['niter']
+    ('ATOL', 5)
+    >>> loop.close()
+
+    """
+
+    if every < 1:
+        raise ValueError('every should be at least 1.')
+
+    result = dict()
+    iterations = solve_iter(functions, x0, solver, result=result, **kwargs)
+    if timeout is None:
+        await _solve(iterations, every, executor)
+    else:
+        await asyncio.wait_for(_solve(iterations, every, executor), timeout)
+    return result
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+r"""
+Event layer of the package. The modules send their messages to their logger,
+e.g. ``logging.getLogger('pyunlocbox.solvers')``, and print them to the
+standard output as requested by the verbosity of the objects.
+
+The messages are formatted lazily, i.e. only if they are printed or logged.
+In loops, check once with :func:`enabled` whether the messages would go
+anywhere, and only call :func:`event` if so.
+
+"""
+
+import logging
+
+# The application configures the handlers.
+logging.getLogger('pyunlocbox').addHandler(logging.NullHandler())
+
+
+def enabled(logger, level, printed):
+    r"""
+    Return True if a message would be printed or handled by the logger.
+    """
+    return printed or logger.isEnabledFor(level)
+
+
+def event(logger, level, printed, msg, *args):
+    r"""
+    Send a message to the logger and print it if `printed` is True.
+
+    The message is formatted as ``msg % args``, only if needed.
+
+    """
+    if printed:
+        print(msg % args if args else msg)
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args)
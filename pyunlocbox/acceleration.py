@@ -21,7 +21,10 @@ import logging
 import warnings
 
 import numpy as np
-from scipy.optimize.linesearch import line_search_armijo
+
+from pyunlocbox import _log
+
+logger = logging.getLogger(__name__)
 
 
 class accel(object):
@@ -60,9 +63,10 @@ class accel(object):
         ----------
         solver : pyunlocbox.solvers.solver
             Solver on which to act.
-        objective : list of floats
-            List of evaluations of the objective function since the beginning
-            of the iterative process.
+        objective : array_like
+            Evaluations of the objective function since the beginning of the
+            iterative process, one row per evaluation. Index it from the end,
+            as only the last evaluations may be kept.
         niter : int
             Current iteration number.
 
@@ -85,16 +89,18 @@ class accel(object):
         ----------
         solver : pyunlocbox.solvers.solver
             Solver on which to act.
-        objective : list of floats
-            List of evaluations of the objective function since the beginning
-            of the iterative process.
+        objective : array_like
+            Evaluations of the objective function since the beginning of the
+            iterative process, one row per evaluation. Index it from the end,
+            as only the last evaluations may be kept.
         niter : int
             Current iteration number.
 
         Returns
         -------
         array_like
-            Updated solution point.
+            Updated solution point. The solution of the solver itself, if not
+            updated. It should not be modified in place.
 
         """
         return self._update_sol(solver, objective, niter)
@@ -102,6 +108,52 @@ class accel(object):
     def _update_sol(self, solver, objective, niter):
         raise NotImplementedError("Class user should define this method.")
 
+    def _moved(self, solver):
+        # The solution of the solver was replaced by the one returned by
+        # update_sol(). See pyunlocbox.solvers.solver._moved().
+        solver._moved()
+
+    def get_state(self):
+        """
+        State of the acceleration scheme needed to resume the iterations.
+
+        Returns
+        -------
+        dict
+            Arrays and scalars, keyed by name. The arrays are not copied.
+
+        """
+        return self._get_state()
+
+    def _get_state(self):
+        return dict()  # Stateless by default.
+
+    def set_state(self, state):
+        """
+        Restore a state returned by :meth:`get_state`.
+
+        Gets called after :meth:`pre` when :func:`pyunlocbox.solvers.solve`
+        resumes from a checkpoint.
+
+        """
+        self._set_state(state)
+
+    def _set_state(self, state):
+        pass
+
+    def _event(self, solver, event, **values):
+        """
+        Record an event, e.g. an extrapolation, in the trace of the solve.
+
+        The values should be numbers, strings, booleans or None. Does nothing
+        if no trace is recorded. See :mod:`pyunlocbox.trace`.
+
+        """
+        events = getattr(solver, 'events', None)
+        if events is not None:
+            values['event'] = event
+            events.append(values)
+
     def post(self):
         """
         Post-processing specific to the acceleration scheme.
@@ -160,7 +212,8 @@ class backtracking(dummy):
     Notes
     -----
     This is the backtracking strategy used in the original FISTA paper,
-    :cite:`beck2009FISTA`.
+    :cite:`beck2009FISTA`. It is used with the
+    :class:`pyunlocbox.solvers.forward_backward` solver.
 
     Examples
     --------
@@ -187,67 +240,76 @@ class backtracking(dummy):
         self.eta = eta
         super(backtracking, self).__init__(**kwargs)
 
+    def _pre(self, functions, x0):
+        super(backtracking, self)._pre(functions, x0)
+        # Workspaces for the gradient and the trial points.
+        self._grad = np.empty(np.shape(x0), dtype=np.result_type(x0, 1.))
+        self._x = np.empty_like(self._grad)
+
     def _update_step(self, solver, objective, niter):
         """
         Notes
         -----
-        TODO: For now we're recomputing gradients in order to evaluate the
-        backtracking criterion. In the future, it might be interesting to
-        think of some design changes so that this function has access to the
-        gradients directly.
-
-        Since the call to `solver._algo()` modifies the internal state of the
-        solver itself, we need to store the solver's property values before
-        doing backtracking, and then restore the solver's state after
-        backtracking is done. This takes more memory, but it's the only way to
-        guarantee that backtracking is performing on a fixed solver state.
+        The objective and gradient of the smooth functions are computed
+        together with :meth:`pyunlocbox.functions.func.eval_grad`, and the
+        functions reuse the residual they cached when the solver evaluated
+        them.
+
+        Each trial step is computed by the forward-backward solver from that
+        gradient, into a workspace: the state of the solver is not modified,
+        and a trial only applies the forward operators to evaluate the smooth
+        functions at the trial point.
         """
-        # Save current state of the solver
-        properties = copy.deepcopy(vars(solver))
-        logging.debug('(Begin) solver properties: {}'.format(properties))
-
         # Initialize some useful variables
         fn = 0
-        grad = np.zeros(properties['sol'].shape)
+        grad = self._grad
+        grad.fill(0)
         for f in solver.smooth_funs:
-            fn += f.eval(properties['sol'])
-            grad += f.grad(properties['sol'])
-        step = properties['step']
+            fval, fgrad = f.eval_grad(solver.sol)
+            fn += fval
+            grad += fgrad
 
-        logging.debug('fn = {}'.format(fn))
+        x = self._x
+        debug = _log.enabled(logger, logging.DEBUG, False)
+        step = solver.step
+        decreases = 0
+
+        if debug:
+            logger.debug('fn = %s', fn)
 
         while True:
             # Run the solver with the current stepsize
-            solver.step = step
-            logging.debug('Current step: {}'.format(step))
-            solver._algo()
-            logging.debug(
-                '(During) solver properties: {}'.format(vars(solver)))
+            solver._forward_backward(grad, step, out=x)
+            if debug:
+                logger.debug('Current step: %s', step)
 
             # Record results
-            fp = np.sum([f.eval(solver.sol) for f in solver.smooth_funs])
-            logging.debug('fp = {}'.format(fp))
-
-            dot_prod = np.dot(solver.sol - properties['sol'], grad)
-            logging.debug('dot_prod = {}'.format(dot_prod))
-
-            norm_diff = np.sum((solver.sol - properties['sol'])**2)
-            logging.debug('norm_diff = {}'.format(norm_diff))
-
-            # Restore the previous state of the solver
-            for key, val in properties.items():
-                setattr(solver, key, copy.copy(val))
-            logging.debug('(Reset) solver properties: {}'.format(vars(solver)))
+            fp = np.sum([f.eval(x) for f in solver.smooth_funs])
+            x -= solver.sol
+            dot_prod = np.dot(x, grad)
+            norm_diff = np.sum(x**2)
+            if debug:
+                logger.debug('fp = %s, dot_prod = %s, norm_diff = %s', fp,
+                             dot_prod, norm_diff)
 
             if (2. * step * (fp - fn - dot_prod) <= norm_diff):
-                logging.debug('Break condition reached')
+                if debug:
+                    logger.debug('Break condition reached')
                 break
             else:
-                logging.debug('Decreasing step')
+                if debug:
+                    logger.debug('Decreasing step')
                 step *= self.eta
+                decreases += 1
 
+        self._event(solver, 'backtracking', step=float(step),
+                    decreases=decreases)
         return step
 
+    def _post(self):
+        super(backtracking, self)._post()
+        del self._grad, self._x
+
 
 # -----------------------------------------------------------------------------
 # Solution point optimizers
@@ -288,17 +350,70 @@ class fista(dummy):
 
     def _pre(self, functions, x0):
         self.sol = np.array(x0, copy=True)
+        # Workspace for the extrapolated point.
+        self._y = np.empty(np.shape(x0), dtype=np.result_type(x0, 1.))
+        # Residuals of the smooth functions at self.sol, and at the point
+        # returned by update_sol().
+        self._functions = functions
+        self._residuals = []
+        self._extrapolated = []
 
     def _update_sol(self, solver, objective, niter):
         self.t = 1. if (niter == 1) else self.t  # Restart variable t if needed
         t = (1. + np.sqrt(1. + 4. * self.t**2.)) / 2.
-        y = solver.sol + ((self.t - 1) / t) * (solver.sol - self.sol)
+        a = (self.t - 1) / t
+        y = np.subtract(solver.sol, self.sol, out=self._y)
+        y *= a
+        y += solver.sol
+        self._extrapolate(solver, a)
         self.t = t
         self.sol[:] = solver.sol
         return y
 
+    def _extrapolate(self, solver, a):
+        # The residuals A(x) - y are affine in x: they are extrapolated like
+        # the solution from those cached when the objective function was
+        # evaluated, such that the gradients do not apply A again.
+        residuals = []
+        self._extrapolated = []
+        previous = dict(self._residuals)
+        for f in solver.smooth_funs:
+            res = f._cached_residual(solver.sol)
+            if res is None:
+                continue
+            residuals.append((f, res))
+            if a == 0:
+                self._extrapolated.append((f, res))
+            elif f in previous:
+                res = res + a * (res - previous[f])
+                self._extrapolated.append((f, res))
+        self._residuals = residuals
+
+    def _moved(self, solver):
+        super(fista, self)._moved(solver)
+        for f, res in self._extrapolated:
+            f._moved(solver.sol, res)
+        self._extrapolated = []
+
+    def _get_state(self):
+        # The residuals are computed again on restore, such that the
+        # iterations are the same.
+        cached = [i for i, f in enumerate(self._functions)
+                  if any(f is g for g, _ in self._residuals)]
+        return {'sol': self.sol, 't': self.t,
+                'residuals': np.array(cached, dtype=int)}
+
+    def _set_state(self, state):
+        self.sol[:] = state['sol']
+        self.t = float(state['t'])
+        self._residuals = []
+        for i in state.get('residuals', []):
+            f = self._functions[i]
+            self._residuals.append((f, f._residual(self.sol)))
+
     def _post(self):
-        del self.sol
+        del self.sol, self._y, self._functions, self._residuals
+        del self._extrapolated
 
 
 class regularized_nonlinear(dummy):
@@ -342,6 +457,10 @@ class regularized_nonlinear(dummy):
     -----
     This is the acceleration scheme proposed in :cite:`scieur2016`.
 
+    The objective function is evaluated by the acceleration scheme itself,
+    such that it does not depend on the `evaluate` and `history` parameters
+    of :func:`pyunlocbox.solvers.solve`.
+
     See also Damien Scieur's `repository <https://github.com/windows7lover
     /RegularizedNonlinearAcceleration>`_ for the Matlab version that inspired
     this implementation.
@@ -388,12 +507,10 @@ class regularized_nonlinear(dummy):
         except TypeError:
             try:
                 self._lambda_ = [float(lambda_)]
-            except ValueError as err:
-                print('lambda_ is not a number')
-                raise err
-        except ValueError as err:
-            print('lambda_ is not a list of numbers')
-            raise err
+            except ValueError:
+                raise ValueError('lambda_ is not a number.')
+        except ValueError:
+            raise ValueError('lambda_ is not a list of numbers.')
 
     def _pre(self, functions, x0):
         self.buffer = []
@@ -420,7 +537,8 @@ class regularized_nonlinear(dummy):
             # Grid search for the best parameter for the extrapolation
             fvals = []
             c = np.zeros((self.k,))
-            extrap = np.zeros(np.shape(solver.sol))
+            extrap = np.zeros(np.shape(solver.sol),
+                              dtype=np.result_type(solver.sol, 1.))
 
             for lambda_ in self.lambda_:
                 # Coefficients of the extrapolation
@@ -430,11 +548,13 @@ class regularized_nonlinear(dummy):
 
                 extrap[:] = np.dot(np.asarray(self.buffer[:-1]).T, c)
 
-                fvals.append(np.sum([f.eval(extrap) for f in self.functions]))
+                fvals.append(self._objective(extrap))
 
-            if self.forcedecrease and (min(fvals) > np.sum(objective[-1])):
+            if self.forcedecrease and \
+                    (min(fvals) > self._objective(solver.sol)):
                 # If we have bad extrapolations, keep solution as is
                 extrap[:] = solver.sol
+                lambda_ = None
             else:
                 # Return the best extrapolation from the grid search
                 lambda_ = self.lambda_[fvals.index(min(fvals))]
@@ -452,17 +572,17 @@ class regularized_nonlinear(dummy):
 
             # Improve proposal with line search
             if self.dolinesearch:
-                # Objective evaluation functional
-                def f(x):
-                    return np.sum([f.eval(x) for f in self.functions])
+                # Slow import, when needed.
+                from scipy.optimize.linesearch import line_search_armijo
+
                 # Solution at previous extrapolation
                 xk = self.buffer[0]
                 # Search direction
                 pk = extrap - xk
                 # Objective value during the previous extrapolation
-                old_fval = np.sum(objective[-self.k])
+                old_fval = self._objective(xk)
 
-                a, fc, fa = line_search_armijo(f=f,
+                a, fc, fa = line_search_armijo(f=self._objective,
                                                xk=xk,
                                                pk=pk,
                                                gfk=-pk,
@@ -475,6 +595,12 @@ class regularized_nonlinear(dummy):
                     warnings.warn('Line search failed to find good step size')
                 else:
                     extrap[:] = xk + a * pk
+            else:
+                a = None
+
+            self._event(solver, 'extrapolation', accepted=lambda_ is not None,
+                        lambda_=None if lambda_ is None else float(lambda_),
+                        linesearch=None if a is None else float(a))
 
             # Clear buffer and parameter grid for next extrapolation process
             self.buffer = []
@@ -486,6 +612,20 @@ class regularized_nonlinear(dummy):
             self.buffer.append(copy.copy(solver.sol))
             return solver.sol
 
+    def _objective(self, x):
+        # Evaluated here rather than taken from the evaluations made by
+        # solve(), which may be strided, not kept, or not made at all. The
+        # residuals at the solution are cached anyway.
+        return np.sum([f.eval(x) for f in self.functions])
+
+    def _get_state(self):
+        return {'buffer': np.array(self.buffer),
+                'lambda_': np.array(self.lambda_, dtype=float)}
+
+    def _set_state(self, state):
+        self.buffer = [np.array(x) for x in state['buffer']]
+        self.lambda_ = state['lambda_']
+
     def _post(self):
         del self.buffer, self.functions
 
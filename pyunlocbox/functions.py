@@ -28,13 +28,15 @@ inherit from it implement the methods. These classes include :
 
 from __future__ import division
 
+import logging
 from time import time
 from copy import deepcopy
 
 import numpy as np
-from scipy.optimize import minimize
 
-from pyunlocbox import operators as op
+from pyunlocbox import _log, operators as op
+
+logger = logging.getLogger(__name__)
 
 
 def _soft_threshold(z, T, handle_complex=True):
@@ -83,7 +85,40 @@ def _soft_threshold(z, T, handle_complex=True):
     return sz
 
 
-def _prox_star(func, z, T):
+def _like(a, x):
+    r"""
+    Return the array `a` with the floating point precision of the array `x`.
+
+    Combining `x` with data like measurements or weights then preserves its
+    dtype, e.g. a float32 `x` is not upcast by float64 measurements. Nothing
+    is done if `x` is not a floating point (or complex) array.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import pyunlocbox
+    >>> x = np.ones(2, dtype=np.float32)
+    >>> pyunlocbox.functions._like(np.array([1., 2.]), x).dtype
+    dtype('float32')
+    >>> pyunlocbox.functions._like(np.array([1j, 2.]), x).dtype
+    dtype('complex64')
+    >>> pyunlocbox.functions._like(np.array([1., 2.]), np.ones(2)).dtype
+    dtype('float64')
+
+    """
+    a = np.asarray(a)
+    if x.dtype.kind not in 'fc' or a.dtype == x.dtype:
+        return a
+    if a.dtype.kind == 'c':
+        dtype = np.result_type(x.dtype, np.complex64)
+    elif a.dtype.kind in 'biuf':
+        dtype = np.finfo(x.dtype).dtype  # Real type of the same precision.
+    else:
+        return a
+    return a.astype(dtype, copy=False)
+
+
+def _prox_star(func, z, T, out=None):
     r"""
     Proximity operator of the convex conjugate of a function.
 
@@ -92,7 +127,13 @@ def _prox_star(func, z, T):
     Based on the Moreau decomposition of a vector w.r.t. a convex function.
 
     """
-    return z - T * func.prox(z / T, 1 / T)
+    if out is None:
+        return z - T * func.prox(z / T, 1 / T)
+    np.divide(z, T, out=out)
+    func.prox(out, 1 / T, out=out)
+    out *= -T
+    out += z
+    return out
 
 
 class func(object):
@@ -111,7 +152,9 @@ class func(object):
         Measurements. Default is 0.
     A : function or ndarray, optional
         The forward operator. Default is the identity, :math:`A(x)=x`. If `A`
-        is an ``ndarray``, it will be converted to the operator form.
+        is an ``ndarray``, it will be converted to the operator form. A sparse
+        matrix is applied in the CSR format, converted once, in the
+        precision of `x`, and to many columns at once.
     At : function or ndarray, optional
         The adjoint operator. If `At` is an ``ndarray``, it will be converted
         to the operator form. If `A` is an ``ndarray``, default is the
@@ -145,6 +188,8 @@ class func(object):
     array([ 1,  4,  9, 16])
     >>> f.grad(x)
     array([2, 4, 6, 8])
+    >>> f.eval_grad(x)
+    (array([ 1,  4,  9, 16]), array([2, 4, 6, 8]))
     >>> f.cap(x)
     ['EVAL', 'GRAD']
 
@@ -153,41 +198,150 @@ class func(object):
     def __init__(self, y=0, A=None, At=None, tight=True, nu=1, tol=1e-3,
                  maxit=200, **kwargs):
 
-        if callable(y):
-            self.y = lambda: np.asarray(y())
-        else:
-            self.y = lambda: np.asarray(y)
+        self.y = op._constant(y)
 
         if A is None:
-            self.A = lambda x: x
+            self.A = op._identity()
         else:
             if callable(A):
                 self.A = A
             else:
                 # Transform matrix form to operator form.
-                self.A = lambda x: A.dot(x)
+                self.A = op._operator(A)
 
         if At is None:
             if A is None:
-                self.At = lambda x: x
+                self.At = op._identity()
             elif callable(A):
                 self.At = A
             else:
-                self.At = lambda x: A.T.dot(x)
+                self.At = op._operator(A, transpose=True)
         else:
             if callable(At):
                 self.At = At
             else:
-                self.At = lambda x: At.dot(x)
+                self.At = op._operator(At)
 
         self.tight = tight
         self.nu = nu
         self.tol = tol
         self.maxit = maxit
 
+        # The residual A(x) - y is only worth caching if A is not the identity.
+        self._cache_residual = A is not None
+
         # Should be initialized if called alone, updated by solve().
         self.verbosity = 'NONE'
 
+    @property
+    def verbosity(self):
+        return self._verbosity
+
+    @verbosity.setter
+    def verbosity(self, verbosity):
+        self._verbosity = verbosity
+        # Hoist the comparisons out of the methods.
+        self._verbose = verbosity in ['LOW', 'HIGH', 'ALL']
+        self._verbose_high = verbosity in ['HIGH', 'ALL']
+
+    # Quantities precomputed by prepare(), per dtype.
+    _plan = None
+
+    # Solution of the solver, whose residual is cached. See _moved().
+    _tracked = None
+    _residual_cache = None
+
+    def __setattr__(self, name, value):
+        # Assigning a parameter invalidates the precomputed quantities.
+        # Shadowing a method, e.g. to profile it, does not.
+        if name[0] != '_' and name != 'verbosity' and \
+                not callable(getattr(type(self), name, None)):
+            self.__dict__.pop('_plan', None)
+            self.__dict__.pop('_residual_cache', None)
+        super(func, self).__setattr__(name, value)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The caches are tied to a solve, not worth pickling.
+        for name in ['_plan', '_tracked', '_residual_cache']:
+            state.pop(name, None)
+        return state
+
+    def prepare(self, x0=None, dtype=None):
+        r"""
+        Precompute the quantities which do not change during a solve.
+
+        Parameters
+        ----------
+        x0 : array_like, optional
+            Starting point of the solve. The quantities are precomputed with
+            its precision.
+        dtype : data-type, optional
+            Precision of the computations, which overrides the one of `x0`.
+            Default is float64 if `x0` is not given either.
+
+        Returns
+        -------
+        self : func
+            The prepared function object.
+
+        Notes
+        -----
+        The :func:`pyunlocbox.solvers.solve` function prepares copies of the
+        functions before the iterations. For example, the L2-norm then only
+        converts its measurements and weights once, and its proximal operator
+        applies the adjoint operator `At` once instead of at each call. The
+        given functions are left as they are, such that concurrent solves do
+        not share precomputed quantities.
+
+        The precomputed quantities are discarded when an attribute is
+        assigned, e.g. ``f.lambda_ = 2``. Arrays modified in place, e.g. the
+        measurements, are however not detected: prepare the function again.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> import pyunlocbox
+        >>> y = np.array([1., 2.])
+        >>> f = pyunlocbox.functions.norm_l2(y=y, w=[1., 2.])
+        >>> f = f.prepare(np.zeros(2))
+        >>> f.prox(np.zeros(2), 1)
+        array([ 0.66666667,  1.77777778])
+        >>> y[:] = [2., 4.]
+        >>> f.prox(np.zeros(2), 1)
+        array([ 0.66666667,  1.77777778])
+        >>> f.prepare(np.zeros(2)).prox(np.zeros(2), 1)
+        array([ 1.33333333,  3.55555556])
+
+        """
+        if dtype is None:
+            dtype = float if x0 is None else np.asarray(x0).dtype
+        x = np.zeros((), dtype)  # Only carries the precision.
+        plan = dict(self._plan or {})
+        plan[x.dtype] = self._prepare(x)
+        self._plan = plan
+        return self
+
+    def _prepare(self, x):
+        plan = dict()
+        # Measurements given as a function may change between calls.
+        if isinstance(self.y, op._constant) and not callable(self.y.y):
+            plan['y'] = _like(self.y(), x)
+        return plan
+
+    def _plan_of(self, x):
+        # The quantities precomputed for the precision of x, or None.
+        return None if self._plan is None else self._plan.get(x.dtype)
+
+    def _measurements(self, x):
+        r"""
+        Return the measurements :math:`y` with the precision of `x`.
+        """
+        plan = self._plan_of(x)
+        if plan is not None and 'y' in plan:
+            return plan['y']
+        return _like(self.y(), x)
+
     def eval(self, x):
         r"""
         Function evaluation.
@@ -214,15 +368,98 @@ class func(object):
 
         """
         sol = self._eval(np.asarray(x))
-        if self.verbosity in ['LOW', 'HIGH']:
-            name = self.__class__.__name__
-            print('    {} evaluation: {:e}'.format(name, sol))
+        if _log.enabled(logger, logging.INFO, self._verbose):
+            _log.event(logger, logging.INFO, self._verbose,
+                       '    %s evaluation: %e', self.__class__.__name__, sol)
         return sol
 
     def _eval(self, x):
         raise NotImplementedError("Class user should define this method.")
 
-    def prox(self, x, T):
+    def eval_grad(self, x):
+        r"""
+        Function evaluation and gradient.
+
+        Parameters
+        ----------
+        x : array_like
+            The evaluation point. If `x` is a matrix, the function gets
+            evaluated for each column, as if it was a set of independent
+            problems. Some functions, like the nuclear norm, are only defined
+            on matrices.
+
+        Returns
+        -------
+        z : float
+            The objective function evaluated at `x`. If `x` is a matrix, the
+            sum of the objectives is returned.
+        g : ndarray
+            The objective function gradient evaluated for each column of `x`.
+
+        Notes
+        -----
+        This method is equivalent to calling :meth:`eval` and :meth:`grad`,
+        but allows functions to share computations between the two. For
+        example, the L2-norm only applies its forward operator `A` once.
+
+        """
+        x = np.asarray(x)
+        sol, grad = self._eval_grad(x)
+        grad = _like(grad, x)
+        if _log.enabled(logger, logging.INFO, self._verbose):
+            _log.event(logger, logging.INFO, self._verbose,
+                       '    %s evaluation: %e', self.__class__.__name__, sol)
+        return sol, grad
+
+    def _eval_grad(self, x):
+        return self._eval(x), self._grad(x)
+
+    def _residual(self, x):
+        r"""
+        Return the residual :math:`A(x) - y`.
+
+        The residual at the solution of the solver is cached, such that
+        evaluating a function and its gradient (or proximal operator) at the
+        same point only applies the forward operator once. The returned array
+        should not be modified.
+
+        """
+        cache = self._cache_residual and x is self._tracked
+        if cache:
+            res = self._cached_residual(x)
+            if res is not None:
+                return res
+        res = self.A(x) - self._measurements(x)
+        # Measurements given as a function may change between calls.
+        plan = self._plan_of(x)
+        if cache and plan is not None and 'y' in plan:
+            self._residual_cache = (x, res)
+        return res
+
+    def _cached_residual(self, x):
+        r"""
+        Return the cached residual at `x`, or None if there is none.
+        """
+        cache = self._residual_cache
+        if cache is not None and cache[0] is x:
+            return cache[1]
+        return None
+
+    def _moved(self, x, residual=None):
+        r"""
+        Forget the cached residual, as the solution `x` of the solver was
+        modified. The `residual` at its new value may be given if known.
+
+        The solvers call it whenever they modify their solution, i.e. the only
+        array whose residual is cached: keying the cache on its identity then
+        needs neither copies nor comparisons of arrays. The residual is only
+        cached if the function is prepared with constant measurements.
+
+        """
+        self._tracked = x
+        self._residual_cache = None if residual is None else (x, residual)
+
+    def prox(self, x, T, out=None):
         r"""
         Function proximal operator.
 
@@ -235,11 +472,16 @@ class func(object):
             on matrices.
         T : float
             The regularization parameter.
+        out : ndarray, optional
+            Array in which to write the result. It must have the shape of the
+            result and may be `x` itself. Default is None, i.e. a new array is
+            returned.
 
         Returns
         -------
         z : ndarray
-            The proximal operator evaluated for each column of `x`.
+            The proximal operator evaluated for each column of `x`. It is
+            `out` if given.
 
         Notes
         -----
@@ -257,12 +499,28 @@ class func(object):
         which may be very inefficient.
 
         """
-        return self._prox(np.asarray(x), T)
+        x = np.asarray(x)
+        if isinstance(T, np.generic):
+            T = T.item()  # A NumPy scalar may upcast float32 arrays.
+        # A method assigned to the object does not write in out.
+        if out is not None and '_prox' not in vars(self):
+            return self._prox_into(x, T, out)
+        sol = _like(self._prox(x, T), x)
+        if out is None:
+            return sol
+        out[...] = sol
+        return out
 
     def _prox(self, x, T):
         raise NotImplementedError("Class user should define this method.")
 
-    def grad(self, x):
+    def _prox_into(self, x, T, out):
+        # Classes may override it to compute the result in out, which may be
+        # x, instead of copying it there.
+        out[...] = _like(self._prox(x, T), x)
+        return out
+
+    def grad(self, x, out=None):
         r"""
         Function gradient.
 
@@ -273,56 +531,79 @@ class func(object):
             evaluated for each column, as if it was a set of independent
             problems. Some functions, like the nuclear norm, are only defined
             on matrices.
+        out : ndarray, optional
+            Array in which to write the result. It must have the shape of the
+            result and may be `x` itself. Default is None, i.e. a new array is
+            returned.
 
         Returns
         -------
         z : ndarray
             The objective function gradient evaluated for each column of `x`.
+            It is `out` if given.
 
         Notes
         -----
         This method is required by some solvers.
 
         """
-        return self._grad(np.asarray(x))
+        x = np.asarray(x)
+        # A method assigned to the object does not write in out.
+        if out is not None and '_grad' not in vars(self):
+            return self._grad_into(x, out)
+        sol = _like(self._grad(x), x)
+        if out is None:
+            return sol
+        out[...] = sol
+        return out
 
     def _grad(self, x):
         raise NotImplementedError("Class user should define this method.")
 
-    def cap(self, x):
+    def _grad_into(self, x, out):
+        # Classes may override it to compute the result in out, which may be
+        # x, instead of copying it there.
+        out[...] = _like(self._grad(x), x)
+        return out
+
+    def _lipschitz(self, x):
+        r"""
+        Return the Lipschitz constant of the gradient on the domain of `x`, or
+        None if it is unknown. Solvers use it to choose a step size.
+        """
+        return None
+
+    def cap(self, x=None):
         r"""
         Test the capabilities of the function object.
 
         Parameters
         ----------
-        x : array_like
-            The evaluation point. Not really needed, but this function calls
-            the methods of the object to test if they can properly execute
-            without raising an exception. Therefore it needs some evaluation
-            point with a consistent size.
+        x : array_like, optional
+            Not needed. The capabilities used to be tested by calling the
+            methods at this evaluation point. It is kept for backward
+            compatibility.
 
         Returns
         -------
         cap : list of string
             A list of capabilities ('EVAL', 'GRAD', 'PROX').
 
+        Notes
+        -----
+        The capabilities are the :meth:`_eval`, :meth:`_grad` and
+        :meth:`_prox` methods which are defined by the class or assigned to the
+        object. They are not executed, such that the cost of this method does
+        not depend on the cost of the proximal operator. Classes whose methods
+        are not available for some parameters should override it.
+
         """
-        tmp = self.verbosity
-        self.verbosity = 'NONE'
-        cap = ['EVAL', 'GRAD', 'PROX']
-        try:
-            self.eval(x)
-        except NotImplementedError:
-            cap.remove('EVAL')
-        try:
-            self.grad(x)
-        except NotImplementedError:
-            cap.remove('GRAD')
-        try:
-            self.prox(x, 1)
-        except NotImplementedError:
-            cap.remove('PROX')
-        self.verbosity = tmp
+        cap = []
+        for name in ['EVAL', 'GRAD', 'PROX']:
+            method = getattr(self, '_' + name.lower())
+            if getattr(method, '__func__', method) is not \
+                    func.__dict__['_' + name.lower()]:
+                cap.append(name)
         return cap
 
 
@@ -358,7 +639,10 @@ class dummy(func):
         return x
 
     def _grad(self, x):
-        return np.zeros(np.shape(x))
+        return np.zeros(np.shape(x), dtype=np.result_type(x, 1.))
+
+    def _lipschitz(self, x):
+        return 0
 
 
 class norm(func):
@@ -382,6 +666,23 @@ class norm(func):
         self.lambda_ = lambda_
         self.w = np.asarray(w)
 
+    def _prepare(self, x):
+        plan = super(norm, self)._prepare(x)
+        plan['w'] = _like(self.w, x)
+        plan['w2'] = plan['w']**2
+        return plan
+
+    def _weights(self, x, squared=False):
+        r"""
+        Return the weights :math:`w`, or their square, with the precision of
+        `x`.
+        """
+        plan = self._plan_of(x)
+        if plan is not None:
+            return plan['w2' if squared else 'w']
+        w = _like(self.w, x)
+        return w**2 if squared else w
+
 
 class norm_l1(norm):
     r"""
@@ -416,17 +717,30 @@ class norm_l1(norm):
         super(norm_l1, self).__init__(**kwargs)
 
     def _eval(self, x):
-        sol = self.A(x) - self.y()
-        return self.lambda_ * np.sum(np.abs(self.w * sol))
+        sol = self._residual(x)
+        return self.lambda_ * np.sum(np.abs(self._weights(x) * sol))
+
+    def cap(self, x=None):
+        cap = super(norm_l1, self).cap(x)
+        if not self.tight and '_prox' not in vars(self):
+            cap.remove('PROX')  # Not implemented for non-tight frames.
+        return cap
 
     def _prox(self, x, T):
+        return self._prox_into(x, T, None)
+
+    def _prox_into(self, x, T, out):
         # Gamma is T in the matlab UNLocBox implementation.
         gamma = self.lambda_ * T
         if self.tight:
             # Nati: I've checked this code the use of 'y' seems correct
-            sol = self.A(x) - self.y()
-            sol[:] = _soft_threshold(sol, gamma * self.nu * self.w) - sol
-            sol[:] = x + self.At(sol) / self.nu
+            res = self._residual(x)
+            w = self._weights(x)
+            z = _soft_threshold(res, gamma * self.nu * w) - res
+            sol = np.add(x, self.At(z) / self.nu, out=out)
+            if out is None:
+                # With the precision of the thresholding, e.g. integers.
+                sol = sol.astype(z.dtype, copy=False)
         else:
             raise NotImplementedError('Not implemented for non-tight frame.')
         return sol
@@ -449,6 +763,10 @@ class norm_l2(norm):
       \|w \cdot (A(z)-y)\|_2^2` where :math:`\gamma = \lambda \cdot T`.
     * The squared L2-norm gradient evaluated at `x` is given by
       :math:`2 \lambda \cdot At(w \cdot (A(x)-y))`.
+    * The gradient is Lipschitz continuous with constant at most
+      :math:`2 \lambda \|w\|_\infty^2 \|A\|_2^2`. The norm of `A` is
+      estimated by :func:`pyunlocbox.operators.estimate_norm` for the solvers
+      to choose a step size.
 
     Examples
     --------
@@ -469,16 +787,38 @@ class norm_l2(norm):
         super(norm_l2, self).__init__(**kwargs)
 
     def _eval(self, x):
-        sol = self.A(x) - self.y()
-        return self.lambda_ * np.sum((self.w * sol)**2)
+        sol = self._residual(x)
+        return self.lambda_ * np.sum((self._weights(x) * sol)**2)
 
     def _prox(self, x, T):
+        return self._prox_into(x, T, None)
+
+    def _prox_into(self, x, T, out):
         # Gamma is T in the matlab UNLocBox implementation.
         gamma = self.lambda_ * T
         if self.tight:
-            sol = x + 2. * gamma * self.At(self.y() * self.w**2)
-            sol /= 1. + 2. * gamma * self.nu * self.w**2
+            w2 = self._weights(x, squared=True)
+            plan = self._plan_of(x)
+            if plan is None:
+                Atyw2 = self.At(self._measurements(x) * w2)
+                denominator = 1. + 2. * gamma * self.nu * w2
+            else:
+                # A prepared function applies the adjoint at the first call
+                # and computes the denominator once per step. The entries are
+                # read once, as another thread may replace them.
+                Atyw2 = plan.get('Atyw2')
+                if Atyw2 is None:
+                    Atyw2 = self.At(self._measurements(x) * w2)
+                    plan['Atyw2'] = Atyw2
+                denominator = plan.get('denominator')
+                if denominator is None or denominator[0] != gamma:
+                    denominator = (gamma, 1. + 2. * gamma * self.nu * w2)
+                    plan['denominator'] = denominator
+                denominator = denominator[1]
+            sol = np.add(x, 2. * gamma * Atyw2, out=out)
+            sol /= denominator
         else:
+            from scipy.optimize import minimize  # Slow import, when needed.
             res = minimize(fun=lambda z: 0.5 * np.sum((z - x)**2) + gamma *
                            np.sum((self.w * (self.A(z) - self.y()))**2),
                            x0=x,
@@ -489,11 +829,29 @@ class norm_l2(norm):
                 sol = res.x
             else:
                 raise RuntimeError('norm_l2.prox: ' + res.message)
+            if out is not None:
+                out[...] = _like(sol, x)
+                sol = out
         return sol
 
     def _grad(self, x):
-        sol = self.A(x) - self.y()
-        return 2 * self.lambda_ * self.At((self.w**2) * sol)
+        return self._grad_into(x, None)
+
+    def _grad_into(self, x, out):
+        sol = self._residual(x)
+        w2 = self._weights(x, squared=True)
+        return np.multiply(self.At(w2 * sol), 2 * self.lambda_, out=out)
+
+    def _eval_grad(self, x):
+        sol = self._residual(x)
+        w, w2 = self._weights(x), self._weights(x, squared=True)
+        return (self.lambda_ * np.sum((w * sol)**2),
+                2 * self.lambda_ * self.At(w2 * sol))
+
+    def _lipschitz(self, x):
+        # Bound 2 lambda |w|^2 |A|^2, with an estimate of the operator norm.
+        w2 = np.max(np.abs(self.w))**2
+        return 2 * self.lambda_ * w2 * op.estimate_norm(self.A, self.At, x)**2
 
 
 class norm_nuclear(norm):
@@ -509,10 +867,13 @@ class norm_nuclear(norm):
     * The nuclear-norm of the matrix `x` is given by
       :math:`\lambda \| x \|_* = \lambda \operatorname{trace} (\sqrt{x^* x}) =
       \lambda \sum_{i=1}^N |e_i|` where `e_i` are the eigenvalues of `x`.
+      It is applied to :math:`A(x)-y`, where `A` may be a sparse matrix
+      applied to the columns of `x`.
     * The nuclear-norm proximal operator evaluated at `x` is given by
       :math:`\operatorname{arg\,min}\limits_z \frac{1}{2} \|x-z\|_2^2 + \gamma
-      \| x \|_*` where :math:`\gamma = \lambda \cdot T`, which is a
-      soft-thresholding of the eigenvalues.
+      \| A(z)-y \|_*` where :math:`\gamma = \lambda \cdot T`, which is a
+      soft-thresholding of the eigenvalues. It is only implemented for tight
+      frames.
 
     Examples
     --------
@@ -531,18 +892,25 @@ class norm_nuclear(norm):
         super(norm_nuclear, self).__init__(**kwargs)
 
     def _eval(self, x):
-        # TODO: take care of sparse matrices.
-        _, s, _ = np.linalg.svd(x)
+        s = np.linalg.svd(self._residual(x), compute_uv=False)
         return self.lambda_ * np.sum(np.abs(s))
 
+    def cap(self, x=None):
+        cap = super(norm_nuclear, self).cap(x)
+        if not self.tight and '_prox' not in vars(self):
+            cap.remove('PROX')  # Not implemented for non-tight frames.
+        return cap
+
     def _prox(self, x, T):
         # Gamma is T in the matlab UNLocBox implementation.
         gamma = self.lambda_ * T
-        # TODO: take care of sparse matrices.
-        U, s, V = np.linalg.svd(x)
-        s = _soft_threshold(s, gamma)
-        S = np.diag(s)
-        return np.dot(U, np.dot(S, V))
+        if not self.tight:
+            raise NotImplementedError('Not implemented for non-tight frame.')
+        res = self._residual(x)
+        U, s, V = np.linalg.svd(res, full_matrices=False)
+        s = _soft_threshold(s, gamma * self.nu)
+        sol = np.dot(U * s, V) - res
+        return x + self.At(sol) / self.nu
 
 
 class norm_tv(norm):
@@ -659,8 +1027,9 @@ class norm_tv(norm):
         elif self.dim == 4:
             mt = np.maximum(np.maximum(wx, wy), np.maximum(wz, wt))
 
-        if self.verbosity in ['LOW', 'HIGH', 'ALL']:
-            print("Proximal TV Operator")
+        _log.event(logger, logging.INFO, self._verbose,
+                   'Proximal TV Operator')
+        debug = _log.enabled(logger, logging.DEBUG, self._verbose_high)
 
         iter = 0
         while iter <= maxit:
@@ -680,8 +1049,10 @@ class norm_tv(norm):
             rel_obj = np.abs(obj - prev_obj) / obj
             prev_obj = obj
 
-            if self.verbosity in ['HIGH', 'ALL']:
-                print("Iter: ", iter, " obj = ", obj, " rel_obj = ", rel_obj)
+            if debug:
+                _log.event(logger, logging.DEBUG, self._verbose_high,
+                           'Iter:  %s  obj =  %s  rel_obj =  %s', iter, obj,
+                           rel_obj)
 
             # Stopping criterion
             if rel_obj < tol:
@@ -759,10 +1130,12 @@ class norm_tv(norm):
         t_end = time()
         exec_time = t_end - t_init
 
-        if self.verbosity in ['HIGH', 'ALL']:
-            print("Prox_TV: obj = {0}, rel_obj = {1}, {2}, iter = {3}".format(
-                obj, rel_obj, crit, iter))
-            print("exec_time = ", exec_time)
+        if debug:
+            _log.event(logger, logging.DEBUG, self._verbose_high,
+                       'Prox_TV: obj = %s, rel_obj = %s, %s, iter = %s', obj,
+                       rel_obj, crit, iter)
+            _log.event(logger, logging.DEBUG, self._verbose_high,
+                       'exec_time =  %s', exec_time)
         return sol
 
 
@@ -850,7 +1223,7 @@ class proj_b2(proj):
 
         # Tight frame.
         if self.tight:
-            tmp1 = self.A(x) - self.y()
+            tmp1 = self._residual(x)
             with np.errstate(divide='ignore', invalid='ignore'):
                 # Avoid 'division by zero' warning
                 scale = self.epsilon / np.sqrt(np.sum(tmp1 * tmp1, axis=0))
@@ -864,7 +1237,8 @@ class proj_b2(proj):
 
             # Initialization.
             sol = x
-            u = np.zeros(np.shape(self.y()))
+            y = self._measurements(x)
+            u = np.zeros(np.shape(y), dtype=np.result_type(y, 1.))
             if self.method is 'FISTA':
                 v_last = u
                 t_last = 1.
@@ -876,23 +1250,25 @@ class proj_b2(proj):
             epsilon_up = self.epsilon / (1. - self.tol)
 
             # Check if we are already in the L2-ball.
-            norm_res = np.linalg.norm(self.y() - self.A(sol), 2)
+            norm_res = np.linalg.norm(y - self.A(sol), 2)
             if norm_res <= epsilon_up:
                 crit = 'INBALL'
 
             # Projection onto the L2-ball
+            debug = _log.enabled(logger, logging.DEBUG, self._verbose_high)
             while not crit:
 
                 niter += 1
 
                 # Residual.
-                res = self.A(sol) - self.y()
+                res = self.A(sol) - y
                 norm_res = np.linalg.norm(res, 2)
 
-                if self.verbosity is 'HIGH':
-                    print('    proj_b2 iteration {:3d}: epsilon = {:.2e}, '
-                          '||y-A(z)||_2 = {:.2e}'.format(niter, self.epsilon,
-                                                         norm_res))
+                if debug:
+                    _log.event(logger, logging.DEBUG, self._verbose_high,
+                               '    proj_b2 iteration %3d: epsilon = %.2e, '
+                               '||y-A(z)||_2 = %.2e', niter, self.epsilon,
+                               norm_res)
 
                 # Scaling for projection.
                 res += u * self.nu
@@ -918,10 +1294,11 @@ class proj_b2(proj):
                 elif niter >= self.maxit:
                     crit = 'MAXIT'
 
-            if self.verbosity in ['LOW', 'HIGH']:
+            if _log.enabled(logger, logging.INFO, self._verbose):
                 norm_res = np.linalg.norm(self.y() - self.A(sol), 2)
-                print('    proj_b2: epsilon = {:.2e}, ||y-A(z)||_2 = {:.2e}, '
-                      '{}, niter = {}'.format(self.epsilon, norm_res, crit,
-                                              niter))
+                _log.event(logger, logging.INFO, self._verbose,
+                           '    proj_b2: epsilon = %.2e, ||y-A(z)||_2 = %.2e, '
+                           '%s, niter = %s', self.epsilon, norm_res, crit,
+                           niter)
 
         return sol
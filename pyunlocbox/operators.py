@@ -8,8 +8,16 @@ This module implements operators functions :
 
 * :meth:`div` Divergence function for up to 4 dimensions
 
+* :class:`shared` Matrix shared by the operators of many processes
+
+* :func:`estimate_norm` Estimate of the norm of an operator
+
 """
 
+import sys
+import threading
+import weakref
+
 import numpy as np
 
 
@@ -42,33 +50,37 @@ def grad(x, dim=2, **kwargs):
 
     """
 
+    # Keep the floating point precision of x.
+    dtype = np.result_type(x, 1.)
+
     axis = 0
     while axis < len(x.shape):
         if axis >= 0:
             try:
                 zero_dx = np.zeros((np.append(np.shape(zero_dx),
-                                              np.shape(x)[axis])))
+                                              np.shape(x)[axis])), dtype=dtype)
             except NameError:
-                zero_dx = np.zeros((1))
+                zero_dx = np.zeros((1), dtype=dtype)
         if axis >= 1:
             try:
                 zero_dy = np.zeros((np.append(np.shape(zero_dy),
-                                              np.shape(x)[axis])))
+                                              np.shape(x)[axis])), dtype=dtype)
             except NameError:
-                zero_dy = np.zeros((np.shape(x)[0], 1))
+                zero_dy = np.zeros((np.shape(x)[0], 1), dtype=dtype)
         if axis >= 2:
             try:
                 zero_dz = np.zeros((np.append(np.shape(zero_dz),
-                                              np.shape(x)[axis])))
+                                              np.shape(x)[axis])), dtype=dtype)
             except NameError:
-                zero_dz = np.zeros((np.shape(x)[0], np.shape(x)[1], 1))
+                zero_dz = np.zeros((np.shape(x)[0], np.shape(x)[1], 1),
+                                   dtype=dtype)
         if axis >= 3:
             try:
                 zero_dt = np.zeros((np.append(np.shape(zero_dt),
-                                              np.shape(x)[axis])))
+                                              np.shape(x)[axis])), dtype=dtype)
             except NameError:
                 zero_dt = np.zeros((np.shape(x)[0], np.shape(x)[1],
-                                    np.shape(x)[2], 1))
+                                    np.shape(x)[2], 1), dtype=dtype)
         axis += 1
 
     if dim >= 1:
@@ -193,3 +205,471 @@ def div(*args, **kwargs):
                              -np.expand_dims(dt[:, :, :, -2, ], axis=3)),
                             axis=3)
     return x
+
+
+class shared(object):
+    r"""
+    Matrix stored in shared memory or in a memory-mapped file, to be shared
+    by the operators of many worker processes.
+
+    Give it to functions as `A` or `At`, or to primal-dual solvers as `L` or
+    `Lt`, in place of the matrix. Once pickled to be sent to a worker, only
+    the location of the matrix is sent, and the worker's operators are views
+    of the same memory. The memory used thus does not grow with the number of
+    workers.
+
+    Parameters
+    ----------
+    A : ndarray or sparse matrix
+        The matrix, which is copied once. Sparse matrices are stored in the
+        CSR format, and their transpose is applied as a CSC view of it. The
+        operators compute the products in the precision of the matrix, then
+        convert them to the one of their input, such that no process converts
+        nor copies the matrix.
+    path : str, optional
+        Prefix of the ``.npy`` files where the arrays are stored and
+        memory-mapped. Default is None, i.e. a block of shared memory, which
+        needs Python 3.8 or later.
+
+    Attributes
+    ----------
+    matrix : ndarray or scipy.sparse.csr_matrix
+        The matrix, as a read-only view of the shared memory.
+
+    Notes
+    -----
+    The memory is freed (and the files kept) once the object which created
+    it is closed or garbage collected. The processes which received it
+    should have finished using it by then. Processes created by fork inherit
+    the memory anyway: there is no need to share it with them.
+
+    Examples
+    --------
+    >>> import pickle
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, operators
+    >>> A = operators.shared(np.arange(6.).reshape(3, 2))
+    >>> f = functions.norm_l2(A=A, y=[1, 2, 3])
+    >>> f.eval([1, 1])
+    45.0
+    >>> len(pickle.dumps(f)) < 1000
+    True
+    >>> A.close()
+
+    """
+
+    def __init__(self, A, path=None):
+        from scipy import sparse
+        if sparse.issparse(A):
+            A = sparse.csr_matrix(A)
+            arrays = {'data': A.data, 'indices': A.indices,
+                      'indptr': A.indptr}
+            self._spec = {'format': 'csr', 'shape': A.shape}
+        else:
+            A = np.asarray(A)
+            arrays = {'A': A}
+            self._spec = {'format': 'dense', 'shape': A.shape}
+        self._spec['path'] = path
+        self._spec['arrays'] = dict()
+        self._memory = []
+        views = dict()
+        for name, array in arrays.items():
+            if path is None:
+                from multiprocessing import shared_memory
+                memory = shared_memory.SharedMemory(
+                    create=True, size=max(array.nbytes, 1))
+                location = memory.name
+                self._memory.append(memory)
+                view = np.ndarray(array.shape, array.dtype, memory.buf)
+            else:
+                location = '{}.{}.npy'.format(path, name)
+                view = np.lib.format.open_memmap(location, 'w+', array.dtype,
+                                                 array.shape)
+            view[...] = array
+            views[name] = view
+            self._spec['arrays'][name] = (location, array.shape, array.dtype)
+        self._build(views)
+        # Free the shared memory when the creator is collected.
+        self._finalizer = weakref.finalize(self, _unlink, list(self._memory))
+
+    @classmethod
+    def _attach(cls, spec):
+        self = cls.__new__(cls)
+        self._spec = spec
+        self._memory = []
+        views = dict()
+        for name, (location, shape, dtype) in spec['arrays'].items():
+            if spec['path'] is None:
+                from multiprocessing import shared_memory
+                try:
+                    # Only the creator should track the memory (Python 3.13).
+                    memory = shared_memory.SharedMemory(location, track=False)
+                except TypeError:
+                    memory = shared_memory.SharedMemory(location)
+                self._memory.append(memory)
+                views[name] = np.ndarray(shape, dtype, memory.buf)
+            else:
+                views[name] = np.load(location, mmap_mode='r')
+        self._build(views)
+        self._finalizer = None
+        return self
+
+    def _build(self, views):
+        for view in views.values():
+            view.flags.writeable = False
+        if self._spec['format'] == 'csr':
+            from scipy import sparse
+            arrays = (views['data'], views['indices'], views['indptr'])
+            self.matrix = sparse.csr_matrix(arrays, self._spec['shape'],
+                                            copy=False)
+        else:
+            self.matrix = views['A']
+        # A view of the same memory, in the CSC format if sparse.
+        self._transpose = self.matrix.T
+
+    def __reduce__(self):
+        return (shared._attach, (self._spec,))
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def dtype(self):
+        return self.matrix.dtype
+
+    @property
+    def T(self):
+        return self._transpose
+
+    def dot(self, x):
+        return self.matrix.dot(x)
+
+    def close(self):
+        r"""
+        Release the memory. The creator also frees it.
+        """
+        del self.matrix, self._transpose
+        for memory in self._memory:
+            memory.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _unlink(memory):
+    for block in memory:
+        block.unlink()
+
+
+class _cache(object):
+    r"""
+    Caches attached to objects by their identity, which are dropped with the
+    objects. Unlike a :class:`weakref.WeakKeyDictionary`, the objects need not
+    be hashable, e.g. arrays and sparse matrices.
+
+    """
+
+    def __init__(self):
+        self._entries = dict()
+        self._lock = threading.RLock()  # Objects may die while it is held.
+
+    def get(self, obj):
+        r"""
+        Return the dictionary cached for `obj`, or None if it cannot be
+        weakly referenced.
+        """
+        key = id(obj)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is obj:
+                return entry[1]
+            try:
+                ref = weakref.ref(obj, lambda ref: self._drop(key, ref))
+            except TypeError:
+                return None
+            self._entries[key] = (ref, dict())
+            return self._entries[key][1]
+
+    def _drop(self, key, ref):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Estimated norms, per operator and then per adjoint, shape and dtype.
+_norms = _cache()
+
+
+def _norm_key(A):
+    # Functions and solvers wrap a matrix in their own operator objects.
+    return A.A if isinstance(A, _matrix) else A
+
+
+def estimate_norm(A, At=None, x0=None, tol=1e-4, maxit=100):
+    r"""
+    Estimate the norm of a linear operator, i.e. its largest singular value
+    :math:`\|A\|_2`.
+
+    The Lanczos method is applied to :math:`A^* A`, which only needs the
+    operator and its adjoint in operator form. It converges in a few dozen
+    applications of each, much faster than power iterations, and costs much
+    less than a dense product :math:`A^T A`.
+
+    Parameters
+    ----------
+    A : function or ndarray
+        The operator. If `A` is an ``ndarray`` (or a sparse or
+        :class:`shared` matrix), it will be converted to the operator form.
+    At : function or ndarray, optional
+        The adjoint operator. If `A` is an ``ndarray``, default is the
+        transpose of `A`, which is only the adjoint of a real matrix. If `A`
+        is a function, default is `A`, :math:`At(x)=A(x)`.
+    x0 : array_like, optional
+        A point in the domain of `A`, which gives the shape and dtype of the
+        iterates. Needed if `A` is a function. Default is a vector of the
+        number of columns of the matrix `A`.
+    tol : float, optional
+        Stop when the relative change of the estimate of
+        :math:`\|A\|_2^2` is smaller. Default is 1e-4.
+    maxit : int, optional
+        The maximum number of iterations. Default is 100.
+
+    Returns
+    -------
+    norm : float
+        The estimated norm. It converges from below to :math:`\|A\|_2`, such
+        that the solvers take a margin on the step sizes computed from it.
+
+    Notes
+    -----
+    The estimates are cached per operator, adjoint, shape and dtype of `x0`
+    for as long as the operator exists. A matrix is the same operator in
+    whatever function or solver it is given to. As they are keyed by their
+    identity, the operators should not be modified in place.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyunlocbox import operators
+    >>> A = np.diag([1., 2., 3., 4.])
+    >>> '{:.4f}'.format(operators.estimate_norm(A))
+    '4.0000'
+    >>> A = lambda x: 2 * x
+    >>> '{:.4f}'.format(operators.estimate_norm(A, x0=np.zeros(10)))
+    '2.0000'
+
+    """
+    if isinstance(A, _identity):
+        return 1.
+    if not callable(A):
+        if At is None:
+            At = _operator(A, transpose=True)
+        if x0 is None:
+            x0 = np.zeros(A.shape[1], dtype=A.dtype)
+        A = _operator(A)
+    elif At is None:
+        At = A
+    if not callable(At):
+        At = _operator(At)
+    if x0 is None:
+        raise ValueError('A starting point x0 is needed for an operator '
+                         'given as a function.')
+    x0 = np.asarray(x0)
+    dtype = np.result_type(x0, 1.)
+
+    adjoint = _norm_key(At)
+    key = (id(adjoint), x0.shape, dtype.str)
+    cache = _norms.get(_norm_key(A))
+    cached = None if cache is None else cache.get(key)
+    if cached is not None and cached[0]() is adjoint:
+        return cached[1]
+
+    # Lanczos iterations on At(A(x)), from a reproducible starting point.
+    rs = np.random.RandomState(0)
+    q = rs.standard_normal(x0.shape).astype(dtype)
+    if dtype.kind == 'c':
+        q = q + 1j * rs.standard_normal(x0.shape)
+    q /= np.linalg.norm(q)
+    q_last = np.zeros_like(q)
+    alphas, betas = [], []
+    beta = 0.
+    estimate = 0.
+    for _ in range(maxit):
+        w = np.asarray(At(A(q))).reshape(q.shape)
+        alpha = np.real(np.vdot(q, w))
+        w = w - alpha * q - beta * q_last
+        beta = np.linalg.norm(w)
+        alphas.append(alpha)
+        # Largest eigenvalue of the tridiagonal matrix of the iterations.
+        T = np.diag(alphas)
+        if betas:
+            T += np.diag(betas, 1) + np.diag(betas, -1)
+        last = estimate
+        estimate = np.linalg.eigvalsh(T)[-1]
+        # Stop if converged or if an invariant subspace is found.
+        if (abs(estimate - last) <= tol * estimate or
+                beta <= np.finfo(dtype).eps * max(estimate, 1.)):
+            break
+        betas.append(beta)
+        q_last, q = q, w / beta
+    norm = float(np.sqrt(max(estimate, 0.)))
+
+    if cache is not None:
+        try:
+            # Not a strong reference, which could be to the operator itself.
+            cache[key] = (weakref.ref(adjoint), norm)
+        except TypeError:
+            pass
+    return norm
+
+
+class _identity(object):
+    r"""
+    Identity operator, :math:`x \mapsto x`.
+
+    Functions and solvers store their operators as objects of this module
+    instead of lambdas, such that they can be pickled, e.g. to be sent to
+    worker processes.
+
+    """
+
+    def __call__(self, x):
+        return x
+
+
+class _matrix(object):
+    r"""
+    Operator form of a matrix, :math:`x \mapsto Ax`, or of its transpose,
+    :math:`x \mapsto A^T x`.
+
+    The matrix is kept as is, such that pickling it with the protocol 5
+    passes its buffer out-of-band.
+
+    """
+
+    def __init__(self, A, transpose=False):
+        self.A = A
+        self.transpose = transpose
+
+    def __call__(self, x):
+        A = self.A.T if self.transpose else self.A
+        return A.dot(x)
+
+
+# Matrices in the CSR format, per sparse matrix and then per transposition
+# and dtype.
+_csr = _cache()
+
+
+def _issparse(A):
+    # A sparse matrix cannot exist if SciPy's sparse module is not loaded.
+    sparse = sys.modules.get('scipy.sparse')
+    return sparse is not None and sparse.issparse(A)
+
+
+def _operator(A, transpose=False):
+    r"""
+    Return the operator form of a dense or sparse matrix, or of its
+    transpose.
+    """
+    matrix = A.matrix if isinstance(A, shared) else A
+    if _issparse(matrix):
+        return _sparse(A, transpose)
+    return _matrix(A, transpose)
+
+
+class _sparse(_matrix):
+    r"""
+    Operator form of a sparse matrix, :math:`x \mapsto Ax`, or of its
+    transpose, :math:`x \mapsto A^T x`.
+
+    The products are computed in the CSR format, which is the fastest for a
+    vector, and on all the columns (right-hand sides) of `x` at once. The
+    matrix is thus converted to CSR (if it is not) for the forward operator,
+    and its transpose for the adjoint. The conversions are done on first
+    use, once per matrix, and are shared by all its operators. The same is
+    done for the data type of `x`, such that the products keep its floating
+    point precision, e.g. float32, and move less memory. Only the values are
+    converted: the indices are shared with the CSR matrix.
+
+    As they are keyed by the identity of the matrix, it should not be
+    modified in place once used. A :class:`shared` matrix is kept as is, to
+    be pickled by reference. It is not converted, as the conversions would
+    be made by each process: the products are computed with its views of the
+    shared memory, and only their result is converted.
+
+    """
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        if isinstance(self.A, shared):
+            A = self.A.T if self.transpose else self.A.matrix
+            sol = A.dot(x)
+            precision = _precision(A, x.dtype)
+            if precision is not None:
+                sol = sol.astype(np.result_type(precision, x.dtype),
+                                 copy=False)
+            return sol
+        return _csr_of(self.A, self.transpose, x.dtype).dot(x)
+
+
+def _precision(A, dtype):
+    r"""
+    Return the precision of `dtype`, real or complex as the matrix `A`, or
+    None if it is the one of `A` or if `dtype` is not a floating point type.
+    """
+    if dtype.kind not in 'fc':
+        return None
+    if A.dtype.kind == 'c':
+        precision = np.result_type(dtype, np.complex64)
+    else:
+        precision = np.finfo(dtype).dtype
+    return None if precision == A.dtype else precision
+
+
+def _csr_of(A, transpose, dtype):
+    r"""
+    Return the sparse matrix `A` (or its transpose) in the CSR format, with
+    the floating point precision of `dtype`.
+    """
+    key = (transpose, _precision(A, dtype))
+    cache = _csr.get(A)
+    M = None if cache is None else cache.get(key)
+    if M is not None:
+        return M
+    if key[1] is None:
+        M = A.T if transpose else A
+        if M.format == 'csr':
+            return M  # Not cached, as it may be the matrix itself.
+        M = M.tocsr()
+    else:
+        M = _csr_of(A, transpose, A.dtype)
+        M = type(M)((M.data.astype(key[1]), M.indices, M.indptr),
+                    shape=M.shape, copy=False)
+    return M if cache is None else cache.setdefault(key, M)
+
+
+class _constant(object):
+    r"""
+    Constant, e.g. measurements, as an array. It can be given as a function
+    which is called each time.
+
+    """
+
+    def __init__(self, y):
+        self.y = y
+
+    def __call__(self):
+        y = self.y() if callable(self.y) else self.y
+        return np.asarray(y)
@@ -3,9 +3,16 @@
 r"""
 This module implements solver objects who minimize an objective function. Call
 :func:`solve` to solve your convex optimization problem using your instantiated
-solver and functions objects. The :class:`solver` base class defines the
-interface of all solver objects. The specialized solver objects inherit from
-it and implement the class methods. The following solvers are included :
+solver and functions objects, or iterate over :func:`solve_iter` to monitor and
+control the iterations. Call :func:`solve_path` to solve a problem for many
+values of a regularization parameter, and :func:`solve_many` to solve many
+independent problems with a pool of processes. Await :func:`solve_async` to
+solve without blocking an asyncio event loop. Create a :class:`problem` to
+solve the same problem for many measurements with a minimal overhead. The
+:class:`solver` base
+class defines the interface of all solver objects. The specialized solver
+objects inherit from it and implement the class methods. The following
+solvers are included :
 
 * :class:`gradient_descent`: Gradient descent algorithm.
 * :class:`forward_backward`: Forward-backward proximal splitting algorithm.
@@ -20,16 +27,94 @@ it and implement the class methods. The following solvers are included :
 
 """
 
+import collections
+import copy
+import logging
+import os
+import sys
+import threading
 import time
 
 import numpy as np
 
-from pyunlocbox.functions import dummy, _prox_star
-from pyunlocbox import acceleration
+from pyunlocbox.functions import dummy, proj, _prox_star
+from pyunlocbox import _log, acceleration, operators
+
+logger = logging.getLogger(__name__)
+
+
+def _always_zero(f):
+    r"""
+    Tell if a function object evaluates to zero by definition.
+
+    Indicator functions (projections) and the dummy function always evaluate
+    to zero, unless their evaluation is overridden, by a subclass or by the
+    user.
+
+    """
+    method = type(f)._eval
+    return '_eval' not in vars(f) and getattr(method, '__func__', method) in \
+        (dummy.__dict__['_eval'], proj.__dict__['_eval'])
+
+
+def _empty(x):
+    r"""
+    Allocate an array to store intermediate results computed from `x`.
+
+    Solvers allocate such workspaces once in :meth:`solver._pre` such that
+    their iterations do not allocate memory. The data type is the one of the
+    operations between `x` and a float, e.g. float64 for integer input.
+
+    """
+    return np.empty(np.shape(x), dtype=np.result_type(x, 1.))
+
+
+def _gradient(functions, x, out, tmp):
+    r"""
+    Write the sum of the gradients of the functions at `x` in `out`.
+
+    The gradient of the first function is computed in `out`, and the others
+    in the workspace `tmp`, such that no array is allocated to hold them.
+
+    """
+    if not functions:
+        out.fill(0)
+        return out
+    functions[0].grad(x, out=out)
+    for f in functions[1:]:
+        out += f.grad(x, out=tmp)
+    return out
+
+
+def _lipschitz(functions, x0):
+    r"""
+    Return the Lipschitz constant of the gradient of the sum of the functions,
+    or None if it is unknown for one of them.
+    """
+    beta = 0
+    for f in functions:
+        b = f._lipschitz(x0)
+        if b is None:
+            return None
+        beta += b
+    return beta
+
+
+def _gradient_step(functions, x0):
+    r"""
+    Return the step size :math:`\frac{0.99}{\beta}` of a gradient step on
+    the sum of the functions, or 1 if :math:`\beta` is unknown (or zero).
+    The margin keeps the step below the stability bound, as the norms of the
+    operators are estimated from below.
+    """
+    beta = _lipschitz(functions, x0)
+    return 0.99 / beta if beta else 1.
 
 
 def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
-          xtol=None, maxit=200, verbosity='LOW'):
+          xtol=None, maxit=200, verbosity='LOW', evaluate=1, history=None,
+          checkpoint=None, checkpoint_every=100, resume=None, maxtime=None,
+          profile=False, trace=None, divtol=None, retries=0):
     r"""
     Solve an optimization problem whose objective function is the sum of some
     convex functions.
@@ -51,19 +136,28 @@ def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
         :meth:`pyunlocbox.functions.func.prox` methods are required by some
         solvers. Note also that some solvers can only handle two convex
         functions while others may handle more. Please refer to the
-        documentation of the considered solver.
+        documentation of the considered solver. Neither the list nor the
+        functions are modified: the state of the run, e.g. the quantities
+        precomputed by :meth:`pyunlocbox.functions.func.prepare`, is held by
+        copies of the functions. They can thus be shared by concurrent
+        solves, e.g. from a thread pool.
     x0 : array_like
         Starting point of the algorithm, :math:`x_0 \in \mathbb{R}^{n \times
         N}`. Note that if you pass a numpy array it will be modified in place
         during execution to save memory. It will then contain the solution. Be
         careful to pass data of the type (int, float32, float64) you want your
-        computations to use.
+        computations to use. The solvers, functions and acceleration schemes
+        preserve the floating point precision of `x0`, even if measurements or
+        weights are float64. Operators given as matrices should however have
+        the dtype of `x0`, as they are applied as such.
     solver : solver class instance, optional
         The solver algorithm. It is an object who must inherit from
         :class:`pyunlocbox.solvers.solver` and implement the :meth:`_pre`,
         :meth:`_algo` and :meth:`_post` methods. If no solver object are
         provided, a standard one will be chosen given the number of convex
-        function objects and their implemented methods.
+        function objects and their implemented methods. The state of the run
+        is held by a copy of the solver and its acceleration scheme, such that
+        one solver can serve concurrent solves.
     atol : float, optional
         The absolute tolerance stopping criterion. The algorithm stops when
         :math:`f(x^t) < atol` where :math:`f(x^t)` is the objective function at
@@ -86,6 +180,75 @@ def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
         convergence, ``'HIGH'`` for info at all solving steps, ``'ALL'`` for
         all possible outputs, including at each steps of the proximal operators
         computation. Default is ``'LOW'``.
+    evaluate : int or {'AUTO', 'NEVER'}, optional
+        When to evaluate the objective function. An integer :math:`k` evaluates
+        it every :math:`k` iterations, such that the `atol`, `dtol` and `rtol`
+        stopping criteria are only verified every :math:`k` iterations and
+        compare the last two evaluations. ``'AUTO'`` evaluates it at each
+        iteration if one of those criteria is set and never otherwise.
+        ``'NEVER'`` does not evaluate it at all and cannot be used with those
+        criteria. Except for ``'NEVER'``, the objective function is always
+        evaluated at the returned solution. Functions which evaluate to zero
+        by definition, like projections, are never evaluated. Default is 1.
+    history : int, optional
+        Number of evaluations of the objective function to keep, at least 2.
+        Only the last ones are returned in `objective` and `evaluated`, such
+        that the memory used by long runs is bounded. Default is None, which
+        keeps them all.
+    checkpoint : str, optional
+        Path of a file where the state needed to resume the iterations is
+        saved every `checkpoint_every` iterations, in the NumPy ``.npz``
+        format. The file is written by a background thread and replaced
+        atomically, such that a crash leaves the previous checkpoint intact.
+        Default is None, which does not save checkpoints.
+    checkpoint_every : int, optional
+        Number of iterations between two checkpoints. Default is 100.
+    resume : str or dict, optional
+        Checkpoint file, or mapping loaded from it, from which to resume the
+        iterations. The functions, solver and parameters should be the same as
+        for the interrupted run, which is then continued exactly. The
+        iteration count, thus `maxit`, continues from the checkpoint. Default
+        is None.
+    maxtime : float, optional
+        The time budget in seconds. The algorithm stops before an iteration
+        which is predicted to end after the budget, from a moving average of
+        the previous iterations' durations. It then returns the iterate with
+        the smallest evaluation of the objective function, whose evaluation is
+        the last one in `objective` (recorded at the last iteration), or the
+        last iterate if the objective function is not evaluated. If `maxit`
+        is reached at the same iteration, it takes precedence: the stopping
+        criterion is ``'MAXIT'`` and the last iterate is returned. Default is
+        None.
+    profile : bool, optional
+        Count the calls and measure the time spent in the functions' methods,
+        the acceleration scheme and the solver, and return them as `profile`.
+        Default is False, which adds no overhead.
+    trace : str or :class:`pyunlocbox.trace.sink`, optional
+        Record a trace of the iterations for offline analysis: their wall
+        time, the evaluations of the functions, the step sizes, the events of
+        the acceleration scheme, and optionally the iterates. A path ending in
+        ``.jsonl`` or ``.npz`` is written as a :class:`pyunlocbox.trace.jsonl`
+        or :class:`pyunlocbox.trace.npz` trace, which do not record the
+        iterates. See :mod:`pyunlocbox.trace` for the other options and for
+        the analysis. Default is None, which records nothing.
+    divtol : float, optional
+        Stop when the objective function grows beyond :math:`f^* + divtol
+        \max(|f^*|, \delta)`, where :math:`f^*` is its smallest evaluation
+        and :math:`\delta` its first increase after :math:`f^*`. The
+        algorithm also stops when it oscillates, i.e. when the last 10
+        evaluations alternately increased and decreased, without a new
+        minimum nor a damping of the oscillation. The stopping criterion is
+        then ``'DIVERGED'``, as when the iterates or the evaluations of the
+        objective function are not finite, which is always checked. Default
+        is None, which only checks the latter.
+    retries : int, optional
+        When the algorithm diverges, restart it at most `retries` times from
+        the iterate with the smallest evaluation of the objective function,
+        with half the step size. The solver and the acceleration scheme are
+        reset at that iterate, as by :meth:`solver.reset`, and a copy of it is
+        kept in memory. The iteration count continues. If `divtol` is None,
+        only the non-finite iterates and evaluations are detected. Default
+        is 0.
 
     Returns
     -------
@@ -93,14 +256,29 @@ def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
         The problem solution.
     solver : str
         The used solver.
-    crit : {'ATOL', 'DTOL', 'RTOL', 'XTOL', 'MAXIT'}
+    crit : {'ATOL', 'DTOL', 'RTOL', 'XTOL', 'MAXIT', 'MAXTIME', 'DIVERGED'}
         The used stopping criterion. See above for definitions.
     niter : int
         The number of iterations.
     time : float
         The execution time in seconds.
+    durations : ndarray
+        The duration of each iteration in seconds. Only the last `history`
+        ones are kept.
     objective : ndarray
-        The successive evaluations of the objective function at each iteration.
+        The successive evaluations of the objective function, one row per
+        evaluation and one column per function.
+    evaluated : ndarray
+        The iterations at which the objective function was evaluated, i.e. one
+        for each entry of `objective`. Iteration 0 is the starting point.
+    profile : dict
+        Only if `profile` is True. The number of calls and the cumulative time
+        in seconds, as ``{'calls': int, 'time': float}``, keyed by method:
+        ``'norm_l2.eval'``, ``'fista.update_sol'``, ``'mlfbf._algo'``,
+        etc. Functions of the same class are distinguished by their index, as
+        in ``'norm_l1[0].prox'``. ``'solve.loop'`` is the time spent in the
+        iterations outside the solver's ``algo()``, i.e. evaluating the
+        objective function and verifying the stopping criteria.
 
     Examples
     --------
@@ -118,28 +296,23 @@ def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
     >>> ret = pyunlocbox.solvers.solve([f], x0, atol=1e-2, verbosity='ALL')
     INFO: Dummy objective function added.
     INFO: Selected solver: forward_backward
-        norm_l2 evaluation: 1.260000e+02
-        dummy evaluation: 0.000000e+00
     INFO: Forward-backward method
+    INFO: Step size chosen: 1.000000e+00
+        norm_l2 evaluation: 1.260000e+02
     Iteration 1 of forward_backward:
         norm_l2 evaluation: 1.400000e+01
-        dummy evaluation: 0.000000e+00
         objective = 1.40e+01
     Iteration 2 of forward_backward:
         norm_l2 evaluation: 2.963739e-01
-        dummy evaluation: 0.000000e+00
         objective = 2.96e-01
     Iteration 3 of forward_backward:
         norm_l2 evaluation: 7.902529e-02
-        dummy evaluation: 0.000000e+00
         objective = 7.90e-02
     Iteration 4 of forward_backward:
         norm_l2 evaluation: 5.752265e-02
-        dummy evaluation: 0.000000e+00
         objective = 5.75e-02
     Iteration 5 of forward_backward:
         norm_l2 evaluation: 5.142032e-03
-        dummy evaluation: 0.000000e+00
         objective = 5.14e-03
     Solution found after 5 iterations:
         objective function f(sol) = 5.142032e-03
@@ -168,138 +341,1189 @@ def solve(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
     5
     >>> ret['time']  # doctest:+SKIP
     0.0012578964233398438
-    >>> ret['objective']  # doctest:+NORMALIZE_WHITESPACE,+ELLIPSIS
-    [[126.0, 0], [13.99999999..., 0], [0.29637392..., 0], [0.07902528..., 0],
-    [0.05752265..., 0], [0.00514203..., 0]]
+    >>> ret['objective'].shape
+    (6, 2)
+    >>> ret['objective'][:, 0]  # doctest:+NORMALIZE_WHITESPACE,+ELLIPSIS
+    array([  1.26000000e+02,   1.40000000e+01,   2.96373...e-01,
+             7.90252...e-02,   5.75226...e-02,   5.14203...e-03])
+    >>> ret['evaluated']
+    array([0, 1, 2, 3, 4, 5])
+
+    Evaluate the objective function every other iteration only:
+
+    >>> x0 = np.zeros(len(y))
+    >>> ret = pyunlocbox.solvers.solve([f], x0, atol=1e-2, evaluate=2,
+    ...                                verbosity='NONE')
+    >>> ret['niter']
+    6
+    >>> ret['evaluated']
+    array([0, 2, 4, 6])
+
+    Save a checkpoint every two iterations and resume from it:
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'checkpoint.npz')
+    >>> x0 = np.zeros(len(y))
+    >>> ret = pyunlocbox.solvers.solve([f], x0, rtol=None, maxit=4,
+    ...                                checkpoint=path, checkpoint_every=2,
+    ...                                verbosity='NONE')
+    >>> x0 = np.zeros(len(y))
+    >>> ret = pyunlocbox.solvers.solve([f], x0, atol=1e-2, resume=path,
+    ...                                verbosity='NONE')
+    >>> ret['niter']
+    5
+
+    Keep only the last two evaluations:
+
+    >>> x0 = np.zeros(len(y))
+    >>> ret = pyunlocbox.solvers.solve([f], x0, atol=1e-2, history=2,
+    ...                                verbosity='NONE')
+    >>> ret['evaluated']
+    array([4, 5])
 
     """
 
-    if verbosity not in ['NONE', 'LOW', 'HIGH', 'ALL']:
-        raise ValueError('Verbosity should be either NONE, LOW, HIGH or ALL.')
+    result = dict()
+    for _ in solve_iter(functions, x0, solver, atol, dtol, rtol, xtol, maxit,
+                        verbosity, evaluate, history, checkpoint,
+                        checkpoint_every, resume, maxtime, profile, result,
+                        trace=trace, divtol=divtol, retries=retries):
+        pass
+    return result
+
+
+class _checkpointer(object):
+    r"""
+    Write checkpoints on a background thread, one at a time.
+
+    A checkpoint is first written to a temporary file which then replaces the
+    previous one. Errors are raised by the next call to :meth:`write` or
+    :meth:`wait`.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread = None
+        self._error = None
+
+    def _write(self, state):
+        try:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as fh:
+                np.savez(fh, **state)
+            os.replace(tmp, self.path)
+        except Exception as error:
+            self._error = error
+
+    def write(self, state):
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(state,))
+        self._thread.start()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+def _load_checkpoint(resume, solver):
+    r"""
+    Load a checkpoint from a path or a mapping, and verify it was saved by the
+    same kind of solver.
+
+    """
+    if isinstance(resume, str):
+        with np.load(resume) as data:
+            state = dict(data)
+    else:
+        state = resume
+    name = str(state['solver'])
+    if name != solver.__class__.__name__:
+        raise ValueError('Cannot resume a {} solver from a checkpoint saved '
+                         'by a {} solver.'.format(solver.__class__.__name__,
+                                                  name))
+    return state
+
+
+class _profiler(object):
+    r"""
+    Count the calls and measure the time spent in methods.
+
+    The methods are shadowed by instance attributes which wrap them, until
+    :meth:`unwrap` restores the objects as they were.
+
+    """
+
+    def __init__(self):
+        self.profile = dict()
+        self._wrapped = []
+
+    def wrap(self, obj, method, name):
+        function = getattr(obj, method)
+        stats = self.profile.setdefault(name, {'calls': 0, 'time': 0.})
+
+        def wrapper(*args, **kwargs):
+            tic = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats['calls'] += 1
+                stats['time'] += time.time() - tic
+
+        self._wrapped.append((obj, method, vars(obj).get(method, wrapper)))
+        setattr(obj, method, wrapper)
+
+    def unwrap(self):
+        for obj, method, previous in reversed(self._wrapped):
+            if previous is getattr(obj, method):
+                delattr(obj, method)  # It was not an instance attribute.
+            else:
+                setattr(obj, method, previous)
+        self._wrapped = []
+
+
+class _history(object):
+    r"""
+    Successive evaluations of the objective function.
+
+    The evaluations are stored in a preallocated array of shape (evaluations,
+    functions), along with the iterations at which they were made. The array
+    grows geometrically as needed. If `size` is given, only the last `size`
+    evaluations are kept in a ring buffer. Indexing is relative to the kept
+    evaluations, such that ``history[-1]`` is the last one.
+
+    """
+
+    def __init__(self, nfuncs, size=None):
+        if size is not None and size < 2:
+            raise ValueError('At least 2 evaluations should be kept.')
+        self.size = size
+        capacity = 16 if size is None else min(16, size)
+        self._values = np.empty((capacity, nfuncs))
+        self._iters = np.empty(capacity, dtype=int)
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, len(self._values))
+
+    def _start(self):
+        return self._count % len(self._values) if self._wrapped() else 0
+
+    def _wrapped(self):
+        return self._count > len(self._values)
+
+    def append(self, values, niter):
+        capacity = len(self._values)
+        if self._count >= capacity and (self.size is None or
+                                        capacity < self.size):
+            capacity *= 2
+            if self.size is not None:
+                capacity = min(capacity, self.size)
+            self._values = np.resize(self._values, (capacity,) +
+                                     self._values.shape[1:])
+            self._iters = np.resize(self._iters, capacity)
+        pos = self._count % capacity
+        self._values[pos] = values
+        self._iters[pos] = niter
+        self._count += 1
+
+    def replace(self, values):
+        r"""Replace the values of the last evaluation."""
+        self._values[(self._count - 1) % len(self._values)] = values
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            n = len(self)
+            if key < -n or key >= n:
+                raise IndexError('Evaluation {} is not stored.'.format(key))
+            return self._values[(self._start() + key % n) % len(self._values)]
+        return self.array()[key]
+
+    def _ordered(self, a):
+        start = self._start()
+        return np.concatenate((a[start:len(self)], a[:start]))
+
+    def array(self):
+        r"""Evaluations as a new array, from the oldest kept."""
+        return self._ordered(self._values)
+
+    def evaluated(self):
+        r"""Iterations at which the kept evaluations were made."""
+        return self._ordered(self._iters)
+
+
+def _copy_state(state):
+    r"""Copy a state returned by :meth:`solver.get_state`."""
+    return dict((name, np.array(value, copy=True))
+                for name, value in state.items())
+
+
+class _divergence(object):
+    r"""
+    Detect the divergence of the iterations: non-finite iterates or
+    evaluations of the objective function, runaway growth of the objective
+    function, or oscillation. See `divtol` in :func:`solve`.
+
+    If `keep` is True, a copy of the iterate with the smallest evaluation is
+    kept in `good`, and the step size at that iteration in `good_step`, from
+    which the iterations can be retried.
+
+    """
+
+    window = 10  # Number of evaluations which should oscillate.
+
+    def __init__(self, divtol, keep):
+        self.divtol = divtol
+        self.keep = keep
+        self.best = None
+        self.rise = None  # First increase after the best evaluation.
+        self.good = None
+        self.good_step = None
+        self._since_best = collections.deque(maxlen=self.window)
+
+    def save(self, solver):
+        if self.keep:
+            if self.good is None:
+                self.good = np.empty_like(solver.sol)
+            self.good[:] = solver.sol
+            self.good_step = solver.step
+
+    def reset(self):
+        r"""Forget the evaluations since the best one, e.g. on a retry."""
+        self.rise = None
+        self._since_best.clear()
+
+    def update(self, solver, current):
+        r"""
+        Return True if the iterations diverged, given the last iterate and
+        evaluation of the objective function (None if not evaluated).
+
+        """
+        # A sum is cheaper than np.isfinite(), and only overflows for
+        # iterates which diverged anyway.
+        if not np.isfinite(np.sum(solver.sol)):
+            return True
+        if current is None:
+            return False
+        if not np.isfinite(current):
+            return True
+        if self.best is None or current < self.best:
+            self.best = current
+            self.reset()
+            self._since_best.append(current)
+            self.save(solver)
+            return False
+        if self.divtol is None:
+            return False
+        if self.rise is None and current > self.best:
+            self.rise = current - self.best
+        scale = max(abs(self.best), self.rise or 0.)
+        if current - self.best > self.divtol * scale:
+            return True
+        self._since_best.append(current)
+        if len(self._since_best) < self.window:
+            return False
+        diff = np.diff(self._since_best)
+        alternate = np.all(diff[1:] * diff[:-1] < 0)
+        return alternate and abs(diff[-1]) >= abs(diff[0])
+
+
+def _every(evaluate, atol, dtol, rtol):
+    r"""
+    Number of iterations between two evaluations of the objective function, or
+    None if it should not be evaluated. See :func:`solve` for the parameters.
+
+    """
+    criteria = any(tol is not None for tol in [atol, dtol, rtol])
+    if evaluate == 'NEVER':
+        if criteria:
+            raise ValueError('The atol, dtol and rtol stopping criteria need '
+                             'the objective function to be evaluated.')
+        return None
+    elif evaluate == 'AUTO':
+        return 1 if criteria else None
+    elif isinstance(evaluate, (int, np.integer)) and evaluate >= 1:
+        return evaluate
+    else:
+        raise ValueError('Evaluate should be either a positive integer, AUTO '
+                         'or NEVER.')
+
+
+def _choose_solver(functions, x0):
+    r"""
+    Choose a solver given the number of functions and their capabilities.
+    """
+    if len(functions) == 2:
+        cap = [f.cap(x0) for f in functions]
+        fb0 = 'GRAD' in cap[0] and 'PROX' in cap[1]
+        fb1 = 'GRAD' in cap[1] and 'PROX' in cap[0]
+        dg0 = 'PROX' in cap[0] and 'PROX' in cap[1]
+        if fb0 or fb1:
+            return forward_backward()  # Need one prox and 1 grad.
+        elif dg0:
+            return douglas_rachford()  # Need two prox.
+        else:
+            raise ValueError('No suitable solver for the given functions.')
+    else:
+        return generalized_forward_backward()
+
+
+def _setup(functions, x0, solver, verbosity):
+    r"""
+    Complete the functions and choose the solver. Return copies on which a
+    solve can run, with prepared functions. See :func:`solve` for the
+    parameters.
+
+    """
+    info = verbosity in ['LOW', 'HIGH', 'ALL']
 
     # Add a second dummy convex function if only one function is provided.
+    functions = list(functions)
     if len(functions) < 1:
         raise ValueError('At least 1 convex function should be provided.')
     elif len(functions) == 1:
         functions.append(dummy())
-        if verbosity in ['LOW', 'HIGH', 'ALL']:
-            print('INFO: Dummy objective function added.')
+        _log.event(logger, logging.INFO, info,
+                   'INFO: Dummy objective function added.')
 
     # Choose a solver if none provided.
     if not solver:
-        if len(functions) == 2:
-            fb0 = 'GRAD' in functions[0].cap(x0) and \
-                  'PROX' in functions[1].cap(x0)
-            fb1 = 'GRAD' in functions[1].cap(x0) and \
-                  'PROX' in functions[0].cap(x0)
-            dg0 = 'PROX' in functions[0].cap(x0) and \
-                  'PROX' in functions[1].cap(x0)
-            if fb0 or fb1:
-                solver = forward_backward()  # Need one prox and 1 grad.
-            elif dg0:
-                solver = douglas_rachford()  # Need two prox.
-            else:
-                raise ValueError('No suitable solver for the given functions.')
-        elif len(functions) > 2:
-            solver = generalized_forward_backward()
-        if verbosity in ['LOW', 'HIGH', 'ALL']:
-            name = solver.__class__.__name__
-            print('INFO: Selected solver: {}'.format(name))
-
-    # Set solver and functions verbosity.
+        solver = _choose_solver(functions, x0)
+        _log.event(logger, logging.INFO, info, 'INFO: Selected solver: %s',
+                   solver.__class__.__name__)
+
+    # The state of the run is held by copies of the solver and acceleration
+    # scheme, such that the given objects can serve concurrent solves.
+    solver = copy.copy(solver)
+    solver.accel = copy.copy(solver.accel)
+
+    # Set solver and functions verbosity. The functions are copied instead of
+    # modified: the copies hold the precomputed quantities of the run, and
+    # the methods wrapped by the profiler.
     translation = {'ALL': 'HIGH', 'HIGH': 'HIGH', 'LOW': 'LOW', 'NONE': 'NONE'}
     solver.verbosity = translation[verbosity]
     translation = {'ALL': 'HIGH', 'HIGH': 'LOW', 'LOW': 'NONE', 'NONE': 'NONE'}
-    functions_verbosity = []
+    for k, f in enumerate(functions):
+        functions[k] = copy.copy(f)
+        functions[k].verbosity = translation[verbosity]
+
+    # Precompute the quantities which do not change during the solve.
     for f in functions:
-        functions_verbosity.append(f.verbosity)
-        f.verbosity = translation[verbosity]
+        f.prepare(x0)
+
+    return functions, solver
+
+
+def solve_iter(functions, x0, solver=None, atol=None, dtol=None, rtol=1e-3,
+               xtol=None, maxit=200, verbosity='LOW', evaluate=1, history=None,
+               checkpoint=None, checkpoint_every=100, resume=None,
+               maxtime=None, profile=False, result=None, warm=None,
+               trace=None, divtol=None, retries=0, _prepared=False):
+    r"""
+    Iteratively solve an optimization problem whose objective function is the
+    sum of some convex functions.
+
+    This generator runs the same algorithm as :func:`solve`, which is a thin
+    wrapper around it, but yields a state after each iteration. The caller can
+    then monitor the progress, stop the algorithm early by not asking for the
+    next iteration, or change the stopping criteria by sending them.
+
+    Parameters
+    ----------
+    functions, x0, solver, atol, dtol, rtol, xtol, maxit, verbosity
+        See :func:`solve`.
+    evaluate, history, checkpoint, checkpoint_every, resume, maxtime, profile
+        See :func:`solve`.
+    trace, divtol, retries
+        See :func:`solve`.
+    result : dict, optional
+        If given, it is filled with the dictionary returned by :func:`solve`
+        once the iterations are over, either because a stopping criterion was
+        reached or because the caller stopped them. In the latter case, the
+        stopping criterion is None.
+    warm : dict, optional
+        A state returned by :meth:`solver.get_state`, restored once the solver
+        is initialized to warm start it, e.g. from the solution and dual
+        variables of a nearby problem. Unlike `resume`, the iteration count
+        and the objective function history start afresh. Default is None.
+
+    Yields
+    ------
+    state : dict
+        The state after an iteration, whose keys are:
+
+        * niter: the iteration number.
+        * sol: the current solution. It is not a copy: it is modified in place
+          by the next iteration. It should not be modified by the caller.
+        * step: the step size used by the iteration.
+        * objective: the evaluations of the functions at `sol`, or None if the
+          objective function was not evaluated at this iteration.
+        * crit: the stopping criterion, or None if the algorithm continues.
+        * solver: the solver running the iterations. It is a copy of the given
+          solver which holds the state of this run, e.g. its dual variables.
+
+    Notes
+    -----
+    Sending a dictionary to the generator updates the `atol`, `dtol`, `rtol`,
+    `xtol`, `maxit` and `maxtime` stopping criteria before the next iteration.
+    Sending returns the state after the next iteration, as :func:`next` would.
+
+    Examples
+    --------
+    >>> import pyunlocbox
+    >>> import numpy as np
+    >>> y = [4, 5, 6, 7]
+    >>> f = pyunlocbox.functions.norm_l2(y=y)
+
+    Stop the algorithm once the objective is smaller than 1:
+
+    >>> x0 = np.zeros(len(y))
+    >>> for state in pyunlocbox.solvers.solve_iter([f], x0, rtol=None,
+    ...                                            verbosity='NONE'):
+    ...     if np.sum(state['objective']) < 1:
+    ...         break
+    >>> state['niter']
+    2
+
+    Tighten the stopping criterion on the fly and get the result:
+
+    >>> x0 = np.zeros(len(y))
+    >>> result = dict()
+    >>> iterations = pyunlocbox.solvers.solve_iter([f], x0, rtol=None,
+    ...                                            maxit=4, verbosity='NONE',
+    ...                                            result=result)
+    >>> state = next(iterations)
+    >>> state = iterations.send({'maxit': 10, 'atol': 1e-2})
+    >>> for state in iterations:
+    ...     pass
+    >>> result['crit'], result['niter']
+    ('ATOL', 5)
+
+    """
+
+    if verbosity not in ['NONE', 'LOW', 'HIGH', 'ALL']:
+        raise ValueError('Verbosity should be either NONE, LOW, HIGH or ALL.')
+
+    # Evaluation policy: evaluate the objective every `every` iterations.
+    every = _every(evaluate, atol, dtol, rtol)
+
+    # Messages printed at each verbosity level. They are logged anyway.
+    info = verbosity in ['LOW', 'HIGH', 'ALL']
+    high = verbosity in ['HIGH', 'ALL']
+
+    # A problem object set up the functions and the solver once.
+    if not _prepared:
+        functions, solver = _setup(functions, x0, solver, verbosity)
+
+    zeros = [_always_zero(f) for f in functions]
+
+    def evaluate_objective(x):
+        return [0 if zero else f.eval(x) for f, zero in zip(functions, zeros)]
+
+    profiler = _profiler() if profile else None
+    if profiler is not None:
+        names = [f.__class__.__name__ for f in functions]
+        for k, f in enumerate(functions):
+            name = names[k]
+            if names.count(name) > 1:
+                name += '[{}]'.format(k)
+            for method in ['eval', 'grad', 'prox', 'eval_grad']:
+                profiler.wrap(f, method, '{}.{}'.format(name, method))
+        name = solver.accel.__class__.__name__
+        for method in ['update_sol', 'update_step']:
+            profiler.wrap(solver.accel, method, '{}.{}'.format(name, method))
+        name = solver.__class__.__name__
+        for method in ['algo', '_algo']:
+            profiler.wrap(solver, method, '{}.{}'.format(name, method))
 
     tstart = time.time()
     crit = None
     niter = 0
-    objective = [[f.eval(x0) for f in functions]]
+    objective = _history(len(functions), history)
+    durations = _history(1, history)
+    average = None  # Moving average of the iterations' durations.
+    elapsed = 0.  # Total duration of the iterations.
+    last_evaluated = None
     rtol_only_zeros = True
+    last_sol = None
+    writer = None if checkpoint is None else _checkpointer(checkpoint)
+    best = None  # Smallest evaluation, kept with its iterate for maxtime.
+    best_sol = None
+    divergence = _divergence(divtol, retries > 0)
+    tries = 0
+    sink = None
+    if trace is not None:
+        from pyunlocbox.trace import _open  # Not needed otherwise.
+        sink = _open(trace)
+        solver.events = []  # Collects the events of the acceleration scheme.
+    # Whether the per-iteration messages go anywhere, checked once.
+    debug = _log.enabled(logger, logging.DEBUG, high)
 
-    # Solver specific initialization.
-    solver.pre(functions, x0)
+    try:
 
-    while not crit:
+        # Solver specific initialization, or restart of a prepared solver.
+        if _prepared:
+            solver.reset(functions, x0)
+        else:
+            solver.pre(functions, x0)
 
-        niter += 1
+    except Exception:
+        if profiler is not None:
+            profiler.unwrap()
+        raise
 
-        if xtol is not None:
-            last_sol = np.array(solver.sol, copy=True)
+    try:
 
-        if verbosity in ['HIGH', 'ALL']:
-            name = solver.__class__.__name__
-            print('Iteration {} of {}:'.format(niter, name))
+        if sink is not None:
+            sink.start({'solver': solver.__class__.__name__,
+                        'accel': solver.accel.__class__.__name__,
+                        'functions': [f.__class__.__name__ for f in functions],
+                        'shape': list(np.shape(solver.sol)),
+                        'dtype': str(solver.sol.dtype),
+                        'setup': time.time() - tstart})
+
+        if resume is not None:
+            saved = _load_checkpoint(resume, solver)
+            state = dict()
+            for name, value in saved.items():
+                if name.startswith('solver.'):
+                    state[name[len('solver.'):]] = value
+            solver.set_state(state)
+            niter = int(saved['niter'])
+            rtol_only_zeros = bool(saved['rtol_only_zeros'])
+            for values, it in zip(saved['objective'], saved['evaluated']):
+                objective.append(values, it)
+                last_evaluated = int(it)
+        elif warm is not None:
+            solver.set_state(warm)
+        niter0 = niter
+
+        # The starting point, which may have been restored from a state.
+        if every is not None and resume is None:
+            objective.append(evaluate_objective(solver.sol), niter)
+            last_evaluated = niter
+
+        if maxtime is not None and len(objective):
+            best = objective[-1].copy()
+            best_sol = np.array(solver.sol, copy=True)
+
+        # The starting point is the first good iterate.
+        if len(objective):
+            divergence.update(solver, np.sum(objective[-1]))
+        if divergence.good is None:
+            divergence.save(solver)
+
+        try:
+
+            while not crit:
+
+                niter += 1
+                tic = time.time()
+
+                if xtol is not None:
+                    if last_sol is None:
+                        last_sol = np.empty_like(solver.sol)
+                    last_sol[:] = solver.sol
+
+                if debug:
+                    _log.event(logger, logging.DEBUG, high,
+                               'Iteration %d of %s:', niter,
+                               solver.__class__.__name__)
+
+                # Solver iterative algorithm.
+                if sink is not None:
+                    talgo = time.time()
+                solver.algo(objective, niter)
+                if sink is not None:
+                    talgo = time.time() - talgo
+
+                # Verify stopping criteria which depend on the objective.
+                current = None
+                evaluation = None
+                if every is not None and niter % every == 0:
+                    objective.append(evaluate_objective(solver.sol), niter)
+                    last_evaluated = niter
+                    evaluation = objective[-1].copy()
+                    current = np.sum(evaluation)
+                    if maxtime is not None and \
+                            (best is None or current < np.sum(best)):
+                        best = evaluation
+                        if best_sol is None:
+                            best_sol = np.empty_like(solver.sol)
+                        best_sol[:] = solver.sol
+                    # The previous evaluation is missing if the criteria
+                    # were set after the first iteration.
+                    last = np.sum(objective[-2]) if len(objective) > 1 \
+                        else None
+
+                    if atol is not None and current < atol:
+                        crit = 'ATOL'
+                    if dtol is not None and last is not None and \
+                            np.abs(current - last) < dtol:
+                        crit = 'DTOL'
+                    if rtol is not None and last is not None:
+                        div = current  # Prevent division by 0.
+                        if div == 0:
+                            _log.event(logger, logging.WARNING, info,
+                                       'WARNING: (rtol) objective function '
+                                       'is equal to 0 !')
+                            if last != 0:
+                                div = last
+                            else:
+                                div = 1.0  # Result will be zero anyway.
+                        else:
+                            rtol_only_zeros = False
+                        relative = np.abs((current - last) / div)
+                        if relative < rtol and not rtol_only_zeros:
+                            crit = 'RTOL'
+
+                    if debug:
+                        _log.event(logger, logging.DEBUG, high,
+                                   '    objective = %.2e', current)
+
+                # Verify the other stopping criteria.
+                if xtol is not None:
+                    np.subtract(solver.sol, last_sol, out=last_sol)
+                    err = np.linalg.norm(last_sol)
+                    err /= np.sqrt(last_sol.size)
+                    if err < xtol:
+                        crit = 'XTOL'
+
+                # Predict if the next iteration would exceed the time budget.
+                toc = time.time()
+                durations.append(toc - tic, niter)
+                elapsed += toc - tic
+                if average is None:
+                    average = toc - tic
+                else:
+                    average = 0.8 * average + 0.2 * (toc - tic)
+                if maxtime is not None and toc - tstart + average > maxtime:
+                    crit = 'MAXTIME'
+
+                if maxit is not None and niter >= maxit:
+                    crit = 'MAXIT'
+
+                # Stop or retry from the best iterate with a smaller step.
+                if divergence.update(solver, current):
+                    if tries < retries and crit != 'MAXIT':
+                        tries += 1
+                        step = min(solver.step, divergence.good_step) / 2.
+                        solver.sol[:] = divergence.good
+                        solver.reset(functions, solver.sol)
+                        solver.step = step
+                        divergence.good_step = step
+                        divergence.reset()
+                        crit = None
+                        _log.event(logger, logging.WARNING, info,
+                                   'WARNING: diverged at iteration %d, '
+                                   'retry %d with step %e', niter, tries,
+                                   step)
+                    else:
+                        crit = 'DIVERGED'
+
+                if sink is not None:
+                    iteration = {'niter': niter,
+                                 'wall': toc - tstart,
+                                 'duration': toc - tic,
+                                 'algo': talgo,
+                                 'step': solver.step,
+                                 'objective': evaluation,
+                                 'events': solver.events}
+                    solver.events = []
+                    if sink.wants_sol(niter):
+                        iteration['sol'] = np.array(solver.sol, copy=True)
+                    sink.record(iteration)
+
+                if writer is not None and niter % checkpoint_every == 0:
+                    saved = {'niter': niter,
+                             'solver': solver.__class__.__name__,
+                             'rtol_only_zeros': rtol_only_zeros,
+                             'objective': objective.array(),
+                             'evaluated': objective.evaluated()}
+                    for name, value in solver.get_state().items():
+                        saved['solver.' + name] = np.array(value, copy=True)
+                    writer.write(saved)
+
+                # Return the best iterate rather than the last one.
+                if crit == 'MAXTIME' and best is not None:
+                    if last_evaluated != niter:
+                        objective.append(evaluate_objective(solver.sol),
+                                         niter)
+                        last_evaluated = niter
+                    # Also if the last evaluation is not a number.
+                    if not np.sum(objective[-1]) <= np.sum(best):
+                        solver.sol[:] = best_sol
+                        solver._moved()
+                        objective.replace(best)
+                        evaluation = best
+
+                state = {'niter': niter,
+                         'sol': solver.sol,
+                         'step': solver.step,
+                         'objective': evaluation,
+                         'crit': crit,
+                         'solver': solver}
+                update = yield state
+
+                # Update the stopping criteria sent by the caller.
+                if update and not crit:
+                    for name in update:
+                        if name not in ['atol', 'dtol', 'rtol', 'xtol',
+                                        'maxit', 'maxtime']:
+                            raise ValueError('Unknown stopping criterion: '
+                                             '{}.'.format(name))
+                    atol = update.get('atol', atol)
+                    dtol = update.get('dtol', dtol)
+                    rtol = update.get('rtol', rtol)
+                    xtol = update.get('xtol', xtol)
+                    maxit = update.get('maxit', maxit)
+                    maxtime = update.get('maxtime', maxtime)
+                    every = _every(evaluate, atol, dtol, rtol)
+                    if maxit is not None and niter >= maxit:
+                        crit = 'MAXIT'
+
+        except GeneratorExit:
+            pass  # The caller stopped the iterations.
+
+        # Always evaluate the objective function at the returned solution.
+        if evaluate != 'NEVER' and last_evaluated != niter:
+            objective.append(evaluate_objective(solver.sol), niter)
+
+        if _log.enabled(logger, logging.INFO, info):
+            _log.event(logger, logging.INFO, info,
+                       'Solution found after %d iterations:', niter)
+            if len(objective):
+                _log.event(logger, logging.INFO, info,
+                           '    objective function f(sol) = %e',
+                           np.sum(objective[-1]))
+            _log.event(logger, logging.INFO, info,
+                       '    stopping criterion: %s', crit)
+
+        if result is not None:
+            result.update({'sol':       solver.sol,
+                           'solver':    solver.__class__.__name__,
+                           'crit':      crit,
+                           'niter':     niter,
+                           'time':      time.time() - tstart,
+                           'durations': durations.array()[:, 0],
+                           'objective': objective.array(),
+                           'evaluated': objective.evaluated()})
+            try:
+                # Update dictionary for primal-dual solvers
+                result['dual_sol'] = solver.dual_sol
+            except AttributeError:
+                pass
+            if profiler is not None:
+                algo = profiler.profile[solver.__class__.__name__ + '.algo']
+                result['profile'] = dict(profiler.profile)
+                result['profile']['solve.loop'] = {
+                    'calls': niter - niter0, 'time': elapsed - algo['time']}
+
+    finally:
+
+        if profiler is not None:
+            profiler.unwrap()
+
+        # Solver specific post-processing (e.g. delete references). A
+        # prepared solver keeps its workspaces for the next run.
+        if not _prepared:
+            solver.post()
+
+        # Wait for the last checkpoint to be written.
+        if writer is not None:
+            writer.wait()
+
+        if sink is not None:
+            solver.events = None
+            sink.end({'crit': crit, 'niter': niter,
+                      'time': time.time() - tstart})
+
+
+def solve_path(functions, x0, func, lambdas, solver=None, **kwargs):
+    r"""
+    Solve an optimization problem along a regularization path, with warm
+    starts.
+
+    The problem is solved for each value of the regularization parameter
+    `lambda_` of one of its functions, from the largest value to the smallest.
+    Each solve is warm started from the previous one: it starts from its
+    solution, and restores the state of the solver (e.g. its dual variables)
+    and of its acceleration scheme. As the solutions of close values are
+    close, this takes much less iterations than independent solves. A solve
+    which diverged (see `divtol` in :func:`solve`) is skipped: the next one
+    starts from the last solve which did not.
 
-        # Solver iterative algorithm.
-        solver.algo(objective, niter)
+    Parameters
+    ----------
+    functions : list of objects
+        The convex functions to minimize. See :func:`solve`.
+    x0 : array_like
+        Starting point of the first solve. It is not modified.
+    func : object
+        The function of `functions` whose `lambda_` varies, e.g. a
+        :class:`pyunlocbox.functions.norm_l1`. Its `lambda_` is restored
+        afterwards.
+    lambdas : array_like
+        The values of `lambda_`.
+    solver : solver class instance, optional
+        The solver algorithm, used for the whole path. See :func:`solve`.
+    kwargs : dict
+        Other arguments to :func:`solve_iter`, e.g. the stopping criteria.
 
-        objective.append([f.eval(solver.sol) for f in functions])
-        current = np.sum(objective[-1])
-        last = np.sum(objective[-2])
+    Returns
+    -------
+    result : dict
+        The results of the solves, stacked along the first axis:
+
+        * lambdas: the values of `lambda_`, in decreasing order.
+        * sol: the solution for each value of `lambda_`.
+        * dual_sol: the dual solutions, for primal-dual solvers only.
+        * solver: the name of the solver.
+        * crit: the stopping criteria.
+        * niter: the numbers of iterations.
+        * time: the durations of the solves.
+        * objective: the objective functions at the solutions, or NaN if
+          they were not evaluated.
 
-        # Verify stopping criteria.
-        if atol is not None and current < atol:
-            crit = 'ATOL'
-        if dtol is not None and np.abs(current - last) < dtol:
-            crit = 'DTOL'
-        if rtol is not None:
-            div = current  # Prevent division by 0.
-            if div == 0:
-                if verbosity in ['LOW', 'HIGH', 'ALL']:
-                    print('WARNING: (rtol) objective function is equal to 0 !')
-                if last != 0:
-                    div = last
-                else:
-                    div = 1.0  # Result will be zero anyway.
-            else:
-                rtol_only_zeros = False
-            relative = np.abs((current - last) / div)
-            if relative < rtol and not rtol_only_zeros:
-                crit = 'RTOL'
-        if xtol is not None:
-            err = np.linalg.norm(solver.sol - last_sol)
-            err /= np.sqrt(last_sol.size)
-            if err < xtol:
-                crit = 'XTOL'
-        if maxit is not None and niter >= maxit:
-            crit = 'MAXIT'
-
-        if verbosity in ['HIGH', 'ALL']:
-            print('    objective = {:.2e}'.format(current))
-
-    # Restore verbosity for functions. In case they are called outside solve().
-    for k, f in enumerate(functions):
-        f.verbosity = functions_verbosity[k]
-
-    if verbosity in ['LOW', 'HIGH', 'ALL']:
-        print('Solution found after {} iterations:'.format(niter))
-        print('    objective function f(sol) = {:e}'.format(current))
-        print('    stopping criterion: {}'.format(crit))
-
-    # Returned dictionary.
-    result = {'sol':       solver.sol,
-              'solver':    solver.__class__.__name__,  # algo for consistency ?
-              'crit':      crit,
-              'niter':     niter,
-              'time':      time.time() - tstart,
-              'objective': objective}
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers
+    >>> y = [1, 0, 0.1, 8, -6.5, 0.2, 0.004, 0.01]
+    >>> f1 = functions.norm_l2(y=y, lambda_=0.5)
+    >>> f2 = functions.norm_l1()
+    >>> solver = solvers.forward_backward(step=0.5)
+    >>> x0 = np.zeros(len(y))
+    >>> ret = solvers.solve_path([f1, f2], x0, f2, [0.1, 1, 10], solver,
+    ...                          rtol=1e-6, verbosity='NONE')
+    >>> ret['lambdas']
+    array([ 10. ,   1. ,   0.1])
+    >>> ret['sol'].shape
+    (3, 8)
+    >>> np.round(ret['sol'][-1], 1)
+    array([ 0.9,  0. ,  0. ,  7.9, -6.4,  0.1,  0. ,  0. ])
+    >>> ret['crit']
+    ['RTOL', 'RTOL', 'RTOL']
+
+    """
+
+    lambdas = np.sort(np.asarray(lambdas, dtype=float))[::-1]
+    x = np.array(x0, copy=True)
+
+    # Choose the solver once, such that its state can be carried over.
+    functions = list(functions)
+    if len(functions) == 1:
+        functions.append(dummy())
+    if not solver:
+        solver = _choose_solver(functions, x)
+
+    result = {'lambdas':   lambdas,
+              'sol':       np.empty((len(lambdas),) + x.shape, x.dtype),
+              'solver':    solver.__class__.__name__,
+              'crit':      [],
+              'niter':     np.empty(len(lambdas), dtype=int),
+              'time':      np.empty(len(lambdas)),
+              'objective': np.empty(len(lambdas))}
+    dual_sols = []
+
+    lambda_ = func.lambda_
+    warm = None
     try:
-        # Update dictionary for primal-dual solvers
-        result['dual_sol'] = solver.dual_sol
-    except AttributeError:
-        pass
+        for k, value in enumerate(lambdas):
+            func.lambda_ = value
+            ret = dict()
+            for state in solve_iter(functions, x, solver, result=ret,
+                                    warm=warm, **kwargs):
+                if state['crit'] == 'DIVERGED':
+                    # Start the next solve from the last good solution. The
+                    # diverged one, in x, is the result of this solve.
+                    if warm is None:
+                        x = np.array(x0, copy=True)
+                elif state['crit']:
+                    # Last iteration: keep the state before solver.post().
+                    warm = _copy_state(state['solver'].get_state())
+            result['sol'][k] = ret['sol']
+            result['crit'].append(ret['crit'])
+            result['niter'][k] = ret['niter']
+            result['time'][k] = ret['time']
+            if len(ret['objective']):
+                result['objective'][k] = np.sum(ret['objective'][-1])
+            else:
+                result['objective'][k] = np.nan
+            if 'dual_sol' in ret:
+                dual_sols.append(np.array(ret['dual_sol'], copy=True))
+    finally:
+        func.lambda_ = lambda_
+
+    if dual_sols:
+        result['dual_sol'] = np.array(dual_sols)
+    return result
+
+
+# Problems of the solve_many() call of a worker process, set by the
+# initializer of its pool. Worker processes created by fork inherit them, such
+# that only their indices are sent through pipes. That spares the pickling of
+# the functions, which may hold lambdas.
+_many_problems = None
+
 
-    # Solver specific post-processing (e.g. delete references).
-    solver.post()
+def _set_problems(problems):
+    global _many_problems
+    _many_problems = problems
 
+
+def _solve_one(task):
+    r"""
+    Solve one problem of :func:`solve_many` and catch its failure.
+    """
+    index, problem, defaults = task
+    if problem is None:
+        problem = _many_problems[index]
+    if not isinstance(problem, dict):
+        problem = dict(zip(('functions', 'x0', 'solver'), problem))
+    params = dict(defaults)
+    params.update(problem)
+    # Solve a copy, such that a problem can be solved again.
+    params['x0'] = np.array(params['x0'])
+    tstart = time.time()
+    try:
+        result = solve(**params)
+    except Exception as e:
+        result = {'error': e}
+    result['index'] = index
+    result['time'] = time.time() - tstart
+    result.setdefault('error', None)
     return result
 
 
+def solve_many(problems, workers=None, chunksize=1, ordered=True, **kwargs):
+    r"""
+    Solve many independent optimization problems with a pool of processes.
+
+    This generator distributes the problems to worker processes, which solve
+    them with :func:`solve`, and yields their results.
+
+    Parameters
+    ----------
+    problems : iterable
+        The problems to solve. Each problem is either a dictionary of
+        arguments to :func:`solve`, e.g. ``{'functions': [f1, f2], 'x0': x0,
+        'rtol': 1e-5}``, or a tuple ``(functions, x0)`` or ``(functions, x0,
+        solver)``.
+    workers : int, optional
+        The number of worker processes. If 1, the problems are solved one
+        after the other in the calling process. Default is the number of CPUs.
+    chunksize : int, optional
+        The number of problems sent at once to a worker. Larger chunks reduce
+        the communication overhead of small problems. Default is 1.
+    ordered : bool, optional
+        Yield the results in the order of the problems if True, or as soon as
+        they are solved if False. Default is True.
+    kwargs : dict
+        Default arguments to :func:`solve`, overridden by those of a problem.
+
+    Yields
+    ------
+    result : dict
+        The dictionary returned by :func:`solve`, with the additional
+        following keys:
+
+        * index: the position of the problem in `problems`.
+        * error: the exception raised by the problem, or None if it was solved.
+          Failed problems only have the `index`, `error` and `time` keys.
+        * time: the time taken to solve the problem, in seconds.
+
+    Notes
+    -----
+    Where the platform can fork processes (e.g. Linux), the workers inherit
+    the problems and only their indices are sent to them. Otherwise the
+    problems are pickled, which the functions, solvers and acceleration
+    schemes support as long as they are not given lambdas. Unlike
+    :func:`solve`, the solutions are not written into the `x0` given by the
+    caller.
+
+    Each worker should use a single thread, e.g. by setting the
+    ``OMP_NUM_THREADS`` environment variable to 1 before importing numpy, for
+    the throughput to scale with the number of workers.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers
+    >>> problems = []
+    >>> for y in [[1., 2.], [3., 4.], [5., 6.]]:
+    ...     f = functions.norm_l2(y=y)
+    ...     problems.append(([f], np.zeros(2)))
+    >>> for ret in solvers.solve_many(problems, workers=2, atol=1e-5,
+    ...                               verbosity='NONE'):
+    ...     print(ret['index'], ret['error'], ret['sol'])
+    0 None [ 0.99...  1.99...]
+    1 None [ 2.99...  3.99...]
+    2 None [ 4.99...  5.99...]
+
+    """
+
+    import multiprocessing  # Slow import, when needed.
+
+    problems = list(problems)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError('workers should be at least 1.')
+    if chunksize < 1:
+        raise ValueError('chunksize should be at least 1.')
+
+    if workers == 1 or len(problems) <= 1:
+        for index, problem in enumerate(problems):
+            yield _solve_one((index, problem, kwargs))
+        return
+
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    if fork:
+        # Not pickled: the workers are forked with the arguments of their
+        # initializer. Each call has its own pool, such that concurrent calls
+        # from other threads do not mix their problems.
+        tasks = [(index, None, kwargs) for index in range(len(problems))]
+        context = multiprocessing.get_context('fork')
+        initializer, initargs = _set_problems, (problems,)
+    else:
+        tasks = [(index, problem, kwargs)
+                 for index, problem in enumerate(problems)]
+        context = multiprocessing.get_context()
+        initializer, initargs = None, ()
+
+    pool = context.Pool(min(workers, len(problems)), initializer, initargs)
+
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result in imap(_solve_one, tasks, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class problem(object):
+    r"""
+    Optimization problem set up once to be solved many times, for other
+    measurements or starting points.
+
+    The functions are completed and validated, the solver is chosen, and its
+    workspaces are allocated once. :meth:`run` then only sets the
+    measurements and the starting point before the iterations.
+
+    Parameters
+    ----------
+    functions : list of objects
+        The convex functions to minimize. See :func:`solve`. They are copied
+        and prepared once, such that later changes to them are not seen.
+    x0 : array_like
+        The default starting point, which sets the shape and dtype of the
+        starting points given to :meth:`run`.
+    solver : solver class instance, optional
+        The solver algorithm. See :func:`solve`.
+    data : object, optional
+        The function of `functions` whose measurements `y` are set by
+        :meth:`run`. Default is the first function.
+    kwargs : dict
+        Other arguments to :func:`solve_iter`, e.g. the stopping criteria and
+        the verbosity.
+
+    Notes
+    -----
+    A problem holds the state of a solve: it cannot run concurrent solves.
+    Create one per thread instead.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers
+    >>> f1 = functions.norm_l2(y=np.zeros(4))
+    >>> f2 = functions.norm_l1(lambda_=.5)
+    >>> solver = solvers.forward_backward(step=.5)
+    >>> problem = solvers.problem([f1, f2], np.zeros(4), solver, rtol=1e-6,
+    ...                           verbosity='NONE')
+    >>> ret = problem.run([4, 5, 6, 7])
+    >>> ret['sol']
+    array([ 3.75,  4.75,  5.75,  6.75])
+    >>> ret = problem.run([1, 0, -1, 0])
+    >>> ret['sol']
+    array([ 0.75,  0.  , -0.75,  0.  ])
+
+    """
+
+    def __init__(self, functions, x0, solver=None, data=None, **kwargs):
+
+        for name in ['result', 'resume', 'warm']:
+            if name in kwargs:
+                raise ValueError('A problem does not take a {} '
+                                 'argument.'.format(name))
+        verbosity = kwargs.get('verbosity', 'LOW')
+        if verbosity not in ['NONE', 'LOW', 'HIGH', 'ALL']:
+            raise ValueError('Verbosity should be either NONE, LOW, HIGH or '
+                             'ALL.')
+
+        functions = list(functions)
+        index = 0 if data is None else \
+            [f is data for f in functions].index(True)
+        self.x0 = np.array(x0, copy=True)
+        self.functions, self.solver = _setup(functions, self.x0, solver,
+                                             verbosity)
+        self.kwargs = kwargs
+
+        # The measurements are stored in an array updated in place, by the
+        # copy of the data function.
+        self._data = self.functions[index]
+        self._y = np.array(self._data.y(), copy=True)
+        self._data.y = operators._constant(self._y)
+        self._data.prepare(self.x0)
+
+        # Validate the functions and allocate the workspaces.
+        self.solver.pre(self.functions, np.array(self.x0, copy=True))
+
+    def run(self, y=None, x0=None):
+        r"""
+        Solve the problem.
+
+        Parameters
+        ----------
+        y : array_like, optional
+            The measurements of the data function, of the shape of those it
+            was created with. Default is None, which keeps the last ones.
+        x0 : array_like, optional
+            The starting point, of the shape and dtype of the default one. A
+            given ndarray is modified in place, as by :func:`solve`. Default
+            is None, which starts from a copy of the default starting point.
+
+        Returns
+        -------
+        result : dict
+            The dictionary returned by :func:`solve`.
+
+        """
+        if y is not None:
+            np.copyto(self._y, y)
+            self._data.prepare(self.x0)
+        if x0 is None:
+            x0 = np.array(self.x0, copy=True)
+        else:
+            x0 = np.asarray(x0)
+            if x0.shape != self.x0.shape or x0.dtype != self.x0.dtype:
+                raise ValueError('The starting point should be of shape {} '
+                                 'and dtype {}.'.format(self.x0.shape,
+                                                        self.x0.dtype))
+        result = dict()
+        for _ in solve_iter(self.functions, x0, self.solver, result=result,
+                            _prepared=True, **self.kwargs):
+            pass
+        return result
+
+
 class solver(object):
     r"""
     Defines the solver object interface.
@@ -313,11 +1537,15 @@ class solver(object):
 
     Parameters
     ----------
-    step : float
+    step : float, optional
         The gradient-descent step-size. This parameter is bounded by 0 and
         :math:`\frac{2}{\beta}` where :math:`\beta` is the Lipschitz constant
         of the gradient of the smooth function (or a sum of smooth functions).
-        Default is 1.
+        Default is None, i.e. chosen by the solver from the functions and
+        operators, e.g. :math:`\frac{0.99}{\beta}` if :math:`\beta` is
+        known, and 1 otherwise. The margin accounts for the norms of the
+        operators, estimated from below by
+        :func:`pyunlocbox.operators.estimate_norm`.
     accel : pyunlocbox.acceleration.accel
         User-defined object used to adaptively change the current step size
         and solution while the algorithm is running. Default is a dummy
@@ -325,11 +1553,18 @@ class solver(object):
 
     """
 
-    def __init__(self, step=1., accel=None):
-        if step < 0:
+    # Whether the functions may cache their residual at the solution, i.e.
+    # whether _algo() only modifies it after its last call to the functions.
+    # See _moved().
+    _cache_residuals = False
+
+    def __init__(self, step=None, accel=None):
+        if step is not None and step < 0:
             raise ValueError('Step should be a positive number.')
         self.step = step
         self.accel = acceleration.dummy() if accel is None else accel
+        self.verbosity = 'NONE'  # Set by solve().
+        self.events = None  # Set by solve() to record a trace.
 
     def pre(self, functions, x0):
         """
@@ -351,11 +1586,46 @@ class solver(object):
         self.smooth_funs = []
         self.non_smooth_funs = []
         self._pre(functions, self.sol)
+        if self.step is None:
+            self.step = self._step(self.sol)
+            _log.event(logger, logging.DEBUG, self.verbosity == 'HIGH',
+                       'INFO: Step size chosen: %e', self.step)
+        self._initial_step = self.step  # Restored by reset().
         self.accel.pre(functions, self.sol)
+        self._functions = functions if self._cache_residuals else []
+        self._moved()
 
     def _pre(self, functions, x0):
         raise NotImplementedError("Class user should define this method.")
 
+    def _step(self, x0):
+        r"""
+        Return the step size used if none is given. It is called once the
+        functions have been split by :meth:`_pre`.
+        """
+        return 1.
+
+    def reset(self, functions, x0):
+        """
+        Restart from another starting point, of the shape and dtype of the one
+        given to :meth:`pre`. The functions are not validated again nor the
+        workspaces allocated. The step size is the one used when the solver
+        was initialized, e.g. before backtracking changed it. See
+        :class:`pyunlocbox.solvers.problem`.
+
+        """
+        self.sol = np.asarray(x0)
+        self.step = self._initial_step
+        self._reset(functions, self.sol)
+        self.accel.pre(functions, self.sol)
+        self._moved()
+
+    def _reset(self, functions, x0):
+        # Initialize again the solvers which do not implement it.
+        self.smooth_funs = []
+        self.non_smooth_funs = []
+        self._pre(functions, x0)
+
     def algo(self, objective, niter):
         """
         Call the solver iterative algorithm and the provided acceleration
@@ -378,13 +1648,80 @@ class solver(object):
         :meth:`self.accel.update_sol`.
 
         """
-        self.sol[:] = self.accel.update_sol(self, objective, niter)
+        sol = self.accel.update_sol(self, objective, niter)
+        if sol is not self.sol:
+            self.sol[:] = sol
+            self.accel._moved(self)
         self.step = self.accel.update_step(self, objective, niter)
         self._algo()
+        self._moved()
 
     def _algo(self):
         raise NotImplementedError("Class user should define this method.")
 
+    def _moved(self):
+        r"""
+        Tell the functions that the solution was modified.
+
+        If :attr:`_cache_residuals` is True, the functions cache their
+        residual :math:`A(x) - y` at the solution, keyed on its identity, such
+        that the solver and the objective function share it. The solver should
+        then call this method whenever it modifies the solution, which
+        :meth:`pre`, :meth:`reset`, :meth:`set_state` and :meth:`algo` do.
+        Its :meth:`_algo` should not call the functions at the solution after
+        modifying it.
+
+        """
+        for f in self._functions:
+            f._moved(self.sol)
+
+    def get_state(self):
+        """
+        State of the solver and its acceleration scheme needed to resume the
+        iterations. See :func:`pyunlocbox.solvers.solve` for checkpoints.
+
+        Returns
+        -------
+        dict
+            Arrays and scalars, keyed by name. The state of the acceleration
+            scheme is prefixed by ``accel.``. The arrays are not copied.
+
+        """
+        state = {'sol': self.sol, 'step': self.step}
+        # The functions which cached their residual at the solution. They
+        # cache it again on restore, such that the iterations are the same.
+        cached = [i for i, f in enumerate(self._functions)
+                  if f._cached_residual(self.sol) is not None]
+        state['residuals'] = np.array(cached, dtype=int)
+        state.update(self._get_state())
+        for name, value in self.accel.get_state().items():
+            state['accel.' + name] = value
+        return state
+
+    def _get_state(self):
+        return dict()  # No state besides the solution by default.
+
+    def set_state(self, state):
+        """
+        Restore a state returned by :meth:`get_state`. It should be called
+        after :meth:`pre`.
+
+        """
+        self.sol[:] = state['sol']
+        self.step = float(state['step'])
+        self._set_state(state)
+        accel = dict()
+        for name, value in state.items():
+            if name.startswith('accel.'):
+                accel[name[len('accel.'):]] = value
+        self.accel.set_state(accel)
+        self._moved()
+        for i in state.get('residuals', []):
+            self._functions[i]._residual(self.sol)
+
+    def _set_state(self, state):
+        pass
+
     def post(self):
         """
         Solver-specific post-processing. Mainly used to delete references added
@@ -395,7 +1732,7 @@ class solver(object):
         """
         self._post()
         self.accel.post()
-        del self.sol, self.smooth_funs, self.non_smooth_funs
+        del self.sol, self.smooth_funs, self.non_smooth_funs, self._functions
 
     def _post(self):
         raise NotImplementedError("Class user should define this method.")
@@ -429,10 +1766,9 @@ class gradient_descent(solver):
     >>> x0 = np.random.rand(dim)
     >>> x0 = xstar + 5.*(x0 - xstar) / np.linalg.norm(x0 - xstar)
     >>> A = np.random.rand(dim, dim)
-    >>> step = 1/np.linalg.norm(np.dot(A.T, A))
     >>> f = functions.norm_l2(lambda_=0.5, A=A, y=np.dot(A, xstar))
     >>> fd = functions.dummy()
-    >>> solver = solvers.gradient_descent(step=step)
+    >>> solver = solvers.gradient_descent()  # Step 1/||A||^2, estimated.
     >>> params = {'rtol':0, 'maxit':14000, 'verbosity':'NONE'}
     >>> ret = solvers.solve([f, fd], x0, solver, **params)
     >>> pctdiff = 100*np.sum((xstar - ret['sol'])**2)/np.sum(xstar**2)
@@ -441,6 +1777,8 @@ class gradient_descent(solver):
 
     """
 
+    _cache_residuals = True  # See solver._moved().
+
     def __init__(self, **kwargs):
         super(gradient_descent, self).__init__(**kwargs)
 
@@ -453,18 +1791,26 @@ class gradient_descent(solver):
                 raise ValueError('Gradient descent requires each function to '
                                  'implement grad().')
 
-        if self.verbosity is 'HIGH':
-            print('INFO: Gradient descent minimizing {} smooth '
-                  'functions.'.format(len(self.smooth_funs)))
+        _log.event(logger, logging.DEBUG, self.verbosity == 'HIGH',
+                   'INFO: Gradient descent minimizing %d smooth functions.',
+                   len(self.smooth_funs))
+
+        self._grad = _empty(x0)
+        self._tmp = _empty(x0)
+
+    def _step(self, x0):
+        return _gradient_step(self.smooth_funs, x0)
+
+    def _reset(self, functions, x0):
+        pass  # Only workspaces.
 
     def _algo(self):
-        grad = np.zeros(self.sol.shape)
-        for f in self.smooth_funs:
-            grad += f.grad(self.sol)
-        self.sol[:] -= self.step * grad
+        grad = _gradient(self.smooth_funs, self.sol, self._grad, self._tmp)
+        grad *= self.step
+        self.sol[:] -= grad
 
     def _post(self):
-        pass
+        del self._grad, self._tmp
 
 
 class forward_backward(solver):
@@ -512,13 +1858,17 @@ class forward_backward(solver):
 
     """
 
-    def __init__(self, accel=acceleration.fista(), **kwargs):
+    _cache_residuals = True  # See solver._moved().
+
+    def __init__(self, accel=None, **kwargs):
+        if accel is None:
+            accel = acceleration.fista()
         super(forward_backward, self).__init__(accel=accel, **kwargs)
 
     def _pre(self, functions, x0):
 
-        if self.verbosity is 'HIGH':
-            print('INFO: Forward-backward method')
+        _log.event(logger, logging.DEBUG, self.verbosity == 'HIGH',
+                   'INFO: Forward-backward method')
 
         if len(functions) != 2:
             raise ValueError('Forward-backward requires two convex functions.')
@@ -533,14 +1883,29 @@ class forward_backward(solver):
             raise ValueError('Forward-backward requires a function to '
                              'implement prox() and the other grad().')
 
+        self._x = _empty(x0)
+
+    def _step(self, x0):
+        return _gradient_step(self.smooth_funs, x0)
+
+    def _reset(self, functions, x0):
+        pass  # Only a workspace.
+
     def _algo(self):
+        grad = self.smooth_funs[0].grad(self.sol, out=self._x)
+        self._forward_backward(grad, self.step, out=self.sol)
+
+    def _forward_backward(self, grad, step, out):
+        # An iteration from the gradient at the solution, written in out. It
+        # is called by pyunlocbox.acceleration.backtracking to try steps.
         # Forward step
-        x = self.sol - self.step * self.smooth_funs[0].grad(self.sol)
+        x = np.multiply(grad, -step, out=self._x)
+        x += self.sol
         # Backward step
-        self.sol[:] = self.non_smooth_funs[0].prox(x, self.step)
+        self.non_smooth_funs[0].prox(x, step, out=out)
 
     def _post(self):
-        pass
+        del self._x
 
 
 class generalized_forward_backward(solver):
@@ -584,6 +1949,8 @@ class generalized_forward_backward(solver):
 
     """
 
+    _cache_residuals = True  # See solver._moved().
+
     def __init__(self, lambda_=1, *args, **kwargs):
         super(generalized_forward_backward, self).__init__(*args, **kwargs)
         self.lambda_ = lambda_
@@ -604,32 +1971,55 @@ class generalized_forward_backward(solver):
                 raise ValueError('Generalized forward-backward requires each '
                                  'function to implement prox() or grad().')
 
-        if self.verbosity is 'HIGH':
-            print('INFO: Generalized forward-backward minimizing {} smooth '
-                  'functions and {} non-smooth functions.'.format(len(self.f),
-                                                                  len(self.g)))
+        _log.event(logger, logging.DEBUG, self.verbosity == 'HIGH',
+                   'INFO: Generalized forward-backward minimizing %d smooth '
+                   'functions and %d non-smooth functions.',
+                   len(self.smooth_funs), len(self.non_smooth_funs))
+
+        self._grad = _empty(x0)
+        self._sol = _empty(x0)
+        self._tmp = _empty(x0)
+
+    def _step(self, x0):
+        return _gradient_step(self.smooth_funs, x0)
+
+    def _reset(self, functions, x0):
+        for z in self.z:
+            z[:] = x0
 
     def _algo(self):
 
         # Smooth functions.
-        grad = np.zeros(self.sol.shape)
-        for f in self.smooth_funs:
-            grad += f.grad(self.sol)
+        grad = _gradient(self.smooth_funs, self.sol, self._grad, self._tmp)
+        grad *= self.step
 
         # Non-smooth functions.
         if not self.non_smooth_funs:
-            self.sol[:] -= self.step * grad  # Reduces to gradient descent.
+            self.sol[:] -= grad  # Reduces to gradient descent.
         else:
-            sol = np.zeros(self.sol.shape)
+            sol, tmp = self._sol, self._tmp
+            sol.fill(0)
             for i, g in enumerate(self.non_smooth_funs):
-                tmp = 2 * self.sol - self.z[i] - self.step * grad
-                tmp[:] = g.prox(tmp, self.step * len(self.non_smooth_funs))
-                self.z[i] += self.lambda_ * (tmp - self.sol)
-                sol += 1. * self.z[i] / len(self.non_smooth_funs)
+                np.multiply(2, self.sol, out=tmp)
+                tmp -= self.z[i]
+                tmp -= grad
+                g.prox(tmp, self.step * len(self.non_smooth_funs), out=tmp)
+                tmp -= self.sol
+                tmp *= self.lambda_
+                self.z[i] += tmp
+                np.divide(self.z[i], len(self.non_smooth_funs), out=tmp)
+                sol += tmp
             self.sol[:] = sol
 
+    def _get_state(self):
+        return {'z': np.array(self.z)}
+
+    def _set_state(self, state):
+        for z, value in zip(self.z, state['z']):
+            z[:] = value
+
     def _post(self):
-        del self.z
+        del self.z, self._grad, self._sol, self._tmp
 
 
 class douglas_rachford(solver):
@@ -672,6 +2062,8 @@ class douglas_rachford(solver):
 
     """
 
+    _cache_residuals = True  # See solver._moved().
+
     def __init__(self, lambda_=1, *args, **kwargs):
         super(douglas_rachford, self).__init__(*args, **kwargs)
         self.lambda_ = lambda_
@@ -692,14 +2084,29 @@ class douglas_rachford(solver):
                                  'function to implement prox().')
 
         self.z = np.array(x0, copy=True)
+        self._tmp = _empty(x0)
+
+    def _reset(self, functions, x0):
+        self.z[:] = x0
 
     def _algo(self):
-        tmp = self.non_smooth_funs[0].prox(2 * self.sol - self.z, self.step)
-        self.z[:] = self.z + self.lambda_ * (tmp - self.sol)
-        self.sol[:] = self.non_smooth_funs[1].prox(self.z, self.step)
+        tmp = self._tmp
+        np.multiply(2, self.sol, out=tmp)
+        tmp -= self.z
+        self.non_smooth_funs[0].prox(tmp, self.step, out=tmp)
+        tmp -= self.sol
+        tmp *= self.lambda_
+        self.z += tmp
+        self.non_smooth_funs[1].prox(self.z, self.step, out=self.sol)
+
+    def _get_state(self):
+        return {'z': self.z}
+
+    def _set_state(self, state):
+        self.z[:] = state['z']
 
     def _post(self):
-        del self.z
+        del self.z, self._tmp
 
 
 class primal_dual(solver):
@@ -714,7 +2121,8 @@ class primal_dual(solver):
     L : function or ndarray, optional
         The transformation L that maps from the primal variable space to the
         dual variable space. Default is the identity, :math:`L(x)=x`. If `L` is
-        an ``ndarray``, it will be converted to the operator form.
+        an ``ndarray``, it will be converted to the operator form. A sparse
+        matrix is applied as `A` by :class:`pyunlocbox.functions.func`.
     Lt : function or ndarray, optional
         The adjoint operator. If `Lt` is an ``ndarray``, it will be converted
         to the operator form. If `L` is an ``ndarray``, default is the
@@ -725,30 +2133,32 @@ class primal_dual(solver):
 
     """
 
+    _cache_residuals = True  # See solver._moved().
+
     def __init__(self, L=None, Lt=None, d0=None, *args, **kwargs):
         super(primal_dual, self).__init__(*args, **kwargs)
 
         if L is None:
-            self.L = lambda x: x
+            self.L = operators._identity()
         else:
             if callable(L):
                 self.L = L
             else:
                 # Transform matrix form to operator form.
-                self.L = lambda x: L.dot(x)
+                self.L = operators._operator(L)
 
         if Lt is None:
             if L is None:
-                self.Lt = lambda x: x
+                self.Lt = operators._identity()
             elif callable(L):
                 self.Lt = L
             else:
-                self.Lt = lambda x: L.T.dot(x)
+                self.Lt = operators._operator(L, transpose=True)
         else:
             if callable(Lt):
                 self.Lt = Lt
             else:
-                self.Lt = lambda x: Lt.dot(x)
+                self.Lt = operators._operator(Lt)
 
         self.d0 = d0
 
@@ -757,10 +2167,18 @@ class primal_dual(solver):
         if self.d0 is None:
             self.dual_sol = self.L(x0)
         else:
-            self.dual_sol = self.d0
+            self.dual_sol = np.array(self.d0, copy=True)
+
+    def _reset(self, functions, x0):
+        self.dual_sol[:] = self.L(x0) if self.d0 is None else self.d0
+
+    def _get_state(self):
+        return {'dual_sol': self.dual_sol}
+
+    def _set_state(self, state):
+        self.dual_sol[:] = state['dual_sol']
 
     def _post(self):
-        self.d0 = None
         del self.dual_sol
 
 
@@ -787,7 +2205,9 @@ class mlfbf(primal_dual):
     implement the :meth:`pyunlocbox.functions.func.grad` method.
 
     The step-size should be in the interval :math:`\left] 0, \frac{1}{\beta +
-    \|L\|_{2}}\right[`.
+    \|L\|_{2}}\right[`. If not given, it is half the upper bound, with
+    :math:`\|L\|_{2}` estimated by
+    :func:`pyunlocbox.operators.estimate_norm`.
 
     See :cite:`komodakis2015primaldual`, Algorithm 6, for details.
 
@@ -823,23 +2243,53 @@ class mlfbf(primal_dual):
         self.non_smooth_funs.append(functions[1])   # g
         self.smooth_funs.append(functions[2])       # h
 
+        self._y1, self._p1, self._q1 = [_empty(x0) for _ in range(3)]
+        self._y2, self._p2, self._q2 = [_empty(self.dual_sol)
+                                        for _ in range(3)]
+
+    def _step(self, x0):
+        # Half the upper bound, as the norm of L is estimated from below.
+        beta = _lipschitz(self.smooth_funs, x0)
+        if beta is None:
+            return 1.
+        bound = beta + operators.estimate_norm(self.L, self.Lt, x0)
+        return 0.5 / bound if bound else 1.
+
     def _algo(self):
+        y1, p1, q1 = self._y1, self._p1, self._q1
+        y2, p2, q2 = self._y2, self._p2, self._q2
+
         # Forward steps (in both primal and dual spaces)
-        y1 = self.sol - self.step * (self.smooth_funs[0].grad(self.sol) +
-                                     self.Lt(self.dual_sol))
-        y2 = self.dual_sol + self.step * self.L(self.sol)
+        self.smooth_funs[0].grad(self.sol, out=y1)
+        y1 += self.Lt(self.dual_sol)
+        y1 *= self.step
+        np.subtract(self.sol, y1, out=y1)
+        np.multiply(self.step, self.L(self.sol), out=y2)
+        y2 += self.dual_sol
 
         # Backward steps (in both primal and dual spaces)
-        p1 = self.non_smooth_funs[0].prox(y1, self.step)
-        p2 = _prox_star(self.non_smooth_funs[1], y2, self.step)
+        self.non_smooth_funs[0].prox(y1, self.step, out=p1)
+        _prox_star(self.non_smooth_funs[1], y2, self.step, out=p2)
 
         # Forward steps (in both primal and dual spaces)
-        q1 = p1 - self.step * (self.smooth_funs[0].grad(p1) + self.Lt(p2))
-        q2 = p2 + self.step * self.L(p1)
+        self.smooth_funs[0].grad(p1, out=q1)
+        q1 += self.Lt(p2)
+        q1 *= self.step
+        np.subtract(p1, q1, out=q1)
+        np.multiply(self.step, self.L(p1), out=q2)
+        q2 += p2
 
         # Update solution (in both primal and dual spaces)
-        self.sol[:] = self.sol - y1 + q1
-        self.dual_sol[:] = self.dual_sol - y2 + q2
+        np.subtract(self.sol, y1, out=y1)
+        y1 += q1
+        self.sol[:] = y1
+        np.subtract(self.dual_sol, y2, out=y2)
+        y2 += q2
+        self.dual_sol[:] = y2
+
+    def _post(self):
+        super(mlfbf, self)._post()
+        del self._y1, self._p1, self._q1, self._y2, self._p2, self._q2
 
 
 class projection_based(primal_dual):
@@ -906,20 +2356,59 @@ class projection_based(primal_dual):
         self.non_smooth_funs.append(functions[0])   # f
         self.non_smooth_funs.append(functions[1])   # g
 
+        # Primal and dual workspaces.
+        self._a, self._s, self._d1, self._p = [_empty(x0) for _ in range(4)]
+        self._b, self._t, self._d2, self._q = [_empty(self.dual_sol)
+                                               for _ in range(4)]
+
     def _algo(self):
-        a = self.non_smooth_funs[0].prox(self.sol - self.step *
-                                         self.Lt(self.dual_sol), self.step)
+        a, s, d1, p = self._a, self._s, self._d1, self._p
+        b, t, d2, q = self._b, self._t, self._d2, self._q
+
+        np.multiply(self.step, self.Lt(self.dual_sol), out=a)
+        np.subtract(self.sol, a, out=a)
+        self.non_smooth_funs[0].prox(a, self.step, out=a)
         ell = self.L(self.sol)
-        b = self.non_smooth_funs[1].prox(ell + self.step * self.dual_sol,
-                                         self.step)
-        s = (self.sol - a) / self.step + self.Lt(ell - b) / self.step
-        t = b - self.L(a)
-        tau = np.sum(s**2) + np.sum(t**2)
+        np.multiply(self.step, self.dual_sol, out=b)
+        b += ell
+        self.non_smooth_funs[1].prox(b, self.step, out=b)
+        np.subtract(self.sol, a, out=d1)  # sol - a
+        np.subtract(ell, b, out=d2)       # ell - b
+        np.divide(d1, self.step, out=s)
+        np.divide(self.Lt(d2), self.step, out=p)
+        s += p
+        np.subtract(b, self.L(a), out=t)
+        tau = np.sum(np.square(s, out=p)) + np.sum(np.square(t, out=q))
         if tau == 0:
             self.sol[:] = a
-            self.dual_sol[:] = self.dual_sol + (ell - b) / self.step
+            np.divide(d2, self.step, out=q)
+            q += self.dual_sol
+            self.dual_sol[:] = q
         else:
-            theta = self.lambda_ * (np.sum((self.sol - a)**2) / self.step +
-                                    np.sum((ell - b)**2) / self.step) / tau
-            self.sol[:] = self.sol - theta * s
-            self.dual_sol[:] = self.dual_sol - theta * t
+            theta = self.lambda_ * (np.sum(np.square(d1, out=p)) / self.step +
+                                    np.sum(np.square(d2, out=q)) /
+                                    self.step) / tau
+            np.multiply(theta, s, out=p)
+            np.subtract(self.sol, p, out=p)
+            self.sol[:] = p
+            np.multiply(theta, t, out=q)
+            np.subtract(self.dual_sol, q, out=q)
+            self.dual_sol[:] = q
+
+    def _post(self):
+        super(projection_based, self)._post()
+        del self._a, self._s, self._d1, self._p
+        del self._b, self._t, self._d2, self._q
+
+
+# Coroutines are a syntax error before Python 3.5. asyncio is slow to import:
+# load it on first access where modules support __getattr__ (Python 3.7).
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name == 'solve_async':
+            from pyunlocbox import _async
+            return _async.solve_async
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+elif sys.version_info >= (3, 5):
+    from pyunlocbox._async import solve_async  # noqa: E402,F401
@@ -73,7 +73,7 @@ class FunctionsTestCase(unittest.TestCase):
 
         """
         y = [4., 5., 6., 7.]
-        solver = solvers.forward_backward(accel=acceleration.fista())
+        solver = solvers.forward_backward(accel=acceleration.fista(), step=1)
         param = {'solver': solver, 'rtol': 1e-6, 'verbosity': 'NONE'}
 
         # L2-norm prox and dummy gradient.
@@ -140,7 +140,7 @@ class FunctionsTestCase(unittest.TestCase):
         """
         y = [4., 5., 6., 7.]
         accel = acceleration.fista_backtracking()
-        solver = solvers.forward_backward(accel=accel)
+        solver = solvers.forward_backward(accel=accel, step=1)
         param = {'solver': solver, 'rtol': 1e-6, 'verbosity': 'NONE'}
 
         # L2-norm prox and dummy gradient.
@@ -191,6 +191,36 @@ class FunctionsTestCase(unittest.TestCase):
         self.assertRaises(ValueError, accel.__init__, 10, ['not', 'good'])
         self.assertRaises(ValueError, accel.__init__, 10, 'nope')
 
+    def test_regularized_nonlinear_objective(self):
+        """
+        Test that regularized non-linear acceleration does not depend on the
+        evaluations of the objective function made by the solve.
+
+        """
+        rs = np.random.RandomState(0)
+        A = rs.uniform(size=(6, 4))
+        f1 = functions.norm_l2(A=A, y=np.dot(A, [4., 5., 6., 7.]))
+        f2 = functions.dummy()
+        sols = []
+        for evaluate, rtol in [(1, None), ('AUTO', None), (3, None),
+                               ('AUTO', 1e-12)]:
+            accel = acceleration.regularized_nonlinear(k=3)
+            solver = solvers.gradient_descent(step=.01, accel=accel)
+            ret = solvers.solve([f1, f2], np.zeros(4), solver, rtol=rtol,
+                                evaluate=evaluate, maxit=30,
+                                verbosity='NONE')
+            self.assertEqual(ret['niter'], 30)
+            sols.append(ret['sol'])
+        # Fewer evaluations kept than the size of the buffer.
+        accel = acceleration.regularized_nonlinear(k=3)
+        solver = solvers.gradient_descent(step=.01, accel=accel)
+        ret = solvers.solve([f1, f2], np.zeros(4), solver, rtol=None,
+                            history=2, maxit=30, verbosity='NONE')
+        self.assertEqual(ret['objective'].shape, (2, 2))
+        sols.append(ret['sol'])
+        for sol in sols[1:]:
+            nptest.assert_array_equal(sol, sols[0])
+
     def test_acceleration_comparison(self):
         """
         Test that all solvers return the same and correct solution.
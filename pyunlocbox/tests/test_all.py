@@ -11,6 +11,7 @@ import unittest
 import doctest
 
 from . import test_functions, test_operators, test_solvers, test_acceleration
+from . import test_trace
 
 
 def gen_recursive_file(root, ext):
@@ -40,6 +41,7 @@ suites.append(test_functions.suite)
 suites.append(test_operators.suite)
 suites.append(test_solvers.suite)
 suites.append(test_acceleration.suite)
+suites.append(test_trace.suite)
 suites.append(test_docstrings('pyunlocbox', '.py'))
 suites.append(test_docstrings('.', '.rst'))
 suite = unittest.TestSuite(suites)
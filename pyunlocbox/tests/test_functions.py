@@ -6,13 +6,15 @@ Test suite for the functions module of the pyunlocbox package.
 
 """
 
+import sys
+import pickle
 import unittest
 import inspect
 
 import numpy as np
 import numpy.testing as nptest
 
-from pyunlocbox import functions
+from pyunlocbox import functions, solvers
 
 
 class FunctionsTestCase(unittest.TestCase):
@@ -55,6 +57,33 @@ class FunctionsTestCase(unittest.TestCase):
         assert_equivalent({'A': A}, {'A': A, 'At': A.T})
         assert_equivalent({'A': lambda x: A.dot(x)}, {'A': A, 'At': A})
 
+    def test_cap(self):
+        """
+        Test the capabilities of the function objects, which should be known
+        without executing their methods.
+
+        """
+        self.assertEqual(functions.dummy().cap(), ['EVAL', 'GRAD', 'PROX'])
+        self.assertEqual(functions.norm_l1().cap(), ['EVAL', 'PROX'])
+        self.assertEqual(functions.norm_l1(tight=False).cap(), ['EVAL'])
+        self.assertEqual(functions.norm_l2().cap(), ['EVAL', 'GRAD', 'PROX'])
+        self.assertEqual(functions.norm_l2(tight=False).cap(),
+                         ['EVAL', 'GRAD', 'PROX'])
+        self.assertEqual(functions.norm_nuclear().cap(), ['EVAL', 'PROX'])
+        self.assertEqual(functions.proj_b2().cap(), ['EVAL', 'PROX'])
+
+        # The proximal operator is not executed.
+        f = functions.norm_tv(maxit=10**9, tol=0)
+        self.assertEqual(f.cap(np.zeros((100, 100))), ['EVAL', 'PROX'])
+
+        # Methods assigned to objects.
+        f = functions.func()
+        f._prox = lambda x, T: x
+        self.assertEqual(f.cap(), ['PROX'])
+        f = functions.norm_l1(tight=False)
+        f._prox = lambda x, T: x
+        self.assertEqual(f.cap(), ['EVAL', 'PROX'])
+
     def test_dummy(self):
         """
         Test the dummy derived class.
@@ -125,6 +154,238 @@ class FunctionsTestCase(unittest.TestCase):
         nptest.assert_allclose(f.prox([10, 0, -5], 1),
                                [1.103,  0.319,  -0.732], rtol=1e-3)
 
+    def test_pickle(self):
+        """
+        Test that the functions can be pickled, without their cache, and that
+        their matrices are passed out-of-band with the protocol 5.
+
+        """
+        x = np.array([[7, 8, 9], [10, 324, -45], [-7, -.2, 5]])
+        A = np.array([[-4, 2, 5], [1, 3, -7], [2, -1, 0]])
+        params = [{}, {'y': 3.2}, {'A': A, 'y': x}, {'A': A, 'At': A.T}]
+        funcs = inspect.getmembers(functions, inspect.isclass)
+        for name, cls in funcs:
+            if name in ['func', 'norm', 'proj']:
+                continue
+            for param in params:
+                f1 = cls(**param)
+                f1.eval(x)
+                f2 = pickle.loads(pickle.dumps(f1, pickle.HIGHEST_PROTOCOL))
+                self.assertIsNone(f2._residual_cache)
+                self.assertEqual(f1.eval(x), f2.eval(x))
+                nptest.assert_array_equal(f1.prox(x, 3), f2.prox(x, 3))
+                if 'GRAD' in f1.cap(x):
+                    nptest.assert_array_equal(f1.grad(x), f2.grad(x))
+
+        if sys.version_info >= (3, 8):
+            A = np.random.RandomState(0).normal(size=(1000, 100))
+            f1 = functions.norm_l2(A=A)
+            buffers = []
+            data = pickle.dumps(f1, protocol=5, buffer_callback=buffers.append)
+            self.assertLess(len(data), 10000)
+            # A and A.T share a buffer.
+            sizes = [buffer.raw().nbytes for buffer in buffers]
+            self.assertEqual(sizes.count(A.nbytes), 1)
+            f2 = pickle.loads(data, buffers=buffers)
+            self.assertTrue(np.shares_memory(f2.A.A, A))
+            x = np.ones(100)
+            nptest.assert_array_equal(f1.grad(x), f2.grad(x))
+
+    def test_eval_grad(self):
+        """
+        Test the fused evaluation and gradient, and the residual cache.
+
+        """
+        A = np.array([[1., 2.], [3., 4.], [5., 6.]])
+        y = np.array([1., -1., 2.])
+        ncalls = [0]
+
+        def op(x):
+            ncalls[0] += 1
+            return A.dot(x)
+
+        f = functions.norm_l2(A=op, At=lambda x: A.T.dot(x), y=y, lambda_=3)
+        x = np.array([1., -2.])
+        fval, grad = f.eval_grad(x)
+        self.assertEqual(ncalls[0], 1)
+        self.assertEqual(fval, f.eval(x))
+        nptest.assert_allclose(grad, f.grad(x))
+        nptest.assert_allclose(grad, 6 * A.T.dot(A.dot(x) - y))
+
+        # The residual is only cached at the solution of a solver, which
+        # tells when it is modified, and with constant measurements.
+        f.prepare(x)
+        f._moved(x)
+        ncalls[0] = 0
+        fval, grad = f.eval(x), f.grad(x)
+        self.assertEqual(ncalls[0], 1)
+        self.assertEqual(f.eval(x.copy()), fval)
+        self.assertEqual(ncalls[0], 2)
+        x[0] = 2
+        f._moved(x)
+        self.assertEqual(f.eval(x), 3 * np.sum((A.dot(x) - y)**2))
+        self.assertEqual(ncalls[0], 3)
+        # Until a parameter is assigned.
+        f.lambda_ = 1
+        self.assertEqual(f.eval(x), np.sum((A.dot(x) - y)**2))
+        self.assertEqual(f.eval(x), np.sum((A.dot(x) - y)**2))
+        self.assertEqual(ncalls[0], 5)
+
+        # Default implementation.
+        f = functions.norm_l1(y=[1, 2])
+        f._grad = lambda x: np.sign(x)
+        fval, grad = f.eval_grad([3, 1])
+        self.assertEqual(fval, 3)
+        nptest.assert_array_equal(grad, [1, 1])
+
+    def test_out(self):
+        """
+        Test that the proximal operator and the gradient can write their
+        result in a given array.
+
+        """
+        f = functions.norm_l2(y=[1., 2.], lambda_=2)
+        x = np.array([3., 4.])
+        out = np.empty(2)
+        sol = f.prox(x, 1, out=out)
+        self.assertIs(sol, out)
+        nptest.assert_allclose(out, f.prox(x, 1))
+        sol = f.grad(x, out=out)
+        self.assertIs(sol, out)
+        nptest.assert_allclose(out, f.grad(x))
+        # In place.
+        prox = f.prox(x, 1)
+        sol = f.prox(x, 1, out=x)
+        self.assertIs(sol, x)
+        nptest.assert_allclose(x, prox)
+        f = functions.dummy()
+        sol = f.prox(x, 1, out=x)
+        nptest.assert_allclose(sol, prox)
+
+        # Computed in place, with the precision of out.
+        A = np.array([[0., 1.], [1., 0.]])
+        for f in [functions.norm_l1(A=A, y=[1., 2.], lambda_=.5),
+                  functions.norm_l2(A=A, y=[1., 2.], lambda_=.5)]:
+            x = np.array([3., -4.])
+            methods = [lambda x, out=None: f.prox(x, 1, out=out)]
+            if 'GRAD' in f.cap():
+                methods.append(f.grad)
+            for method in methods:
+                ref = method(x)
+                out = np.empty(2, dtype=np.float32)
+                self.assertIs(method(x, out=out), out)
+                nptest.assert_allclose(out, ref, rtol=1e-6)
+                y = x.copy()
+                self.assertIs(method(y, out=y), y)
+                nptest.assert_allclose(y, ref)
+        # Unless the method is assigned to the object.
+        f = functions.norm_l2()
+        f._grad = lambda x: -x
+        self.assertIs(f.grad(x, out=out), out)
+        nptest.assert_allclose(out, -x)
+
+    def test_dtype(self):
+        """
+        Test that the functions preserve the floating point precision of
+        their input, even with float64 measurements and weights.
+
+        """
+        rs = np.random.RandomState(0)
+        y = rs.uniform(size=(6, 6))
+        w = rs.uniform(size=(6, 6))
+        A = np.identity(6)[:4]
+        for dtype in [np.float32, np.float64, np.complex64]:
+            x = rs.uniform(size=(6, 6)).astype(dtype)
+            funcs = [functions.dummy(),
+                     functions.norm_l1(y=y, w=w),
+                     functions.norm_l2(y=y, w=w),
+                     functions.norm_l2(A=A.astype(dtype), y=y[:4]),
+                     functions.proj_b2(y=y, epsilon=.1),
+                     functions.proj_b2(A=A.astype(dtype), y=y[:4],
+                                       tight=False, epsilon=.1)]
+            if dtype is not np.complex64:
+                funcs.append(functions.norm_nuclear())
+                funcs.append(functions.norm_tv(maxit=5))
+            for f in funcs:
+                self.assertEqual(f.prox(x, np.float64(.5)).dtype, dtype)
+                if 'GRAD' in f.cap(x):
+                    self.assertEqual(f.grad(x).dtype, dtype)
+                    self.assertEqual(f.eval_grad(x)[1].dtype, dtype)
+
+    def test_prepare(self):
+        """
+        Test that prepared functions compute the same as unprepared ones,
+        with less operator applications, until an attribute is assigned.
+
+        """
+        rs = np.random.RandomState(0)
+        A = np.linalg.qr(rs.normal(size=(6, 4)))[0]  # Tight frame.
+        y = rs.normal(size=6)
+        w = rs.uniform(size=6)
+        calls = []
+
+        def At(z):
+            calls.append(z)
+            return A.dot(z)
+
+        def funcs():
+            return [functions.norm_l2(A=A.T, At=At, y=y[:4], w=.8,
+                                      lambda_=.7),
+                    functions.norm_l2(y=y, w=w),
+                    functions.norm_l1(y=y, w=w, lambda_=.3),
+                    functions.proj_b2(y=y, epsilon=.5)]
+        x = rs.normal(size=6)
+        for f, g in zip(funcs(), funcs()):
+            self.assertIs(g.prepare(x), g)
+            for T in [.5, .5, 2.]:
+                nptest.assert_allclose(g.prox(x, T), f.prox(x, T))
+            nptest.assert_allclose(g.eval(x), f.eval(x))
+            if 'GRAD' in f.cap():
+                nptest.assert_allclose(g.grad(x), f.grad(x))
+                nptest.assert_allclose(g.eval_grad(x)[1], f.eval_grad(x)[1])
+
+        # The adjoint is applied once to the measurements.
+        f, g = funcs()[0], funcs()[0].prepare(x)
+        del calls[:]
+        for _ in range(3):
+            g.prox(x, 1)
+        self.assertEqual(len(calls), 1)
+        for _ in range(3):
+            f.prox(x, 1)
+        self.assertEqual(len(calls), 4)
+
+        # Assigning an attribute discards the precomputed quantities.
+        f.w = g.w = np.ones(1)
+        nptest.assert_allclose(g.prox(x, 1), f.prox(x, 1))
+        f.y = g.y = functions.op._constant(2 * y[:4])
+        nptest.assert_allclose(g.prox(x, 1), f.prox(x, 1))
+        self.assertIsNone(g._plan)
+        g.prepare(x).verbosity = 'LOW'
+        self.assertIsNotNone(g._plan)
+
+        # Another precision is not prepared, but still preserved.
+        g = funcs()[0].prepare(dtype=np.float32)
+        x32 = x.astype(np.float32)
+        self.assertEqual(g.prox(x32, 1).dtype, np.float32)
+        nptest.assert_allclose(g.prox(x32, 1), funcs()[0].prox(x32, 1),
+                               rtol=1e-5)
+        nptest.assert_allclose(g.prox(x, 1), funcs()[0].prox(x, 1))
+
+        # Measurements given as a function are evaluated at each call.
+        yk = [y]
+        f = functions.norm_l2(y=lambda: yk[0]).prepare(x)
+        yk[0] = 2 * y
+        nptest.assert_allclose(f.prox(x, 1), (x + 4 * y) / 3)
+
+        # Copies and pickles are not prepared. Solves prepare copies, and
+        # leave the given functions as they are.
+        f, g = funcs()[0], funcs()[1].prepare(x)
+        self.assertIsNone(pickle.loads(pickle.dumps(g))._plan)
+        plan = g._plan
+        solvers.solve([f, g], x.copy(), maxit=5, verbosity='NONE')
+        self.assertIsNone(f._plan)
+        self.assertIs(g._plan, plan)
+
     def test_soft_thresholding(self):
         """
         Test the soft thresholding helper function.
@@ -174,6 +435,24 @@ class FunctionsTestCase(unittest.TestCase):
         self.assertEqual(f.eval([[-3]]), 9)
         nptest.assert_allclose(f.prox(np.array([[1, 1], [1, 1]]), 1. / 3),
                                [[.5, .5], [.5, .5]])
+        x = np.arange(6.).reshape(3, 2)
+        U, s, V = np.linalg.svd(x, full_matrices=False)
+        nptest.assert_allclose(f.prox(x, .1),
+                               np.dot(U * np.maximum(s - .3, 0), V))
+
+        # Applied to A(x) - y, with a sparse permutation matrix.
+        from scipy import sparse
+        P = sparse.csr_matrix(np.identity(3)[[2, 0, 1]])
+        y = np.ones((3, 2))
+        f = functions.norm_nuclear(lambda_=3, A=P, y=y)
+        res = P.dot(x) - y
+        U, s, V = np.linalg.svd(res, full_matrices=False)
+        nptest.assert_allclose(f.eval(x), 3 * np.sum(s))
+        nptest.assert_allclose(f.prox(x, .1), P.T.dot(
+            y + np.dot(U * np.maximum(s - .3, 0), V)))
+        f = functions.norm_nuclear(A=P, tight=False)
+        self.assertNotIn('PROX', f.cap())
+        self.assertRaises(NotImplementedError, f.prox, x, 1)
 
     def test_norm_tv(self):
         """
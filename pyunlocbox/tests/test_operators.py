@@ -6,12 +6,19 @@ Test suite for the operators module of the pyunlocbox package.
 
 """
 
+import os
+import pickle
+import shutil
+import sys
+import tempfile
 import unittest
+import multiprocessing
 
 import numpy as np
 import numpy.testing as nptest
+from scipy import sparse
 
-from pyunlocbox import operators
+from pyunlocbox import functions, operators, solvers
 
 
 class OperatorsTestCase(unittest.TestCase):
@@ -402,5 +409,224 @@ class OperatorsTestCase(unittest.TestCase):
         nptest.assert_array_equal(xyzt_mat_w, operators.div(dx, dy, dz, dt,
                                                             **weights))
 
+    def test_dtype(self):
+        rs = np.random.RandomState(0)
+        for dtype in [np.float32, np.float64, np.complex64]:
+            for dim in [1, 2, 3, 4]:
+                x = rs.uniform(size=(3,) * dim).astype(dtype)
+                grads = operators.grad(x, dim=dim)
+                grads = [grads] if dim == 1 else grads
+                for g in grads:
+                    self.assertEqual(g.dtype, dtype)
+                self.assertEqual(operators.div(*grads).dtype, dtype)
+
+    def test_shared(self):
+        """
+        Test that a shared matrix is pickled by reference, and that the
+        operators of the receivers are views of the same memory.
+
+        """
+        rs = np.random.RandomState(0)
+        A = rs.normal(size=(100, 50))
+        x = rs.normal(size=50)
+        A_csr = sparse.random(100, 50, density=.1, format='csr',
+                              random_state=rs)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        paths = [os.path.join(tmpdir, 'A')]
+        if sys.version_info >= (3, 8):  # Shared memory.
+            paths.append(None)
+        for path in paths:
+            for matrix in [A, A_csr]:
+                S = operators.shared(matrix, path)
+                self.assertEqual(S.shape, (100, 50))
+                self.assertEqual(S.dtype, np.float64)
+                nptest.assert_allclose(S.dot(x), matrix.dot(x))
+                nptest.assert_allclose(S.T.dot(S.dot(x)),
+                                       matrix.T.dot(matrix.dot(x)))
+                data = pickle.dumps(S)
+                self.assertLess(len(data), 1000)
+                R = pickle.loads(data)
+                nptest.assert_allclose(R.dot(x), matrix.dot(x))
+                R.close()
+                S.close()
+
+            # The receiver sees the memory of the creator.
+            S = operators.shared(A, path)
+            R = pickle.loads(pickle.dumps(S))
+            self.assertRaises(ValueError, R.matrix.__setitem__, 0, 0)
+            if path is None:
+                buf = S._memory[0].buf
+            else:
+                buf = np.load(path + '.A.npy', mmap_mode='r+')
+            np.ndarray(A.shape, A.dtype, buf)[0, 0] = 42
+            self.assertEqual(R.matrix[0, 0], 42)
+            del buf
+            R.close()
+            S.close()
+
+        # The creator frees the shared memory.
+        if sys.version_info >= (3, 8):
+            from multiprocessing import shared_memory
+            S = operators.shared(A)
+            name = S._memory[0].name
+            del S
+            self.assertRaises(FileNotFoundError,
+                              shared_memory.SharedMemory, name)
+
+        # Functions and primal-dual solvers in spawned processes.
+        y = A.dot(x)
+        with operators.shared(A, paths[-1]) as S:
+            problem = {'functions': [functions.norm_l1(),
+                                     functions.norm_l1(),
+                                     functions.norm_l2(A=S, y=y)],
+                       'x0': np.zeros(50),
+                       'solver': solvers.mlfbf(L=S, step=1e-3)}
+            params = {'maxit': 10, 'verbosity': 'NONE'}
+            ref = solvers.solve(**dict(problem, x0=np.zeros(50), **params))
+            pool = multiprocessing.get_context('spawn').Pool(1)
+            ret = pool.map(solvers._solve_one, [(0, problem, params)])[0]
+            pool.close()
+            pool.join()
+            self.assertIsNone(ret['error'])
+            nptest.assert_equal(ret['sol'], ref['sol'])
+
+    def test_estimate_norm(self):
+        """
+        Test the estimated operator norms against the largest singular
+        values, and their cache.
+
+        """
+        rs = np.random.RandomState(0)
+        A = rs.normal(size=(50, 100))
+        norm = np.linalg.norm(A, 2)
+        calls = []
+
+        def forward(x):
+            calls.append(x)
+            return A.dot(x)
+
+        def adjoint(z):
+            return A.T.dot(z)
+        nptest.assert_allclose(operators.estimate_norm(A), norm, rtol=1e-3)
+        self.assertEqual(len(operators._norms.get(A)), 1)
+        nptest.assert_allclose(operators.estimate_norm(
+            forward, adjoint, np.zeros(100)), norm, rtol=1e-3)
+        self.assertLess(len(calls), 50)
+
+        # A matrix in operator form, a sparse matrix, a complex matrix, and
+        # a set of independent problems.
+        nptest.assert_allclose(operators.estimate_norm(
+            operators._matrix(A), operators._matrix(A, transpose=True),
+            np.zeros(100)), norm, rtol=1e-3)
+        A_csr = sparse.random(200, 300, density=.05, random_state=rs)
+        nptest.assert_allclose(operators.estimate_norm(A_csr),
+                               np.linalg.norm(A_csr.toarray(), 2), rtol=1e-3)
+        B = A + 1j * rs.normal(size=A.shape)
+        nptest.assert_allclose(operators.estimate_norm(B, B.conj().T),
+                               np.linalg.norm(B, 2), rtol=1e-3)
+        nptest.assert_allclose(operators.estimate_norm(
+            A, x0=np.zeros((100, 3))), norm, rtol=1e-3)
+
+        # Identity, zero and self-adjoint operators.
+        self.assertEqual(operators.estimate_norm(operators._identity()), 1)
+        self.assertEqual(operators.estimate_norm(np.zeros((3, 3))), 0)
+        nptest.assert_allclose(operators.estimate_norm(
+            lambda x: 3 * x, x0=np.zeros(5)), 3)
+        self.assertRaises(ValueError, operators.estimate_norm, forward)
+
+        # Estimates are cached per operator, adjoint, shape and dtype.
+        del calls[:]
+        operators.estimate_norm(forward, adjoint, np.zeros(100))
+        self.assertEqual(len(calls), 0)
+        operators.estimate_norm(forward, adjoint, np.zeros(100, np.float32))
+        self.assertGreater(len(calls), 0)
+        del calls[:]
+        operators.estimate_norm(forward, lambda z: A.T.dot(z), np.zeros(100))
+        self.assertGreater(len(calls), 0)
+        del calls[:]
+        f = functions.norm_l2(A=forward, At=adjoint)
+        solver = solvers.forward_backward()
+        solvers.solve([f, functions.norm_l1()], np.zeros(100), solver,
+                      maxit=1, verbosity='NONE')
+        self.assertLess(len(calls), 5)  # Evaluations only, no estimation.
+
+    def test_sparse(self):
+        """
+        Test that sparse matrices are applied in the CSR format, to many
+        columns, in the precision of the input, and shared.
+
+        """
+        rs = np.random.RandomState(0)
+        A = sparse.random(30, 20, density=.2, random_state=rs)
+        dense = A.toarray()
+        x = rs.normal(size=(20, 4))
+        z = rs.normal(size=(30, 4))
+        for matrix in [A.tocsr(), A.tocsc(), A.tocoo()]:
+            f = functions.norm_l2(A=matrix)
+            nptest.assert_allclose(f.A(x), dense.dot(x))
+            nptest.assert_allclose(f.A(x[:, 0]), dense.dot(x[:, 0]))
+            nptest.assert_allclose(f.At(z), dense.T.dot(z))
+            self.assertEqual(f.A(x.astype(np.float32)).dtype, np.float32)
+            self.assertEqual(f.At(z.astype(np.complex64)).dtype,
+                             np.complex64)
+            self.assertEqual(f.A(np.ones(20, dtype=int)).dtype, np.float64)
+        B = sparse.csr_matrix(dense + 1j * dense)
+        self.assertEqual(operators._operator(B)(np.ones(20, np.float32)).dtype,
+                         np.complex64)
+
+        # The conversions are done once per matrix.
+        matrix = A.tocsc()
+        f, g = functions.norm_l2(A=matrix), functions.norm_l1(A=matrix)
+        f.A(x)
+        M = operators._csr_of(matrix, False, x.dtype)
+        self.assertEqual(M.format, 'csr')
+        g.A(x)
+        self.assertIs(operators._csr_of(matrix, False, x.dtype), M)
+        M = operators._csr_of(matrix, True, np.dtype(np.float32))
+        self.assertEqual(M.dtype, np.float32)
+        self.assertIs(operators._csr_of(matrix, True, np.dtype(np.float32)),
+                      M)
+
+        # The conversions are freed with the matrix.
+        n = len(operators._csr._entries)
+        del f, g, matrix, M
+        self.assertEqual(len(operators._csr._entries), n - 1)
+
+        # Functions are pickled with their matrix, and primal-dual solvers
+        # solve as with the dense matrix.
+        f = pickle.loads(pickle.dumps(functions.norm_l2(A=A.tocsr())))
+        nptest.assert_allclose(f.A(x), dense.dot(x))
+        y = dense.dot(rs.normal(size=20))
+        rets = []
+        for L in [dense, A.tocsr()]:
+            solver = solvers.mlfbf(L=L, step=.1)
+            funs = [functions.norm_l1(), functions.norm_l1(lambda_=.1),
+                    functions.norm_l2(A=L, y=y)]
+            rets.append(solvers.solve(funs, np.zeros(20), solver, maxit=20,
+                                      verbosity='NONE'))
+        nptest.assert_allclose(rets[0]['sol'], rets[1]['sol'])
+
+        # Shared sparse matrices too, still pickled by reference.
+        if sys.version_info < (3, 8):
+            return  # No shared memory.
+        with operators.shared(A) as S:
+            f = functions.norm_l2(A=S)
+            nptest.assert_allclose(f.A(x), dense.dot(x))
+            nptest.assert_allclose(f.At(z), dense.T.dot(z))
+            self.assertEqual(f.A(x.astype(np.float32)).dtype, np.float32)
+            self.assertEqual(f.At(z.astype(np.float32)).dtype, np.float32)
+            nptest.assert_allclose(f.At(z.astype(np.float32)),
+                                   dense.T.dot(z), rtol=1e-5)
+            # The transpose and the conversions are not made per process.
+            self.assertFalse(operators._csr.get(S.matrix))
+            self.assertEqual(S.T.format, 'csc')
+            self.assertTrue(np.shares_memory(S.T.data, S.matrix.data))
+            self.assertLess(len(pickle.dumps(f)), 1000)
+            solver = solvers.mlfbf(L=S, step=.1)
+            self.assertIsInstance(solver.L, operators._sparse)
+            del f
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(OperatorsTestCase)
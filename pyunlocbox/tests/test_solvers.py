@@ -6,6 +6,8 @@ Test suite for the solvers module of the pyunlocbox package.
 
 """
 
+import sys
+import time
 import unittest
 
 import numpy as np
@@ -14,6 +16,30 @@ import numpy.testing as nptest
 from pyunlocbox import functions, solvers, acceleration
 
 
+def _problems(f1, f2, f3, f4, L):
+    """
+    Return a problem, as functions and a solver, for each solver and
+    acceleration scheme. The function f1 is smooth, f2 non-smooth, f3 a
+    dummy, f4 smooth with a forward operator, and L the linear operator of
+    the primal-dual solvers.
+
+    """
+    accel = acceleration.regularized_nonlinear(k=3, dolinesearch=False)
+    return [
+        ([f2, f1], solvers.forward_backward(
+            accel=acceleration.fista())),
+        ([f2, f1], solvers.forward_backward(
+            accel=acceleration.fista_backtracking())),
+        ([f2, f1], solvers.forward_backward(
+            accel=acceleration.backtracking(), step=10)),
+        ([f4, f3], solvers.gradient_descent(step=.01, accel=accel)),
+        ([f1, f2], solvers.douglas_rachford()),
+        ([f1, f2, f3], solvers.generalized_forward_backward(step=.1)),
+        ([f1, f2, f3], solvers.mlfbf(L=L, step=.01)),
+        ([f1, f2], solvers.projection_based(L=L, step=.01)),
+    ]
+
+
 class FunctionsTestCase(unittest.TestCase):
 
     def test_solve(self):
@@ -108,13 +134,955 @@ class FunctionsTestCase(unittest.TestCase):
         # Return values.
         f = functions.norm_l2(y=y)
         ret = solvers.solve([f], x0(), **nverb)
-        self.assertEqual(len(ret), 6)
+        self.assertEqual(len(ret), 8)
         self.assertIsInstance(ret['sol'], np.ndarray)
         self.assertIsInstance(ret['solver'], str)
         self.assertIsInstance(ret['crit'], str)
         self.assertIsInstance(ret['niter'], int)
         self.assertIsInstance(ret['time'], float)
-        self.assertIsInstance(ret['objective'], list)
+        self.assertIsInstance(ret['durations'], np.ndarray)
+        self.assertIsInstance(ret['objective'], np.ndarray)
+        self.assertIsInstance(ret['evaluated'], np.ndarray)
+
+    def test_solve_iter(self):
+        """
+        Test the generator-based iterative solving function.
+
+        """
+        y = [4., 5., 6., 7.]
+        f = functions.norm_l2(y=y)
+        params = {'rtol': None, 'maxit': 10, 'verbosity': 'NONE'}
+
+        # Same iterations as solve().
+        ret = solvers.solve([f], np.zeros(len(y)), **params)
+        states = []
+        for state in solvers.solve_iter([f], np.zeros(len(y)), **params):
+            states.append(dict(state, sol=state['sol'].copy()))
+        self.assertEqual([s['niter'] for s in states], list(range(1, 11)))
+        self.assertEqual([s['crit'] for s in states], [None] * 9 + ['MAXIT'])
+        nptest.assert_allclose(states[-1]['sol'], ret['sol'])
+        nptest.assert_allclose(states[-1]['objective'], ret['objective'][-1])
+        self.assertEqual(states[-1]['step'], 1)
+
+        # The objective is only given when evaluated.
+        states = list(solvers.solve_iter([f], np.zeros(len(y)), evaluate=3,
+                                         **params))
+        self.assertEqual([s['objective'] is None for s in states],
+                         [True, True, False] * 3 + [True])
+
+        # Stop early and fill the result.
+        result = dict()
+        iterations = solvers.solve_iter([f], np.zeros(len(y)), result=result,
+                                        **params)
+        for state in iterations:
+            if state['niter'] == 4:
+                break
+        self.assertEqual(result, dict())
+        iterations.close()
+        self.assertEqual(result['niter'], 4)
+        self.assertIsNone(result['crit'])
+        self.assertEqual(result['evaluated'][-1], 4)
+
+        # Update the stopping criteria.
+        result = dict()
+        iterations = solvers.solve_iter([f], np.zeros(len(y)), result=result,
+                                        **params)
+        next(iterations)
+        state = iterations.send({'maxit': 2})
+        self.assertEqual(state['crit'], 'MAXIT')
+        self.assertRaises(StopIteration, next, iterations)
+        self.assertEqual(result['niter'], 2)
+        iterations = solvers.solve_iter([f], np.zeros(len(y)), **params)
+        next(iterations)
+        self.assertRaises(ValueError, iterations.send, {'nope': 1})
+        iterations = solvers.solve_iter([f], np.zeros(len(y)),
+                                        evaluate='NEVER', **params)
+        next(iterations)
+        self.assertRaises(ValueError, iterations.send, {'atol': 1})
+
+    def test_divergence(self):
+        """
+        Test the detection of divergence, and the retries.
+
+        """
+        y = np.array([4., 5., 6., 7.])
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1(lambda_=.1)
+        params = {'verbosity': 'NONE', 'maxit': 100}
+
+        def solver(step):
+            return solvers.forward_backward(step=step,
+                                            accel=acceleration.dummy())
+
+        # Runaway growth of the objective function. Not checked by default.
+        ret = solvers.solve([f1, f2], np.zeros(4), solver(1.5), divtol=1e6,
+                            **params)
+        self.assertEqual(ret['crit'], 'DIVERGED')
+        self.assertEqual(ret['niter'], 11)
+        ret = solvers.solve([f1, f2], np.zeros(4), solver(1.5), **params)
+        self.assertEqual(ret['crit'], 'MAXIT')
+
+        # The growth is relative to the first increase, not an absolute one.
+        y2 = np.array([100., 150., 200., 250.])
+        ret = solvers.solve([functions.norm_l1(),
+                             functions.proj_b2(y=y2, epsilon=1)],
+                            np.zeros(4), solvers.douglas_rachford(),
+                            divtol=10, **params)
+        self.assertEqual(ret['crit'], 'RTOL')
+
+        # Oscillation.
+        ret = solvers.solve([f1, f2], np.zeros(4),
+                            solvers.generalized_forward_backward(step=1.),
+                            rtol=None, divtol=1e6, **params)
+        self.assertEqual(ret['crit'], 'DIVERGED')
+        self.assertEqual(ret['niter'], 9)
+
+        # Non-finite iterates, whether the objective is evaluated or not.
+        # Checked by default.
+        f3 = functions.func()
+        f3._eval = lambda x: 0
+        f3._grad = lambda x: np.full_like(x, np.nan)
+        for evaluate in [1, 'NEVER']:
+            for divtol in [1e6, None]:
+                ret = solvers.solve([f3, f2], np.zeros(4), solver(1.),
+                                    evaluate=evaluate, rtol=None,
+                                    divtol=divtol, **params)
+                self.assertEqual(ret['crit'], 'DIVERGED')
+                self.assertEqual(ret['niter'], 1)
+
+        # Retry from the best iterate with a smaller step.
+        ret = solvers.solve([f1, f2], np.zeros(4), solver(1.5), retries=3,
+                            divtol=1e6, rtol=1e-6, **params)
+        self.assertEqual(ret['crit'], 'RTOL')
+        nptest.assert_allclose(ret['sol'], y - .05, atol=1e-3)
+        ret = solvers.solve([f3, f2], np.zeros(4), solver(1.), retries=2,
+                            **params)
+        self.assertEqual(ret['crit'], 'DIVERGED')
+        self.assertEqual(ret['niter'], 3)
+
+        # A diverged solve does not warm start the next one of a path.
+        ret = solvers.solve_path([f1, f2], np.zeros(4), f1, [.5, 2],
+                                 solver(.6), divtol=1e6, rtol=1e-6,
+                                 **params)
+        self.assertEqual(ret['crit'], ['DIVERGED', 'RTOL'])
+        nptest.assert_allclose(ret['sol'][1], y - .1, atol=1e-3)
+        # The diverged solution is reported.
+        ref = solvers.solve([functions.norm_l2(y=y, lambda_=2), f2],
+                            np.zeros(4), solver(.6), divtol=1e6, rtol=1e-6,
+                            **params)
+        self.assertEqual(ref['crit'], 'DIVERGED')
+        nptest.assert_array_equal(ret['sol'][0], ref['sol'])
+
+    def test_maxtime(self):
+        """
+        Test the time budget stopping criterion.
+
+        """
+        y = [4., 5., 6., 7.]
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1(lambda_=.1)
+        _prox = f2._prox
+
+        def prox(x, T):
+            time.sleep(0.01)
+            return _prox(x, T)
+        f2._prox = prox
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), rtol=None, maxit=500,
+                            maxtime=0.1, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'MAXTIME')
+        self.assertLess(ret['niter'], 500)
+        self.assertLess(ret['time'], 0.5)
+
+        # The best iterate is returned, not the last one. This step size is
+        # too large: the starting point is the best iterate.
+        solver = solvers.forward_backward(step=1.5, accel=acceleration.dummy())
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), solver, rtol=None,
+                            maxit=500, maxtime=0.1, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'MAXTIME')
+        self.assertGreater(ret['niter'], 1)
+        nptest.assert_equal(ret['sol'], np.zeros(len(y)))
+        nptest.assert_equal(ret['objective'][-1], ret['objective'][0])
+        nptest.assert_equal(ret['evaluated'], np.arange(ret['niter'] + 1))
+        self.assertEqual(ret['durations'].shape, (ret['niter'],))
+        self.assertGreaterEqual(ret['durations'].min(), 0.01)
+
+        # The iteration limit takes precedence on the same iteration.
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), solver, rtol=None,
+                            maxit=1, maxtime=0, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'MAXIT')
+        self.assertGreater(np.sum(ret['objective'][-1]),
+                           np.sum(ret['objective'][0]))
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), solver, rtol=None,
+                            maxit=2, maxtime=0, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'MAXTIME')
+        nptest.assert_equal(ret['sol'], np.zeros(len(y)))
+
+        # No budget.
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), rtol=None, maxit=5,
+                            history=3, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'MAXIT')
+        self.assertEqual(ret['durations'].shape, (3,))
+
+    def test_profile(self):
+        """
+        Test the profiling of the solving function.
+
+        """
+        y = [4., 5., 6., 7.]
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1(lambda_=.1)
+        f3 = functions.norm_l1(lambda_=.1)
+        f3.prox = lambda x, T, out=None: x
+        solver = solvers.generalized_forward_backward(step=.5)
+        params = {'rtol': None, 'maxit': 10, 'verbosity': 'NONE'}
+
+        ret = solvers.solve([f1, f2], np.zeros(len(y)), **params)
+        self.assertNotIn('profile', ret)
+
+        ret = solvers.solve([f1, f2, f3], np.zeros(len(y)), solver,
+                            profile=True, **params)
+        profile = ret['profile']
+        self.assertEqual(profile['norm_l2.eval']['calls'], 11)
+        self.assertEqual(profile['norm_l2.grad']['calls'], 10)
+        self.assertEqual(profile['norm_l1[1].prox']['calls'], 10)
+        self.assertEqual(profile['norm_l1[2].prox']['calls'], 10)
+        self.assertEqual(profile['norm_l1[2].eval']['calls'], 11)
+        self.assertEqual(profile['dummy.update_sol']['calls'], 10)
+        algo = profile['generalized_forward_backward._algo']
+        self.assertEqual(algo['calls'], 10)
+        self.assertLessEqual(algo['time'],
+                             profile['generalized_forward_backward.algo']
+                             ['time'])
+        self.assertEqual(profile['solve.loop']['calls'], 10)
+        for stats in profile.values():
+            self.assertGreaterEqual(stats['time'], 0)
+
+        # The objects are restored.
+        for f in [f1, f2]:
+            self.assertNotIn('eval', vars(f))
+            self.assertNotIn('prox', vars(f))
+        self.assertNotIn('eval', vars(f3))
+        self.assertIn('prox', vars(f3))
+        self.assertNotIn('_algo', vars(solver))
+        self.assertNotIn('update_sol', vars(solver.accel))
+
+        # Profiling does not discard the precomputed quantities: the tight
+        # L2-norm proximal operator applies the adjoint once either way.
+        rs = np.random.RandomState(0)
+        A = np.linalg.qr(rs.normal(size=(6, 4)))[0]
+        calls = []
+
+        def At(z):
+            calls.append(z)
+            return A.dot(z)
+        f = functions.norm_l2(A=A.T, At=At, y=rs.normal(size=4))
+        solver = solvers.douglas_rachford(step=1)
+        counts = []
+        for profile in [False, True]:
+            del calls[:]
+            solvers.solve([f, f2], np.zeros(6), solver, profile=profile,
+                          **params)
+            counts.append(len(calls))
+        self.assertEqual(counts, [1, 1])
+
+    def test_evaluate(self):
+        """
+        Test the objective function evaluation policies of the solving
+        function.
+
+        """
+        y = [4., 5., 6., 7.]
+        f = functions.norm_l2(y=y)
+        g = functions.proj_b2(y=y, epsilon=10)
+        solver = solvers.forward_backward(step=1)
+        params = {'solver': solver, 'rtol': None, 'maxit': 10,
+                  'verbosity': 'NONE'}
+
+        # Evaluate at each iteration.
+        ret = solvers.solve([f, g], np.zeros(len(y)), **params)
+        nptest.assert_equal(ret['evaluated'], range(11))
+        self.assertEqual(len(ret['objective']), 11)
+
+        # Evaluate every 3 iterations, and at the solution.
+        ret = solvers.solve([f, g], np.zeros(len(y)), evaluate=3, **params)
+        nptest.assert_equal(ret['evaluated'], [0, 3, 6, 9, 10])
+        self.assertEqual(len(ret['objective']), 5)
+
+        # Stopping criteria are only verified when evaluated.
+        ret = solvers.solve([f], np.zeros(len(y)), solver, atol=1e-2,
+                            evaluate=2, verbosity='NONE')
+        self.assertEqual(ret['crit'], 'ATOL')
+        self.assertEqual(ret['niter'], 6)
+
+        # Evaluate only when a stopping criterion needs it.
+        ret = solvers.solve([f, g], np.zeros(len(y)), evaluate='AUTO',
+                            **params)
+        nptest.assert_equal(ret['evaluated'], [10])
+        ret = solvers.solve([f, g], np.zeros(len(y)), solver,
+                            evaluate='AUTO', atol=1e-10, rtol=None, maxit=10,
+                            verbosity='NONE')
+        nptest.assert_equal(ret['evaluated'], range(11))
+
+        # Never evaluate.
+        ret = solvers.solve([f, g], np.zeros(len(y)), evaluate='NEVER',
+                            **params)
+        self.assertEqual(ret['evaluated'].shape, (0,))
+        self.assertEqual(ret['objective'].shape, (0, 2))
+        self.assertEqual(ret['niter'], 10)
+        self.assertRaises(ValueError, solvers.solve, [f, g], np.zeros(len(y)),
+                          evaluate='NEVER', verbosity='NONE')
+        self.assertRaises(ValueError, solvers.solve, [f, g], np.zeros(len(y)),
+                          evaluate=0, **params)
+
+        # Functions which always evaluate to zero are skipped, unless their
+        # evaluation was overridden.
+        g.eval = lambda x: 1
+        ret = solvers.solve([f, g], np.zeros(len(y)), **params)
+        nptest.assert_equal(ret['objective'][:, 1], 0)
+        g._eval = lambda x: 1
+        ret = solvers.solve([f, g], np.zeros(len(y)), **params)
+        nptest.assert_equal(ret['objective'][:, 1], 1)
+
+        class proj_b2(functions.proj_b2):
+            def _eval(self, x):
+                return 2
+        g = proj_b2(y=y, epsilon=10)
+        ret = solvers.solve([f, g], np.zeros(len(y)), **params)
+        nptest.assert_equal(ret['objective'][:, 1], 2)
+
+    def test_history(self):
+        """
+        Test the storage of the objective function evaluations.
+
+        """
+        y = [4., 5., 6., 7.]
+        f = functions.norm_l2(y=y)
+        g = functions.norm_l1(y=y)
+        params = {'rtol': None, 'maxit': 50, 'verbosity': 'NONE'}
+
+        ret = solvers.solve([f, g], np.zeros(len(y)), **params)
+        self.assertEqual(ret['objective'].shape, (51, 2))
+        nptest.assert_equal(ret['evaluated'], range(51))
+        nptest.assert_allclose(ret['objective'][0], [126, 22])
+
+        # Bounded history keeps the last evaluations.
+        bounded = solvers.solve([f, g], np.zeros(len(y)), history=20,
+                                **params)
+        nptest.assert_equal(bounded['objective'], ret['objective'][-20:])
+        nptest.assert_equal(bounded['evaluated'], range(31, 51))
+        ret = solvers.solve([f, g], np.zeros(len(y)), history=2, evaluate=7,
+                            **params)
+        nptest.assert_equal(ret['evaluated'], [49, 50])
+        self.assertRaises(ValueError, solvers.solve, [f, g],
+                          np.zeros(len(y)), history=1, **params)
+
+        # Indexing from the end, as accelerations do.
+        history = solvers._history(2, size=3)
+        for i in range(5):
+            history.append([i, -i], i)
+        self.assertEqual(len(history), 3)
+        nptest.assert_equal(history[-1], [4, -4])
+        nptest.assert_equal(history[-3], [2, -2])
+        nptest.assert_equal(history[0], [2, -2])
+        self.assertRaises(IndexError, history.__getitem__, -4)
+        nptest.assert_equal(history[:, 0], [2, 3, 4])
+
+    def test_checkpoint(self):
+        """
+        Test that resuming from a checkpoint continues the iterations exactly.
+
+        """
+        import os
+        import shutil
+        import tempfile
+        y = np.array([4., 5., 6., 7.])
+        L = np.array([[5, 9, 3, 1], [7, 8, 5, 2], [4, 4, 9, 3]])
+        rs = np.random.RandomState(0)
+        A = rs.uniform(size=(6, 4))
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1(lambda_=.5)
+        f3 = functions.dummy()
+        f4 = functions.norm_l2(A=A, y=np.dot(A, y))
+        problems = _problems(f1, f2, f3, f4, L)
+        # The residuals of functions with an operator are cached.
+        problems += [
+            ([f2, f4], solvers.forward_backward(
+                accel=acceleration.fista())),
+            ([f2, f4], solvers.forward_backward(
+                accel=acceleration.fista_backtracking())),
+            ([f1, f2, f4], solvers.generalized_forward_backward(step=.1)),
+        ]
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'checkpoint.npz')
+        params = {'rtol': None, 'verbosity': 'NONE'}
+        try:
+            for funs, solver in problems:
+                full = solvers.solve(funs, np.zeros(4), solver, maxit=20,
+                                     **params)
+                solvers.solve(funs, np.zeros(4), solver, maxit=13,
+                              checkpoint=path, checkpoint_every=5, **params)
+                ret = solvers.solve(funs, np.zeros(4), solver, maxit=20,
+                                    resume=path, **params)
+                self.assertEqual(ret['niter'], 20)
+                nptest.assert_array_equal(ret['sol'], full['sol'])
+                nptest.assert_array_equal(ret['objective'],
+                                          full['objective'])
+                nptest.assert_array_equal(ret['evaluated'], range(21))
+                with np.load(path) as data:
+                    self.assertEqual(data['niter'], 10)
+                    checkpoint = dict(data)
+                ret = solvers.solve(funs, np.zeros(4), solver, maxit=20,
+                                    resume=checkpoint, **params)
+                nptest.assert_array_equal(ret['sol'], full['sol'])
+            self.assertRaises(ValueError, solvers.solve, [f1, f2],
+                              np.zeros(4), solvers.douglas_rachford(),
+                              resume=checkpoint, **params)
+            self.assertEqual(os.listdir(tmpdir), ['checkpoint.npz'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_dtype(self):
+        """
+        Test that the solvers and acceleration schemes work in the floating
+        point precision of the starting point.
+
+        """
+        y = np.array([4., 5., 6., 7.])
+        L = np.array([[5, 9, 3, 1], [7, 8, 5, 2], [4, 4, 9, 3]],
+                     dtype=np.float32)
+        dtypes = set()
+
+        def record(f):
+            _prox, _grad = f._prox, f._grad
+
+            def prox(x, T):
+                dtypes.add(x.dtype)
+                return _prox(x, T)
+
+            def grad(x):
+                dtypes.add(x.dtype)
+                return _grad(x)
+            f._prox = prox
+            if 'GRAD' in f.cap():
+                f._grad = grad
+            return f
+
+        f1 = record(functions.norm_l2(y=y))
+        f2 = record(functions.norm_l1(lambda_=.5))
+        f3 = functions.dummy()
+        A = np.random.RandomState(0).uniform(size=(6, 4))
+        f4 = record(functions.norm_l2(A=A.astype(np.float32), y=A.dot(y)))
+        f5 = record(functions.norm_l1(y=y, lambda_=.5))
+        problems = _problems(f1, f2, f3, f4, L)
+        # Measurements in float64.
+        problems.append(([f5, f1], solvers.forward_backward()))
+        for dtype in [np.float32, np.float64]:
+            for funs, solver in problems:
+                dtypes.clear()
+                x0 = np.zeros(4, dtype=dtype)
+                ret = solvers.solve(funs, x0, solver, rtol=None, maxit=20,
+                                    verbosity='NONE')
+                self.assertEqual(ret['sol'].dtype, dtype)
+                self.assertEqual(dtypes, {np.dtype(dtype)})
+
+    def test_step(self):
+        """
+        Test the step sizes chosen by the solvers if none is given.
+
+        """
+        rs = np.random.RandomState(0)
+        A = rs.normal(size=(10, 20))
+        L = rs.normal(size=(15, 20))
+        normA, normL = np.linalg.norm(A, 2), np.linalg.norm(L, 2)
+        f1 = functions.norm_l2(A=A, y=A.dot(rs.normal(size=20)), lambda_=.3,
+                               w=.5)
+        f2 = functions.norm_l1()
+        f3 = functions.func()  # Unknown Lipschitz constant.
+        f3._grad = lambda x: x
+        beta = 2 * .3 * .5**2 * normA**2
+        steps = [
+            ([f1, f2], solvers.gradient_descent, {}, None),
+            ([f1, functions.dummy()], solvers.gradient_descent, {},
+             .99 / beta),
+            ([f1, f2], solvers.forward_backward, {}, .99 / beta),
+            ([f2, f1], solvers.generalized_forward_backward, {}, .99 / beta),
+            ([f1, f2], solvers.douglas_rachford, {}, 1),
+            ([f2, f2, f1], solvers.mlfbf, {'L': L}, .5 / (beta + normL)),
+            ([f2, f2, f1], solvers.mlfbf, {}, .5 / (beta + 1)),
+            ([f2, f2], solvers.projection_based, {'L': L}, 1),
+            ([f3, f2], solvers.forward_backward, {}, 1),
+            ([f2, f2, f3], solvers.mlfbf, {'L': L}, 1),
+        ]
+        for funs, cls, kwargs, step in steps:
+            solver = cls(**kwargs)
+            if step is None:
+                self.assertRaises(ValueError, solver.pre, funs, np.zeros(20))
+                continue
+            solver.pre(funs, np.zeros(20))
+            nptest.assert_allclose(solver.step, step, rtol=1e-3)
+            solver.post()
+
+        # A given step is kept, and the given solver is not modified.
+        solver = solvers.forward_backward(step=.1)
+        solver.pre([f1, f2], np.zeros(20))
+        self.assertEqual(solver.step, .1)
+        solver = solvers.forward_backward()
+        ret = solvers.solve([f1, f2], np.zeros(20), solver, rtol=1e-6,
+                            verbosity='NONE')
+        self.assertIsNone(solver.step)
+        self.assertEqual(ret['crit'], 'RTOL')
+        self.assertRaises(ValueError, solvers.forward_backward, step=-1)
+
+    def test_problem(self):
+        """
+        Test that a problem solves as solve() for other measurements and
+        starting points, without setting up the solver again.
+
+        """
+        rs = np.random.RandomState(0)
+        L = rs.normal(size=(6, 4))
+        y = rs.normal(size=4)
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1(lambda_=.1)
+        f3 = functions.dummy()
+        step = .5 / np.linalg.norm(L, 2)**2
+        problems = [
+            ([f1, f2], solvers.forward_backward(step=.5)),
+            ([f1, f2], solvers.forward_backward(
+                step=.5, accel=acceleration.regularized_nonlinear(k=3))),
+            ([f1, f2, f3], solvers.generalized_forward_backward(step=.5)),
+            ([f1, f2], solvers.douglas_rachford(step=.5)),
+            ([f2, f3, f1], solvers.mlfbf(L=L, step=step)),
+            ([f1, f3], solvers.projection_based(L=L, step=step)),
+        ]
+        params = {'rtol': 1e-6, 'maxit': 50, 'verbosity': 'NONE'}
+        for funs, solver in problems:
+            problem = solvers.problem(funs, np.zeros(4), solver, data=f1,
+                                      **params)
+
+            def pre(functions, x0):
+                raise AssertionError('The solver was set up again.')
+            problem.solver._pre = pre
+            for k in range(3):
+                yk = rs.normal(size=4)
+                x0 = rs.normal(size=4)
+                f = functions.norm_l2(y=yk)
+                ref = solvers.solve([f if g is f1 else g for g in funs],
+                                    x0.copy(), solver, **params)
+                ret = problem.run(yk, x0)
+                self.assertEqual(ret['niter'], ref['niter'])
+                nptest.assert_allclose(ret['sol'], ref['sol'])
+                nptest.assert_allclose(ret['objective'], ref['objective'])
+            # The default starting point and the last measurements.
+            ref = solvers.solve([f if g is f1 else g for g in funs],
+                                np.zeros(4), solver, **params)
+            nptest.assert_allclose(problem.run()['sol'], ref['sol'])
+        # The given functions are not modified.
+        nptest.assert_equal(f1.y(), y)
+
+        # Consecutive runs start from the same step, even if the
+        # acceleration scheme (e.g. backtracking) decreased it.
+        class decrease(acceleration.dummy):
+            def _update_step(self, solver, objective, niter):
+                return solver.step * .9
+        f = functions.norm_l2(y=y)
+        solver = solvers.forward_backward(step=.5, accel=decrease())
+        problem = solvers.problem([f, f2], np.zeros(4), solver, data=f,
+                                  **params)
+        rets = [problem.run(), problem.run()]
+        ref = solvers.solve([f, f2], np.zeros(4), solver, **params)
+        for ret in rets:
+            self.assertEqual(ret['niter'], ref['niter'])
+            nptest.assert_equal(ret['sol'], ref['sol'])
+            nptest.assert_equal(ret['objective'], ref['objective'])
+
+        problem = solvers.problem([f1], np.zeros(4), verbosity='NONE')
+        self.assertRaises(ValueError, problem.run, y, np.zeros(3))
+        self.assertRaises(ValueError, problem.run, y, np.zeros(4, int))
+        self.assertRaises(ValueError, problem.run, np.zeros(3))
+        self.assertRaises(ValueError, solvers.problem, [f1], np.zeros(4),
+                          warm=dict())
+        self.assertRaises(ValueError, solvers.problem, [f1], np.zeros(4),
+                          data=f2)
+
+    def test_solve_path(self):
+        """
+        Test the regularization path: warm starts save iterations, and the
+        solutions are those of independent solves.
+
+        """
+        rs = np.random.RandomState(0)
+        A = rs.normal(size=(15, 30))
+        x = np.zeros(30)
+        x[:3] = rs.normal(size=3)
+        y = A.dot(x)
+        step = 0.5 / np.linalg.norm(A, 2)**2
+        lambdas = [0.01, 1, 0.1, 10]
+        params = {'rtol': 1e-8, 'maxit': 10000, 'verbosity': 'NONE'}
+
+        f1 = functions.norm_l2(A=A, y=y)
+        f2 = functions.norm_l1(lambda_=3)
+        solver = solvers.forward_backward(step=step)
+        x0 = np.zeros(30)
+        ret = solvers.solve_path([f1, f2], x0, f2, lambdas, solver, **params)
+        nptest.assert_equal(ret['lambdas'], [10, 1, 0.1, 0.01])
+        self.assertEqual(ret['sol'].shape, (4, 30))
+        self.assertEqual(ret['solver'], 'forward_backward')
+        self.assertEqual(ret['crit'], ['RTOL'] * 4)
+        self.assertEqual(f2.lambda_, 3)
+        nptest.assert_equal(x0, 0)
+        niter = 0
+        for k, lambda_ in enumerate(ret['lambdas']):
+            f2.lambda_ = lambda_
+            cold = solvers.solve([f1, f2], np.zeros(30), solver, **params)
+            niter += cold['niter']
+            nptest.assert_allclose(ret['sol'][k], cold['sol'], atol=1e-3)
+            self.assertAlmostEqual(ret['objective'][k],
+                                   np.sum(cold['objective'][-1]), places=5)
+        self.assertLess(np.sum(ret['niter']), niter / 2)
+
+        # The first evaluation is the one of the warm start, not of x0.
+        for state in solvers.solve_iter([f1, f2], x0, solver, maxit=5,
+                                        verbosity='NONE'):
+            if state['crit']:
+                warm = dict((name, np.array(value, copy=True)) for name, value
+                            in state['solver'].get_state().items())
+        ret = dict()
+        for state in solvers.solve_iter([f1, f2], np.full(30, np.nan), solver,
+                                        maxit=1, result=ret, warm=warm,
+                                        verbosity='NONE'):
+            pass
+        nptest.assert_allclose(ret['objective'][0],
+                               [f1.eval(warm['sol']), f2.eval(warm['sol'])])
+
+        # The dual variables are warm started and returned.
+        L = np.eye(30)
+        f3 = functions.norm_l1()
+        f4 = functions.norm_l2(y=y[:1].repeat(30))
+        solver = solvers.mlfbf(L=L, step=.1)
+        ret = solvers.solve_path([f3, f4, f1], x0, f3, lambdas[:2], solver,
+                                 rtol=1e-4, verbosity='NONE')
+        self.assertEqual(ret['dual_sol'].shape, (2, 30))
+        self.assertEqual(ret['solver'], 'mlfbf')
+
+    def test_solve_many(self):
+        """
+        Test the batch solver: order, failures, timing, and equivalence with
+        solve() for any number of workers and chunk size.
+
+        """
+        ys = np.random.RandomState(0).uniform(size=(7, 4))
+        problems = []
+        for y in ys:
+            problems.append(([functions.norm_l2(y=y)], np.zeros(4)))
+        # A dictionary of arguments, which override the default ones.
+        problems.append({'functions': [functions.norm_l2(y=ys[0])],
+                         'x0': np.zeros(4), 'maxit': 3})
+        # A failing problem: the L1-norm possesses no gradient.
+        problems.append(([functions.norm_l1(), functions.norm_l1()],
+                         np.zeros(4), solvers.forward_backward()))
+        params = {'rtol': 1e-6, 'verbosity': 'NONE'}
+
+        for workers, chunksize in [(1, 1), (2, 1), (3, 2)]:
+            rets = list(solvers.solve_many(problems, workers, chunksize,
+                                           **params))
+            self.assertEqual([r['index'] for r in rets], list(range(9)))
+            for y, ret in zip(ys, rets):
+                self.assertIsNone(ret['error'])
+                self.assertGreaterEqual(ret['time'], 0)
+                nptest.assert_allclose(ret['sol'], y, rtol=1e-4)
+                x0 = np.zeros(4)
+                ref = solvers.solve([functions.norm_l2(y=y)], x0, **params)
+                nptest.assert_equal(ret['sol'], ref['sol'])
+                self.assertEqual(ret['niter'], ref['niter'])
+            self.assertEqual(rets[7]['niter'], 3)
+            self.assertEqual(rets[7]['crit'], 'MAXIT')
+            self.assertIsInstance(rets[8]['error'], ValueError)
+            self.assertEqual(set(rets[8].keys()), {'index', 'error', 'time'})
+
+        rets = solvers.solve_many(problems, 2, 3, ordered=False, **params)
+        indices = [ret['index'] for ret in rets]
+        self.assertEqual(sorted(indices), list(range(9)))
+
+        # Concurrent calls from threads solve their own problems.
+        import threading
+        sols = dict()
+
+        def run(k):
+            many = [([functions.norm_l2(y=y + k)], np.zeros(4)) for y in ys]
+            rets = solvers.solve_many(many, 2, **params)
+            sols[k] = np.array([ret['sol'] for ret in rets])
+
+        threads = [threading.Thread(target=run, args=(k,)) for k in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for k in range(4):
+            nptest.assert_allclose(sols[k], ys + k, rtol=1e-4)
+
+        self.assertRaises(ValueError, next,
+                          solvers.solve_many(problems, workers=0))
+        self.assertRaises(ValueError, next,
+                          solvers.solve_many(problems, chunksize=0))
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'needs coroutines')
+    def test_solve_async(self):
+        """
+        Test the coroutine: same result as solve(), control given back to the
+        event loop, concurrent solves in an executor, cancellation and
+        timeout.
+
+        """
+        import asyncio
+        import concurrent.futures
+
+        y = [4., 5., 6., 7.]
+        params = {'rtol': None, 'maxit': 50, 'verbosity': 'NONE'}
+        ref = solvers.solve([functions.norm_l2(y=y)], np.zeros(4), **params)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        asyncio.set_event_loop(loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+
+        # The event loop runs other callbacks between chunks of iterations.
+        ticks = []
+
+        def tick():
+            ticks.append(None)
+            loop.call_soon(tick)
+
+        loop.call_soon(tick)
+        ret = loop.run_until_complete(solvers.solve_async(
+            [functions.norm_l2(y=y)], np.zeros(4), every=10, **params))
+        nptest.assert_equal(ret['sol'], ref['sol'])
+        self.assertEqual(ret['niter'], 50)
+        self.assertGreaterEqual(len(ticks), 5)
+
+        executor = concurrent.futures.ThreadPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+        coroutines = []
+        for _ in range(4):
+            solver = solvers.forward_backward(accel=acceleration.fista())
+            coroutines.append(solvers.solve_async(
+                [functions.norm_l2(y=y)], np.zeros(4), solver, every=7,
+                executor=executor, **params))
+        rets = loop.run_until_complete(asyncio.gather(*coroutines))
+        for ret in rets:
+            nptest.assert_equal(ret['sol'], ref['sol'])
+            self.assertEqual(ret['crit'], 'MAXIT')
+
+        # A cancelled or timed out solve cleans up the solver.
+        params['maxit'] = None
+        for executor in [None, executor]:
+            f = functions.norm_l2(y=y)
+            solver = solvers.forward_backward()
+            task = loop.create_task(solvers.solve_async(
+                [f], np.zeros(4), solver, every=1, executor=executor,
+                **params))
+            loop.run_until_complete(asyncio.sleep(0.01))
+            task.cancel()
+            self.assertRaises(asyncio.CancelledError,
+                              loop.run_until_complete, task)
+            self.assertFalse(hasattr(solver, 'sol'))
+            self.assertEqual(f.verbosity, 'NONE')
+
+            coroutine = solvers.solve_async([f], np.zeros(4), solver,
+                                            executor=executor, timeout=0.01,
+                                            **params)
+            self.assertRaises(asyncio.TimeoutError,
+                              loop.run_until_complete, coroutine)
+            self.assertFalse(hasattr(solver, 'sol'))
+
+        # The event loop runs while a cancelled chunk finishes in a thread.
+        def slow(x):
+            time.sleep(0.01)
+            return x
+
+        f = functions.norm_l2(A=slow, y=y)
+        task = loop.create_task(solvers.solve_async(
+            [f], np.zeros(4), every=20, executor=executor, **params))
+        loop.run_until_complete(asyncio.sleep(0.05))
+        task.cancel()
+        del ticks[:]
+        loop.call_soon(tick)
+        self.assertRaises(asyncio.CancelledError, loop.run_until_complete,
+                          task)
+        self.assertGreater(len(ticks), 10)
+
+        coroutine = solvers.solve_async([f], np.zeros(4), every=0)
+        self.assertRaises(ValueError, loop.run_until_complete, coroutine)
+
+    def test_reentrant(self):
+        """
+        Test that functions, solvers and acceleration schemes are left
+        untouched by solve(), such that they can serve concurrent solves.
+
+        """
+        from multiprocessing.pool import ThreadPool
+
+        rs = np.random.RandomState(0)
+        A = rs.normal(size=(20, 10))
+        y = A.dot(rs.normal(size=10))
+        f1 = functions.norm_l2(A=A, y=y)
+        f2 = functions.norm_l1(lambda_=.1)
+        f2.verbosity = 'LOW'
+        solver = solvers.forward_backward(step=.5 / np.linalg.norm(A)**2)
+        self.assertIsNot(solver.accel, solvers.forward_backward().accel)
+        funs = [f1, f2]
+        params = {'rtol': None, 'verbosity': 'NONE'}
+
+        def run(maxit):
+            return solvers.solve(funs, np.zeros(10), solver, maxit=maxit,
+                                 **params)
+
+        refs = [run(maxit) for maxit in range(20, 60)]
+        self.assertEqual(funs, [f1, f2])
+        self.assertEqual(f2.verbosity, 'LOW')
+        self.assertFalse(hasattr(solver, 'sol'))
+        self.assertFalse(hasattr(solver.accel, 'sol'))
+        pool = ThreadPool(4)
+        rets = pool.map(run, range(20, 60))
+        pool.close()
+        for ret, ref in zip(rets, refs):
+            nptest.assert_equal(ret['sol'], ref['sol'])
+            self.assertEqual(ret['niter'], ref['niter'])
+
+        # Nor are the quantities they precompute, e.g. per step size.
+        f3 = functions.norm_l2(y=rs.normal(size=10), w=rs.uniform(size=10))
+        f3.prepare(np.zeros(10))
+        funs = [f3, f2]
+
+        def run(step):
+            solver = solvers.douglas_rachford(step=step)
+            return solvers.solve(funs, np.zeros(10), solver, maxit=20,
+                                 **params)
+
+        steps = np.linspace(.1, 2, 40)
+        refs = [run(step) for step in steps]
+        pool = ThreadPool(4)
+        rets = pool.map(run, steps)
+        pool.close()
+        for ret, ref in zip(rets, refs):
+            nptest.assert_equal(ret['sol'], ref['sol'])
+
+        # A single function is completed by a dummy one, in a copied list.
+        funs = [functions.norm_l2(y=y)]
+        solvers.solve(funs, np.zeros(20), **params)
+        self.assertEqual(len(funs), 1)
+
+        # The initial dual variable is not modified.
+        d0 = np.zeros(10)
+        solver = solvers.mlfbf(step=.1, d0=d0)
+        solvers.solve([f2, functions.norm_l1(), f1], np.zeros(10), solver,
+                      maxit=10, **params)
+        nptest.assert_equal(d0, 0)
+        self.assertIs(solver.d0, d0)
+
+    def test_pickle(self):
+        """
+        Test that solvers and acceleration schemes can be pickled, and that
+        problems can be sent to spawned processes.
+
+        """
+        import multiprocessing
+        import pickle
+
+        y = [1, 0, 0.1, 8, -6.5, 0.2, 0.004, 0.01]
+        L = np.eye(8)
+        f1 = functions.norm_l2(y=y, A=L)
+        f2 = functions.norm_l1(A=L)
+        f3 = functions.dummy()
+        A = np.random.RandomState(0).uniform(size=(10, 8))
+        f4 = functions.norm_l2(A=A, y=A.dot(y))
+        problems = _problems(f1, f2, f3, f4, L)
+        # The other parameters of the primal-dual solvers.
+        problems += [
+            ([f2, f2, f1], solvers.mlfbf(L=L, step=.1, d0=np.ones(8))),
+            ([f2, f1], solvers.projection_based(L=L, Lt=L.T, step=.1)),
+        ]
+        params = {'rtol': None, 'maxit': 20, 'verbosity': 'NONE'}
+        for funs, solver in problems:
+            ref = solvers.solve(funs, np.zeros(8), solver, **params)
+            funs, solver = pickle.loads(pickle.dumps((funs, solver)))
+            ret = solvers.solve(funs, np.zeros(8), solver, **params)
+            nptest.assert_equal(ret['sol'], ref['sol'])
+
+        # Processes which are not forked receive the problems themselves.
+        funs, solver = problems[-1]
+        task = (0, {'functions': funs, 'x0': np.zeros(8), 'solver': solver},
+                params)
+        pool = multiprocessing.get_context('spawn').Pool(1)
+        ret = pool.map(solvers._solve_one, [task])[0]
+        pool.close()
+        pool.join()
+        self.assertIsNone(ret['error'])
+        nptest.assert_equal(ret['sol'], ref['sol'])
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'needs module __getattr__')
+    def test_lazy_imports(self):
+        """
+        Test that the slow dependencies are only imported when needed.
+
+        """
+        import subprocess
+        code = ('import sys\n'
+                'from pyunlocbox import functions, solvers\n'
+                'solvers.solve([functions.norm_l1()], [1., 2.], maxit=2,\n'
+                '              verbosity="NONE")\n'
+                'print("scipy.optimize" in sys.modules,\n'
+                '      "asyncio" in sys.modules)\n'
+                'solvers.solve_async\n'
+                'print("asyncio" in sys.modules)\n')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.split(), [b'False', b'False', b'True'])
+
+    @unittest.skipIf(sys.version_info < (3, 4), 'Needs assertLogs.')
+    def test_logging(self):
+        """
+        Test that the messages are logged independently of the verbosity.
+
+        """
+        import contextlib
+        import io
+        import logging
+        y = np.array([1., 2., 3.])
+        f1 = functions.norm_l1(y=y)
+        f2 = functions.norm_l2(y=y)
+        solver = solvers.forward_backward(step=.5)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                self.assertLogs('pyunlocbox', logging.DEBUG) as logs:
+            ret = solvers.solve([f1, f2], np.zeros(3), solver, maxit=5,
+                                verbosity='NONE')
+        self.assertEqual(stdout.getvalue(), '')
+        names = set(record.name for record in logs.records)
+        self.assertEqual(names, set(['pyunlocbox.solvers',
+                                     'pyunlocbox.functions']))
+        messages = [record.getMessage() for record in logs.records]
+        self.assertIn('INFO: Forward-backward method', messages)
+        self.assertIn('Iteration 5 of forward_backward:', messages)
+        self.assertIn('    stopping criterion: {}'.format(ret['crit']),
+                      messages)
+        # The printed messages are the logged ones.
+        with contextlib.redirect_stdout(stdout):
+            solvers.solve([f1, f2], np.zeros(3), solver, maxit=5,
+                          verbosity='ALL')
+        printed = stdout.getvalue().splitlines()
+        self.assertEqual(printed, messages)
+        # The levels keep the meaning of the verbosity: what is printed at
+        # 'LOW' is logged at INFO or above.
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            solvers.solve([f1, f2], np.zeros(3), solver, maxit=5,
+                          verbosity='LOW')
+        info = [record.getMessage() for record in logs.records
+                if record.name == 'pyunlocbox.solvers' and
+                record.levelno >= logging.INFO]
+        self.assertEqual(stdout.getvalue().splitlines(), info)
+        levels = set(record.levelno for record in logs.records
+                     if record.name == 'pyunlocbox.functions')
+        self.assertEqual(levels, {logging.INFO})
 
     def test_solver(self):
         """
@@ -157,7 +1125,7 @@ class FunctionsTestCase(unittest.TestCase):
 
         """
         y = [4., 5., 6., 7.]
-        solver = solvers.forward_backward(accel=acceleration.dummy())
+        solver = solvers.forward_backward(accel=acceleration.dummy(), step=1)
         param = {'solver': solver, 'rtol': 1e-6, 'verbosity': 'NONE'}
 
         # L2-norm prox and dummy gradient.
@@ -214,6 +1182,125 @@ class FunctionsTestCase(unittest.TestCase):
         self.assertRaises(ValueError, solver.pre, [f1, f2], x0)
         self.assertRaises(ValueError, solver.pre, [f1, f2, f1], x0)
 
+    def test_operator_applications(self):
+        """
+        Test that gradient solvers apply the forward and adjoint operators only
+        once per iteration, thanks to the residual cache.
+
+        """
+        rs = np.random.RandomState(42)
+        A = rs.normal(size=(10, 5))
+        ncalls = {'A': 0, 'At': 0}
+
+        def op(x):
+            ncalls['A'] += 1
+            return A.dot(x)
+
+        def op_t(x):
+            ncalls['At'] += 1
+            return A.T.dot(x)
+
+        f1 = functions.norm_l2(A=op, At=op_t, y=rs.normal(size=10))
+        f2 = functions.norm_l1(lambda_=.1)
+        step = .5 / np.linalg.norm(A, 2)**2
+        slvs = []
+        slvs.append(solvers.forward_backward(accel=acceleration.dummy(),
+                                             step=step))
+        slvs.append(solvers.forward_backward(step=step))
+        slvs.append(solvers.gradient_descent(step=step))
+        slvs.append(solvers.generalized_forward_backward(step=step))
+        for solver in slvs:
+            funs = [f1] if type(solver) is solvers.gradient_descent else \
+                   [f1, f2]
+            # Count the applications of 20 additional iterations.
+            calls = []
+            for maxit in [10, 30]:
+                ncalls['A'] = ncalls['At'] = 0
+                solvers.solve(funs, np.zeros(5), solver, rtol=None,
+                              maxit=maxit, verbosity='NONE')
+                calls.append(dict(ncalls))
+            self.assertEqual(calls[1]['A'] - calls[0]['A'], 20)
+            self.assertEqual(calls[1]['At'] - calls[0]['At'], 20)
+
+        # FISTA extrapolates the residual of the objective function evaluated
+        # at the iterates, which gives the same iterates as applying A.
+        solver = solvers.forward_backward(step=step)
+        ncalls['A'] = 0
+        ret = solvers.solve([f1, f2], np.zeros(5), solver, rtol=None,
+                            maxit=30, verbosity='NONE')
+        self.assertEqual(ncalls['A'], 31)
+        ref = solvers.solve([f1, f2], np.zeros(5), solver, rtol=None,
+                            maxit=30, evaluate='NEVER', verbosity='NONE')
+        nptest.assert_allclose(ret['sol'], ref['sol'], rtol=1e-10)
+
+        # A trial step of backtracking only applies A to evaluate the smooth
+        # function, from the gradient computed once per iteration.
+        trials = []
+
+        class counting(acceleration.backtracking):
+            def _event(self, solver, event, **values):
+                trials.append(values['decreases'] + 1)
+
+        solver = solvers.forward_backward(step=100 * step, accel=counting())
+        ncalls['A'] = ncalls['At'] = 0
+        solvers.solve([f1, f2], np.zeros(5), solver, rtol=None, maxit=10,
+                      verbosity='NONE')
+        self.assertGreater(trials[0], 1)
+        self.assertEqual(ncalls['A'], 1 + 10 + sum(trials))
+        self.assertEqual(ncalls['At'], 2 * 10)
+
+    def test_workspace(self):
+        """
+        Test that solvers do not allocate new intermediate arrays at each
+        iteration.
+
+        """
+        y = [4., 5., 6., 7.]
+        f1 = functions.norm_l2(y=y)
+        f2 = functions.norm_l1()
+        f3 = functions.norm_l1(lambda_=.1)
+        arrays = set()
+        _prox = f3._prox
+
+        def prox(x, T):
+            arrays.add(id(x))
+            return _prox(x, T)
+        f3._prox = prox
+        slvs = []
+        slvs.append(solvers.forward_backward(accel=acceleration.fista()))
+        slvs.append(solvers.generalized_forward_backward())
+        slvs.append(solvers.douglas_rachford())
+        slvs.append(solvers.projection_based())
+        for solver in slvs:
+            funs = [f3, f2] if type(solver) is solvers.projection_based \
+                else [f3, f1]
+            arrays.clear()
+            ret = solvers.solve(funs, np.zeros(len(y)), solver, rtol=None,
+                                maxit=10, verbosity='NONE')
+            self.assertEqual(ret['niter'], 10)
+            self.assertEqual(len(arrays), 1)
+            self.assertFalse(hasattr(solver, '_tmp'))
+            self.assertFalse(hasattr(solver, '_x'))
+
+        # The gradients are computed in workspaces.
+        outs = []
+
+        class norm_l2(functions.norm_l2):
+            def _grad_into(self, x, out):
+                outs.append(out)
+                return super(norm_l2, self)._grad_into(x, out)
+
+        funs = [norm_l2(y=y), norm_l2(lambda_=.1)]
+        slvs = [solvers.gradient_descent(step=.1),
+                solvers.generalized_forward_backward(step=.1)]
+        for solver in slvs:
+            del outs[:]
+            solvers.solve(funs, np.zeros(len(y)), solver, rtol=None,
+                          maxit=10, verbosity='NONE')
+            self.assertEqual(len(outs), 2 * 10)
+            self.assertFalse(any(out is None for out in outs))
+            self.assertEqual(len(set(id(out) for out in outs)), 2)
+
     def test_generalized_forward_backward(self):
         """
         Test the generalized forward-backward algorithm.
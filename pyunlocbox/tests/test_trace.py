@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Test suite for the trace module of the pyunlocbox package.
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as nptest
+
+from pyunlocbox import acceleration, functions, solvers, trace
+
+
+class TraceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        np.random.seed(1)
+        A = np.random.normal(size=(20, 10))
+        self.f1 = functions.norm_l2(y=A.dot(np.random.normal(size=10)), A=A)
+        self.f2 = functions.norm_l1(lambda_=.1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _solve(self, accel, sink, **kwargs):
+        solver = solvers.forward_backward(step=1e-3, accel=accel)
+        return solvers.solve([self.f1, self.f2], np.zeros(10), solver,
+                             rtol=1e-6, verbosity='NONE', trace=sink,
+                             **kwargs)
+
+    def test_formats(self):
+        """
+        Test that both formats record the same trace.
+
+        """
+        traces = []
+        for ext in ['jsonl', 'npz']:
+            path = os.path.join(self.tmpdir, 'run.' + ext)
+            accel = acceleration.regularized_nonlinear(k=4)
+            sink = getattr(trace, ext)(path, sol_every=5)
+            ret = self._solve(accel, sink)
+            t = trace.load(path)
+            traces.append(t)
+            n = ret['niter']
+            nptest.assert_equal(t['niter'], np.arange(1, n + 1))
+            self.assertEqual(t['end']['crit'], ret['crit'])
+            self.assertEqual(t['end']['niter'], n)
+            self.assertEqual(t['start']['solver'], 'forward_backward')
+            self.assertEqual(t['start']['accel'], 'regularized_nonlinear')
+            self.assertEqual(t['start']['functions'], ['norm_l2', 'norm_l1'])
+            # The evaluations are those returned by solve.
+            nptest.assert_allclose(t['objective'], ret['objective'][1:])
+            self.assertTrue(np.all(np.diff(t['wall']) > 0))
+            self.assertTrue(np.all(t['algo'] <= t['duration']))
+            nptest.assert_equal(t['step'], 1e-3)
+            # One extrapolation every k + 1 iterations.
+            self.assertEqual([e['niter'] for e in t['events']],
+                             list(range(5, n + 1, 5)))
+            for event in t['events']:
+                self.assertEqual(event['event'], 'extrapolation')
+            nptest.assert_equal(t['sol_niter'], np.arange(5, n + 1, 5))
+            self.assertEqual(t['sol'].shape, (n // 5, 10))
+            if n % 5 == 0:
+                nptest.assert_allclose(t['sol'][-1], ret['sol'])
+        for name in ['niter', 'step', 'objective', 'sol_niter', 'sol']:
+            nptest.assert_allclose(traces[0][name], traces[1][name])
+        self.assertEqual(traces[0]['events'], traces[1]['events'])
+
+    def test_streaming(self):
+        """
+        Test that the traces are written as the solve goes.
+
+        """
+        sinks = [trace.jsonl(os.path.join(self.tmpdir, 'run.jsonl')),
+                 trace.npz(os.path.join(self.tmpdir, 'run.npz'), sol_every=1)]
+        for sink in sinks:
+            solver = solvers.forward_backward(step=1e-3)
+            iterations = solvers.solve_iter([self.f1, self.f2], np.zeros(10),
+                                            solver, maxit=10, trace=sink,
+                                            verbosity='NONE')
+            for _ in range(3):
+                next(iterations)
+            if isinstance(sink, trace.jsonl):
+                with open(sink.path) as fh:
+                    self.assertEqual(len(fh.readlines()), 1 + 3)
+            else:
+                self.assertEqual(sink._sol.tell(), 3 * 10 * 8)
+            iterations.close()
+        t = trace.load(sinks[1].path)
+        self.assertEqual(t['sol'].shape, (3, 10))
+        nptest.assert_equal(t['sol_niter'], [1, 2, 3])
+        self.assertIsNone(t['end']['crit'])
+        # Empty.
+        sink = trace.npz(os.path.join(self.tmpdir, 'run.npz'))
+        self._solve(acceleration.dummy(), sink, maxit=2)
+        self.assertEqual(trace.load(sink.path)['sol'].shape, (0, 10))
+
+    def test_backtracking(self):
+        """
+        Test that the steps chosen by backtracking are recorded.
+
+        """
+        path = os.path.join(self.tmpdir, 'run.jsonl')
+        accel = acceleration.backtracking(eta=.5)
+        solver = solvers.forward_backward(step=1., accel=accel)
+        solvers.solve([self.f1, self.f2], np.zeros(10), solver, maxit=20,
+                      verbosity='NONE', trace=path)
+        t = trace.load(path)
+        self.assertEqual(len(t['events']), 20)
+        steps = [event['step'] for event in t['events']]
+        nptest.assert_allclose(t['step'], steps)
+        self.assertGreater(t['events'][0]['decreases'], 0)
+        self.assertLess(t['step'][0], 1.)
+
+    def test_summary(self):
+        """
+        Test the convergence rate and the report.
+
+        """
+        path = os.path.join(self.tmpdir, 'run.npz')
+        ret = self._solve(acceleration.fista(), path)
+        s = trace.summary(path)
+        self.assertEqual(s['crit'], ret['crit'])
+        self.assertGreater(s['objective'][0], s['objective'][1])
+        self.assertLess(s['rate'], 1)
+        self.assertLess(s['order'], 0)
+        self.assertEqual(s['events'], dict())
+        self.assertEqual(sorted(s['time']), ['algo', 'loop', 'setup'])
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'pyunlocbox.trace', path])
+        self.assertIn(b'Solver: forward_backward with fista', output)
+        self.assertIn('stopping criterion: {}'.format(ret['crit']).encode(),
+                      output)
+
+    def test_failure(self):
+        """
+        Test that the trace is ended if the solve fails, and the errors.
+
+        """
+        path = os.path.join(self.tmpdir, 'run.jsonl')
+
+        class failing(acceleration.dummy):
+            def _update_sol(self, solver, objective, niter):
+                if niter == 3:
+                    raise RuntimeError('failure')
+                return solver.sol
+
+        self.assertRaises(RuntimeError, self._solve, failing(), path)
+        t = trace.load(path)
+        nptest.assert_equal(t['niter'], [1, 2])
+        self.assertIsNone(t['end']['crit'])
+        self.assertRaises(ValueError, self._solve, failing(), 'run.txt')
+        self.assertRaises(ValueError, trace.jsonl, path, sol_every=0)
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TraceTestCase)
@@ -0,0 +1,496 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+r"""
+This module records traces of the iterations of
+:func:`pyunlocbox.solvers.solve`, for offline convergence analysis:
+
+* :class:`jsonl` Trace written to a JSON Lines file, one line per iteration
+
+* :class:`npz` Trace written to a NumPy ``.npz`` file at the end of the solve,
+  the iterates being written to a temporary file as the solve goes
+
+* :func:`load` Load a trace written by one of the above
+
+* :func:`summary` Convergence rate and time per phase of a trace
+
+A trace records, for each iteration, the wall time, the objective function
+per function (when evaluated), the step size (e.g. as chosen by
+:class:`pyunlocbox.acceleration.backtracking`), the events of the acceleration
+scheme (e.g. the extrapolations of
+:class:`pyunlocbox.acceleration.regularized_nonlinear`) and optionally the
+iterate. A report is printed by::
+
+    python -m pyunlocbox.trace run.jsonl
+
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+import numpy as np
+
+
+def _open(trace):
+    r"""
+    Return the sink given to :func:`pyunlocbox.solvers.solve`: a path is
+    opened as a trace of the format given by its extension.
+
+    """
+    if not isinstance(trace, str):
+        return trace
+    if trace.endswith('.jsonl'):
+        return jsonl(trace)
+    elif trace.endswith('.npz'):
+        return npz(trace)
+    raise ValueError('The trace should be a .jsonl or .npz path, or a trace '
+                     'object.')
+
+
+class sink(object):
+    r"""
+    Defines the trace interface, called by :func:`pyunlocbox.solvers.solve`.
+
+    A trace records a single solve. :meth:`start` is called once the solver is
+    initialized, :meth:`record` after each iteration, and :meth:`end` when the
+    solve is over, even if it failed.
+
+    Parameters
+    ----------
+    sol_every : int, optional
+        Record the iterate every `sol_every` iterations. Default is None, which
+        does not record iterates.
+
+    """
+
+    def __init__(self, sol_every=None):
+        if sol_every is not None and sol_every < 1:
+            raise ValueError('sol_every should be at least 1.')
+        self.sol_every = sol_every
+
+    def start(self, info):
+        r"""
+        Start a trace.
+
+        Parameters
+        ----------
+        info : dict
+            The solver, acceleration scheme and functions' names, the shape
+            and dtype of the iterate, and the time spent in the initialization
+            of the solver (`setup`).
+
+        """
+        self._start(info)
+
+    def _start(self, info):
+        raise NotImplementedError("Class user should define this method.")
+
+    def record(self, iteration):
+        r"""
+        Record an iteration.
+
+        Parameters
+        ----------
+        iteration : dict
+            The iteration number (`niter`), the time since the start of the
+            solve (`wall`), the duration of the iteration (`duration`) and the
+            time spent in the solver's algorithm (`algo`), the step size
+            (`step`), the evaluations of the functions or None (`objective`),
+            and the events of the acceleration scheme (`events`). Plus the
+            iterate (`sol`), as a copy, if it is to be recorded.
+
+        """
+        self._record(iteration)
+
+    def _record(self, iteration):
+        raise NotImplementedError("Class user should define this method.")
+
+    def end(self, info):
+        r"""
+        End a trace.
+
+        Parameters
+        ----------
+        info : dict
+            The stopping criterion (`crit`, None if the solve failed or was
+            stopped), the number of iterations (`niter`) and the total time
+            (`time`).
+
+        """
+        self._end(info)
+
+    def _end(self, info):
+        raise NotImplementedError("Class user should define this method.")
+
+    def wants_sol(self, niter):
+        r"""
+        Whether the iterate of iteration `niter` should be recorded.
+        """
+        return self.sol_every is not None and niter % self.sol_every == 0
+
+
+def _list(values):
+    return None if values is None else [float(v) for v in values]
+
+
+class jsonl(sink):
+    r"""
+    Trace written to a JSON Lines file.
+
+    The first line describes the solve, each of the next lines an iteration,
+    and the last line the result. They are written as the solve goes, such
+    that the trace of a solve which crashed or is still running can be read.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file, which is overwritten.
+    sol_every : int, optional
+        See :class:`sink`.
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers, trace
+    >>> path = os.path.join(tempfile.mkdtemp(), 'run.jsonl')
+    >>> f = functions.norm_l2(y=[4, 5, 6, 7])
+    >>> ret = solvers.solve([f], np.zeros(4), atol=1e-2, verbosity='NONE',
+    ...                     trace=trace.jsonl(path, sol_every=2))
+    >>> t = trace.load(path)
+    >>> t['niter']
+    array([1, 2, 3, 4, 5])
+    >>> t['sol_niter']
+    array([2, 4])
+    >>> t['end']['crit']
+    'ATOL'
+
+    """
+
+    def __init__(self, path, sol_every=None):
+        super(jsonl, self).__init__(sol_every)
+        self.path = path
+        self._file = None
+
+    def _write(self, line):
+        self._file.write(json.dumps(line))
+        self._file.write('\n')
+        # Readable by others, and kept if the process crashes.
+        self._file.flush()
+
+    def _start(self, info):
+        self._file = open(self.path, 'w')
+        self._write(dict(info, type='start'))
+
+    def _record(self, iteration):
+        line = {'type': 'iteration',
+                'niter': iteration['niter'],
+                'wall': iteration['wall'],
+                'duration': iteration['duration'],
+                'algo': iteration['algo'],
+                'step': float(iteration['step']),
+                'objective': _list(iteration['objective'])}
+        if iteration['events']:
+            line['events'] = iteration['events']
+        if 'sol' in iteration:
+            line['sol'] = np.asarray(iteration['sol']).tolist()
+        self._write(line)
+
+    def _end(self, info):
+        if self._file is None:
+            return  # Never started.
+        try:
+            self._write(dict(info, type='end'))
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class npz(sink):
+    r"""
+    Trace written to a NumPy ``.npz`` file at the end of the solve.
+
+    The iterations are kept in memory as columns, while the iterates are
+    written to a temporary file as they are recorded. They are then saved
+    uncompressed and atomically, like checkpoints. Besides :func:`load`, the
+    archive can be opened with :func:`numpy.load`, which reads its arrays
+    lazily, e.g. the iterates only if accessed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file, which is overwritten.
+    sol_every : int, optional
+        See :class:`sink`.
+
+    """
+
+    def __init__(self, path, sol_every=None):
+        super(npz, self).__init__(sol_every)
+        self.path = path
+        self._info = None
+
+    def _start(self, info):
+        self._info = info
+        self._columns = dict((name, []) for name in [
+            'niter', 'wall', 'duration', 'algo', 'step', 'objective'])
+        self._events = []
+        self._sol_niter = []
+        # The iterates, written as they come, and their dtype.
+        self._sol = None
+        self._dtype = np.dtype(info['dtype'])
+        self._nan = [np.nan] * len(info['functions'])
+
+    def _record(self, iteration):
+        columns = self._columns
+        for name in ['niter', 'wall', 'duration', 'algo', 'step']:
+            columns[name].append(iteration[name])
+        objective = iteration['objective']
+        columns['objective'].append(self._nan if objective is None
+                                    else objective)
+        for event in iteration['events']:
+            self._events.append(dict(event, niter=iteration['niter']))
+        if 'sol' in iteration:
+            if self._sol is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                self._sol = tempfile.TemporaryFile(dir=directory)
+            self._sol_niter.append(iteration['niter'])
+            sol = np.asarray(iteration['sol'], dtype=self._dtype)
+            self._sol.write(np.ascontiguousarray(sol).data)
+
+    def _end(self, info):
+        if self._info is None:
+            return  # Never started.
+        try:
+            self._save(info)
+        finally:
+            self._info = None
+            if self._sol is not None:
+                self._sol.close()
+                self._sol = None
+
+    def _save(self, info):
+        arrays = dict(self._columns)
+        arrays['niter'] = np.array(arrays['niter'], dtype=int)
+        arrays['objective'] = np.reshape(arrays['objective'],
+                                         (-1, len(self._nan)))
+        arrays['sol_niter'] = np.array(self._sol_niter, dtype=int)
+        arrays['start'] = json.dumps(self._info)
+        arrays['end'] = json.dumps(info)
+        arrays['events'] = json.dumps(self._events)
+        # The archive of np.savez(), with the iterates copied from their file.
+        tmp = self.path + '.tmp'
+        with zipfile.ZipFile(tmp, 'w', allowZip64=True) as archive:
+            for name, array in arrays.items():
+                with archive.open(name + '.npy', 'w', force_zip64=True) as fh:
+                    np.lib.format.write_array(fh, np.asanyarray(array))
+            shape = (len(self._sol_niter),) + tuple(self._info['shape'])
+            header = {'descr': np.lib.format.dtype_to_descr(self._dtype),
+                      'fortran_order': False, 'shape': shape}
+            with archive.open('sol.npy', 'w', force_zip64=True) as fh:
+                np.lib.format.write_array_header_1_0(fh, header)
+                if self._sol is not None:
+                    self._sol.seek(0)
+                    shutil.copyfileobj(self._sol, fh)
+        os.replace(tmp, self.path)
+
+
+def load(path):
+    r"""
+    Load a trace written by :class:`jsonl` or :class:`npz`.
+
+    Parameters
+    ----------
+    path : str
+        Path of the trace.
+
+    Returns
+    -------
+    trace : dict
+        The columns `niter`, `wall`, `duration`, `algo` and `step` as arrays
+        with one entry per iteration, `objective` as an array with one row
+        per iteration and one column per function (NaN where not evaluated),
+        `events` as a list of dictionaries which hold their iteration
+        (`niter`), the iterates `sol` and their iterations `sol_niter`, and
+        the `start` and `end` descriptions. The `end` description is None if
+        the solve is still running or crashed.
+
+    """
+    if path.endswith('.npz'):
+        trace = dict()
+        with np.load(path) as data:
+            for name in data.files:
+                if name in ['start', 'end', 'events']:
+                    trace[name] = json.loads(str(data[name]))
+                else:
+                    trace[name] = data[name]
+        return trace
+
+    start, end, lines = None, None, []
+    with open(path) as fh:
+        for text in fh:
+            line = json.loads(text)
+            if line['type'] == 'start':
+                start = line
+            elif line['type'] == 'end':
+                end = line
+            else:
+                lines.append(line)
+    del start['type']
+    if end is not None:
+        del end['type']
+    nan = [np.nan] * len(start['functions'])
+    trace = {'start': start, 'end': end, 'events': []}
+    for name in ['niter', 'wall', 'duration', 'algo', 'step']:
+        trace[name] = np.array([line[name] for line in lines])
+    trace['niter'] = trace['niter'].astype(int)
+    trace['objective'] = np.reshape(
+        [nan if line['objective'] is None else line['objective']
+         for line in lines], (-1, len(nan)))
+    for line in lines:
+        for event in line.get('events', []):
+            trace['events'].append(dict(event, niter=line['niter']))
+    sols = [line for line in lines if 'sol' in line]
+    trace['sol_niter'] = np.array([line['niter'] for line in sols], dtype=int)
+    trace['sol'] = np.reshape([line['sol'] for line in sols],
+                              (len(sols),) + tuple(start['shape']))
+    return trace
+
+
+def summary(trace):
+    r"""
+    Summarize the convergence and the timings of a trace.
+
+    The convergence rate is estimated from the gap :math:`f(x^t) - f^*`
+    between the evaluations of the objective function and the smallest one,
+    which stands for the optimum :math:`f^*`. A linear rate :math:`\rho` is
+    fitted as :math:`f(x^t) - f^* \propto \rho^t`, and a sublinear order
+    :math:`p` as :math:`f(x^t) - f^* \propto t^p`, e.g. :math:`p=-1` for the
+    forward-backward and :math:`p=-2` for FISTA. Only the evaluations with a
+    positive gap are used.
+
+    Parameters
+    ----------
+    trace : dict or str
+        A trace returned by :func:`load`, or its path.
+
+    Returns
+    -------
+    summary : dict
+        The number of iterations (`niter`), the stopping criterion (`crit`),
+        the first and last evaluations of the objective function
+        (`objective`), the linear rate (`rate`) and the sublinear order
+        (`order`), NaN if there are less than two evaluations to fit, the
+        step sizes (`step`, as ``(min, max)``), the number of events per kind
+        (`events`), and the total time per phase (`time`): the initialization
+        of the solver (`setup`), the solver's algorithm (`algo`) and the rest
+        of the iterations (`loop`), i.e. the evaluation of the objective
+        function and the stopping criteria.
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> import numpy as np
+    >>> from pyunlocbox import functions, solvers, trace
+    >>> from pyunlocbox import acceleration
+    >>> path = os.path.join(tempfile.mkdtemp(), 'run.npz')
+    >>> np.random.seed(0)
+    >>> A = np.random.normal(size=(20, 10))
+    >>> f1 = functions.norm_l2(y=A.dot(np.random.normal(size=10)), A=A)
+    >>> f2 = functions.norm_l1(lambda_=.1)
+    >>> accel = acceleration.regularized_nonlinear(k=4)
+    >>> solver = solvers.forward_backward(step=1e-3, accel=accel)
+    >>> ret = solvers.solve([f1, f2], np.zeros(10), solver, rtol=1e-6,
+    ...                     verbosity='NONE', trace=path)
+    >>> s = trace.summary(path)
+    >>> s['niter'], s['crit'], s['events']
+    (36, 'RTOL', {'extrapolation': 7})
+    >>> s['rate'] < 1
+    True
+    >>> sorted(s['time'])
+    ['algo', 'loop', 'setup']
+
+    """
+    if isinstance(trace, str):
+        trace = load(trace)
+    objective = np.sum(trace['objective'], axis=1)
+    evaluated = ~np.isnan(objective)
+    niter = trace['niter'][evaluated]
+    objective = objective[evaluated]
+    rate, order = np.nan, np.nan
+    if len(objective) > 0:
+        gap = objective - np.min(objective)
+        fit = gap > 0
+        if np.sum(fit) >= 2:
+            log_gap = np.log(gap[fit])
+            rate = np.exp(np.polyfit(niter[fit], log_gap, 1)[0])
+            order = np.polyfit(np.log(niter[fit]), log_gap, 1)[0]
+    events = dict()
+    for event in trace['events']:
+        events[event['event']] = events.get(event['event'], 0) + 1
+    algo = float(np.sum(trace['algo']))
+    end = trace['end'] or dict()
+    return {'niter': len(trace['niter']),
+            'crit': end.get('crit'),
+            'objective': (objective[0], objective[-1]) if len(objective)
+            else (np.nan, np.nan),
+            'rate': rate,
+            'order': order,
+            'step': (np.min(trace['step']), np.max(trace['step']))
+            if len(trace['step']) else (np.nan, np.nan),
+            'events': events,
+            'time': {'setup': trace['start']['setup'],
+                     'algo': algo,
+                     'loop': float(np.sum(trace['duration'])) - algo}}
+
+
+def report(trace):
+    r"""
+    Report of :func:`summary` as text.
+    """
+    if isinstance(trace, str):
+        trace = load(trace)
+    s = summary(trace)
+    start = trace['start']
+    lines = ['Solver: {} with {}'.format(start['solver'], start['accel']),
+             'Functions: {}'.format(', '.join(start['functions'])),
+             'Iterations: {} (stopping criterion: {})'.format(s['niter'],
+                                                              s['crit']),
+             'Objective: {:e} -> {:e}'.format(*s['objective']),
+             'Convergence: linear rate {:.4f}, sublinear order {:.2f}'.format(
+                 s['rate'], s['order']),
+             'Step size: {:e} to {:e}'.format(*s['step'])]
+    for name in sorted(s['events']):
+        lines.append('Events: {} {}'.format(s['events'][name], name))
+    total = sum(s['time'].values())
+    lines.append('Time: {:.3f} s'.format(total))
+    for phase in ['setup', 'algo', 'loop']:
+        t = s['time'][phase]
+        lines.append('    {:<6} {:.3f} s ({:.0%})'.format(
+            phase, t, t / total if total > 0 else 0))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    r"""
+    Print the report of the traces given on the command line.
+    """
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        sys.stderr.write('usage: python -m pyunlocbox.trace TRACE '
+                         '[TRACE ...]\n')
+        return 2
+    for k, path in enumerate(paths):
+        if k > 0:
+            print('')
+        print(path)
+        print(report(path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())